@@ -6,8 +6,16 @@
 
 .. moduleauthor:: Cosmin Luță <q4break@gmail.com>
 """
+import sys
+
 from .api import BoardGameGeek
 from .exceptions import BoardGameGeekError, BoardGameGeekAPIRetryError, BoardGameGeekAPIError, BoardGameGeekTimeoutError
+from .exceptions import BoardGameGeekCacheMissError
 from .version import __version__
 
-__all__ = [BoardGameGeek, BoardGameGeekAPIRetryError, BoardGameGeekError, BoardGameGeekAPIError, BoardGameGeekTimeoutError]
+__all__ = [BoardGameGeek, BoardGameGeekAPIRetryError, BoardGameGeekError, BoardGameGeekAPIError, BoardGameGeekTimeoutError,
+           BoardGameGeekCacheMissError]
+
+if sys.version_info >= (3, 5):
+    from .asyncapi import AsyncBoardGameGeek
+    __all__.append(AsyncBoardGameGeek)
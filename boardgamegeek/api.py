@@ -16,37 +16,318 @@ from __future__ import unicode_literals
 
 import logging
 import requests
-import datetime
-import sys
+import time
 import warnings
+import xml.etree.ElementTree as ET
 
-# This is required for decoding HTML entities from the description text
-# of games
-if sys.version_info >= (3,):
-    import html.parser as hp
-else:
-    import HTMLParser as hp
-
-
-from .games import BoardGame
-from .guild import Guild
-from .user import User
-from .collection import Collection
-from .hotitems import HotItems
-from .plays import Plays
 from .exceptions import BoardGameGeekAPIError, BoardGameGeekError, BoardGameGeekAPIRetryError, BoardGameGeekAPINonXMLError
-from .utils import xml_subelement_attr, xml_subelement_text, xml_subelement_attr_list, get_parsed_xml_response
-from .utils import fix_unsigned_negative
-from .search import SearchResult
+from .exceptions import BoardGameGeekTimeoutError, BoardGameGeekCacheMissError, BoardGameGeekRateLimitQueueFullError
+from .loaders import create_game_from_xml, create_guild_from_xml, add_guild_members_from_xml
+from .loaders import get_guild_member_count_from_xml, create_user_from_xml, add_user_buddies_and_guilds_from_xml
+from .loaders import get_user_buddy_and_guild_count_from_xml, create_plays_from_xml, add_play_from_xml
+from .loaders import get_plays_count_from_xml, create_hot_items_from_xml, create_collection_from_xml
+from .loaders import add_collection_item_from_xml, create_search_results_from_xml
+from .utils import get_parsed_xml_response, get_streamed_xml_response
 from .utils import get_cache_session_from_uri, RateLimitingAdapter, DEFAULT_REQUESTS_PER_MINUTE
+from .utils import fetch_pages, fetch_as_completed, get_page_count, DEFAULT_CONCURRENT_PAGES
+from .utils import check_xml_parser, xml_find, xml_findall, xml_fromstring, xml_tostring, XML_PARSE_ERRORS
+from .ratelimit import AdaptiveRateLimiter, PRIORITIES
+from .cache import ObjectCache, object_cache_key, get_cached_response, cache_response, DEFAULT_NEGATIVE_CACHE_TTL, MODES
 
 
 log = logging.getLogger("boardgamegeek.api")
-html_parser = hp.HTMLParser()
 
 HOT_ITEM_CHOICES = ["boardgame", "rpg", "videogame", "boardgameperson", "rpgperson", "boardgamecompany",
                     "rpgcompany", "videogamecompany"]
 
+# how many ids to request with a single call to the /thing API
+DEFAULT_THING_BATCH_SIZE = 20
+
+# page sizes of the paginated API responses
+PLAYS_PER_PAGE = 100
+GUILD_MEMBERS_PER_PAGE = 25
+USER_ITEMS_PER_PAGE = 100
+
+# how many times to check whether a collection is ready, when retrieving several
+DEFAULT_COLLECTION_POLLS = 10
+
+# parameters holding (case insensitive) user names
+USER_NAME_PARAMS = ["name", "username"]
+# parameters holding comma separated lists, which can be in any order
+LIST_PARAMS = ["id", "type"]
+# parameters whose values are the API's defaults, so they can be left out
+DEFAULT_PARAMS = {"page": "1", "exact": "0"}
+
+
+def _canonical_params(params):
+    """
+    Returns the canonical form of the parameters of an API call, so that equivalent calls are cached (and made) the
+    same way: user names are lower cased, the whitespace of search queries is normalized, lists are sorted and the
+    parameters which are empty or have the default values are left out
+    """
+    canonical = {}
+
+    for name, value in params.items():
+        if value is None or "{}".format(value) == "":
+            continue
+
+        if name in USER_NAME_PARAMS:
+            value = "{}".format(value).strip().lower()
+        elif name == "query":
+            value = " ".join("{}".format(value).split())
+        elif name in LIST_PARAMS and "," in "{}".format(value):
+            items = set(item.strip() for item in "{}".format(value).split(","))
+            # numbers (ids) are sorted by value, before any other items
+            value = ",".join(sorted(items, key=lambda item: (0, int(item), "") if item.isdigit() else (1, 0, item)))
+
+        if DEFAULT_PARAMS.get(name) == "{}".format(value):
+            continue
+
+        canonical[name] = value
+
+    return canonical
+
+
+def _guild_id(guild_id):
+    try:
+        return int(guild_id)
+    except:
+        raise BoardGameGeekError("invalid guild id")
+
+
+def _user_params(name):
+    if not name:
+        raise BoardGameGeekError("no user name specified")
+
+    return {"name": name, "buddies": 1, "guilds": 1, "hot": 1, "top": 1}
+
+
+def _plays_params(name, game_id, min_date, max_date):
+    if not name and not game_id:
+        raise BoardGameGeekError("no user name specified")
+
+    if name and game_id:
+        raise BoardGameGeekError("can't retrieve by user and by game at the same time")
+
+    if name:
+        params = {"username": name}
+    else:
+        try:
+            params = {"id": int(game_id)}
+        except:
+            raise BoardGameGeekError("invalid game id")
+
+    if min_date:
+        try:
+            params["mindate"] = min_date.isoformat()
+        except AttributeError:
+            raise BoardGameGeekError("mindate must be a datetime.date object")
+
+    if max_date:
+        try:
+            params["maxdate"] = max_date.isoformat()
+        except AttributeError:
+            raise BoardGameGeekError("maxdate must be a datetime.date object")
+
+    return params
+
+
+def _hot_items_params(item_type):
+    if item_type not in HOT_ITEM_CHOICES:
+        raise BoardGameGeekError("invalid type specified")
+
+    return {"type": item_type}
+
+
+def _collection_params(user_name):
+    if not user_name:
+        raise BoardGameGeekError("no user name specified")
+
+    return {"username": user_name, "stats": 1}
+
+
+def _search_params(query, search_type, exact):
+    if not query:
+        raise BoardGameGeekError("invalid query string")
+
+    if search_type is None:
+        search_type = ["boardgame"]
+
+    params = {"query": query}
+
+    if type(search_type) != list:
+        warnings.warn("numeric values for the `search_type` parameter will no longer be supported in future versions. See the documentation for details",
+                      UserWarning)
+
+        s_type = []
+
+        if search_type:
+            if search_type & BoardGameGeekNetworkAPI.SEARCH_BOARD_GAME:
+                s_type.append("boardgame")
+            if search_type & BoardGameGeekNetworkAPI.SEARCH_BOARD_GAME_EXPANSION:
+                s_type.append("boardgameexpansion")
+            if search_type & BoardGameGeekNetworkAPI.SEARCH_RPG_ITEM:
+                s_type.append("rpgitem")
+            if search_type & BoardGameGeekNetworkAPI.SEARCH_VIDEO_GAME:
+                s_type.append("videogame")
+
+        if s_type:
+            params["type"] = ",".join(s_type)
+    else:
+        if search_type:
+            for s in search_type:
+                if s not in ["rpgitem", "videogame", "boardgame", "boardgameexpansion"]:
+                    raise BoardGameGeekError("invalid search type: {}".format(search_type))
+
+            params["type"] = ",".join(search_type)
+
+    if exact:
+        params["exact"] = 1
+
+    return params
+
+
+def _game_ids(game_ids):
+    """
+    Validates a list of game ids, returning them as integers, with duplicates removed
+    """
+    try:
+        ids = [int(game_id) for game_id in game_ids]
+    except:
+        raise BoardGameGeekError("invalid game id")
+
+    unique_ids = []
+    seen = set()
+    for game_id in ids:
+        if game_id not in seen:
+            seen.add(game_id)
+            unique_ids.append(game_id)
+
+    return ids, unique_ids
+
+
+def _batch_size(batch_size):
+    try:
+        batch_size = int(batch_size)
+    except:
+        raise BoardGameGeekError("invalid batch size")
+
+    if batch_size <= 0:
+        raise BoardGameGeekError("invalid batch size")
+
+    return batch_size
+
+
+def _thing_batch_params(batch):
+    return {"id": ",".join(str(game_id) for game_id in batch), "stats": 1}
+
+
+def _game_params(game_id):
+    return {"id": game_id, "stats": 1}
+
+
+def _raise_fetch_error(game_id, error):
+    """
+    ``on_error`` callback of :py:meth:`BoardGameGeek.games_by_id` failing the whole call when games couldn't be
+    retrieved, like :py:meth:`BoardGameGeek.game` does, while leaving out the games which weren't found
+
+    :param integer game_id: id of the game
+    :param error: the exception raised while trying to retrieve the game
+    """
+    if isinstance(error, BoardGameGeekAPINonXMLError):
+        return
+    if isinstance(error, (BoardGameGeekAPIError, BoardGameGeekTimeoutError, BoardGameGeekCacheMissError,
+                          BoardGameGeekRateLimitQueueFullError)):
+        raise error
+
+
+def _create_games_from_batch_xml(xml_root, batch, lazy=False):
+    """
+    Creates the games out of the response to a /thing call for multiple ids
+
+    :param xml_root: root element of the API response
+    :param list batch: the ids which were requested
+    :param bool lazy: whether to create games decoding their data as it's accessed
+    :return: tuple of dictionaries (games, errors): game id -> ``BoardGame``, game id -> exception
+    """
+    games = {}
+    errors = {}
+
+    for item in xml_findall(xml_root, "item"):
+        try:
+            game_id = int(item.attrib["id"])
+        except (KeyError, ValueError):
+            log.warning("ignoring item without a valid id in the API response")
+            continue
+
+        if game_id not in batch:
+            continue
+
+        try:
+            games[game_id] = create_game_from_xml(item, game_id=game_id, lazy=lazy)
+        except BoardGameGeekError as e:
+            errors[game_id] = e
+
+    for game_id in batch:
+        if game_id not in games and game_id not in errors:
+            errors[game_id] = BoardGameGeekError("game not found")
+
+    return games, errors
+
+
+def _select_game_id(results, choose, rank_table):
+    """
+    Selects a game id out of the search results, according to the ``choose`` criteria. For selecting by rank,
+    all the results must have their ranks in ``rank_table``.
+    """
+    if choose == "first":
+        return results[0].id
+    elif choose == "recent":
+        return max(results, key=lambda x: x.year if x.year is not None else -300000).id
+
+    def _rank(game_id):
+        rank = rank_table.get(game_id)
+        return rank if rank is not None else 10000000000
+
+    return min([r.id for r in results], key=_rank)
+
+
+def _known_ranks(results, rank_table):
+    """
+    Splits the search results into the ones whose rank is in ``rank_table`` (which may be ``None``) and the others
+
+    :return: tuple (dictionary mapping game ids to their ranks, list of the ids of the games with unknown ranks)
+    """
+    ranks = {}
+    unknown = []
+    for r in results:
+        if rank_table is not None and r.id in rank_table:
+            ranks[r.id] = rank_table[r.id]
+        else:
+            unknown.append(r.id)
+    return ranks, unknown
+
+
+def _is_guild_page_empty(xml_root):
+    return xml_find(xml_root, ".//member") is None
+
+
+def _is_user_page_empty(xml_root):
+    if xml_find(xml_root, ".//buddy") is None and xml_find(xml_root, ".//guild") is None:
+        log.debug("no buddy/guild found on page, stopping here")
+        return True
+    return False
+
+
+def _is_plays_page_empty(xml_root):
+    return xml_find(xml_root, ".//play") is None
+
+
+def _root_attributes(xml_root):
+    # while streaming, the root already holds some of the elements which weren't returned yet
+    return ET.Element(xml_root.tag, dict(xml_root.attrib))
+
+
 
 class BoardGameGeekNetworkAPI(object):
     """
@@ -57,13 +338,37 @@ class BoardGameGeekNetworkAPI(object):
     :param integer timeout: timeout for a request
     :param integer retries: how many retries to perform in special cases
     :param integer retry_delay: delay between retries (seconds)
+    :param dict rank_table: dictionary mapping game ids to their board game rank (or ``None`` if not ranked), used for
+                            selecting games by rank without fetching them. The ranks of retrieved games are added to it.
+                            If not specified, the ranks aren't kept.
+    :param integer concurrent_pages: how many pages of a paginated response to retrieve at the same time
+    :param rate_limiter: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter` to use. If not specified, a new
+                         :py:class:`boardgamegeek.ratelimit.AdaptiveRateLimiter` allowing up to
+                         ``requests_per_minute`` requests is created for this client.
+    :param str priority: default priority of the API calls made by this client, one of
+                         :py:data:`boardgamegeek.ratelimit.PRIORITIES`
+    :param object_cache: :py:class:`boardgamegeek.cache.ObjectCache` for the objects built out of the API responses,
+                         ``None`` if disabled
+    :param cache_ttl_policy: :py:class:`boardgamegeek.cache.TTLPolicy` setting for how long the responses of each
+                             endpoint are cached, ``None`` to cache all of them for the ``ttl`` of the ``cache`` URI
+    :param integer negative_cache_ttl: for how many seconds to remember the users, guilds, plays, collections and games
+                                       which weren't found, ``None`` to disable
+    :param str mode: ``"online"``, ``"offline"`` or ``"prefer-cache"``, see :py:data:`boardgamegeek.cache.MODES`
+    :param str xml_parser: parser for the API responses, one of :py:data:`boardgamegeek.utils.XML_PARSERS`. If not
+                           specified, ElementTree is used.
+    :param bool lazy_games: if ``True``, the games decode their data out of the API response when it's first accessed
+                            (see :py:class:`boardgamegeek.loaders.LazyGameData`), instead of when they're created
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
     """
     SEARCH_RPG_ITEM = 1
     SEARCH_VIDEO_GAME = 2
     SEARCH_BOARD_GAME = 4
     SEARCH_BOARD_GAME_EXPANSION = 8
 
-    def __init__(self, api_endpoint, cache, timeout, retries, retry_delay, requests_per_minute):
+    def __init__(self, api_endpoint, cache, timeout, retries, retry_delay, requests_per_minute, rank_table=None,
+                 concurrent_pages=DEFAULT_CONCURRENT_PAGES, rate_limiter=None, priority=None, object_cache=None,
+                 cache_ttl_policy=None, negative_cache_ttl=DEFAULT_NEGATIVE_CACHE_TTL, mode="online", xml_parser=None,
+                 lazy_games=False):
         self._search_api_url = api_endpoint + "/search"
         self._thing_api_url = api_endpoint + "/thing"
         self._guild_api_url = api_endpoint + "/guild"
@@ -74,22 +379,248 @@ class BoardGameGeekNetworkAPI(object):
         self._timeout = timeout
         self._retries = retries
         self._retry_delay = retry_delay
+        self._rank_table = rank_table
+        self._concurrent_pages = concurrent_pages
+
+        if priority is not None and priority not in PRIORITIES:
+            raise BoardGameGeekError("invalid priority: {}".format(priority))
+        self._priority = priority
+        self._object_cache = object_cache
+        self._negative_cache = ObjectCache(ttl=negative_cache_ttl) if negative_cache_ttl else None
+        self._xml_parser = check_xml_parser(xml_parser)
+        self._lazy_games = lazy_games
+
+        if mode not in MODES:
+            raise BoardGameGeekError("invalid mode: {}".format(mode))
 
         if cache:
-            self.requests_session = get_cache_session_from_uri(cache)
+            self.requests_session = get_cache_session_from_uri(cache, ttl_policy=cache_ttl_policy, mode=mode)
+        elif mode != "online":
+            raise BoardGameGeekError("the {} mode requires a cache".format(mode))
         else:
             self.requests_session = requests.Session()
 
+        if rate_limiter is None:
+            rate_limiter = AdaptiveRateLimiter(rpm=requests_per_minute)
+        self._rate_limiter = rate_limiter
+
         # add the rate limiting adapter
-        self.requests_session.mount(api_endpoint, RateLimitingAdapter(rpm=requests_per_minute))
+        self.requests_session.mount(api_endpoint, RateLimitingAdapter(rate_limiter=rate_limiter))
+
+    @property
+    def rate_limiter(self):
+        """
+        :return: the rate limiter used by this client
+        :rtype: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter`
+        """
+        return self._rate_limiter
+
+    def _get(self, url, params, priority=None, retries=None):
+        """
+        Calls the API, returning the parsed response
+
+        :param str url: the API's url
+        :param dict params: the parameters of the call
+        :param str priority: priority of the call, the client's default if not specified
+        :param integer retries: number of retries, the client's default if not specified
+        :return: the root element of the response
+        """
+        return get_parsed_xml_response(self.requests_session,
+                                       url,
+                                       params=_canonical_params(params),
+                                       timeout=self._timeout,
+                                       retries=self._retries if retries is None else retries,
+                                       retry_delay=self._retry_delay,
+                                       priority=priority or self._priority,
+                                       xml_parser=self._xml_parser)
+
+    def _get_streamed(self, url, params, tag, priority=None, retries=None):
+        """
+        Calls the API, parsing the response incrementally
+
+        :param str url: the API's url
+        :param dict params: the parameters of the call
+        :param str tag: the tag of the elements (children of the root element) to return one at a time
+        :param str priority: priority of the call, the client's default if not specified
+        :param integer retries: number of retries, the client's default if not specified
+        :return: tuple (root element, generator of the elements), see
+                 :py:func:`boardgamegeek.utils.get_streamed_xml_response`
+        """
+        return get_streamed_xml_response(self.requests_session,
+                                         url,
+                                         params=_canonical_params(params),
+                                         timeout=self._timeout,
+                                         retries=self._retries if retries is None else retries,
+                                         retry_delay=self._retry_delay,
+                                         priority=priority or self._priority,
+                                         tag=tag,
+                                         xml_parser=self._xml_parser)
+
+    def _get_collection(self, user_name, params, priority=None, retries=None):
+        """
+        Retrieves a collection, adding its items as they're parsed
+
+        :return: ``Collection`` object, ``None`` if the API returned an error
+        """
+        root, items = self._get_streamed(self._collection_api_url, params, "item", priority=priority,
+                                         retries=retries)
+
+        try:
+            if root.tag != "items":
+                # an error (e.g. invalid username), parse it all for create_collection_from_xml to find the error
+                # message
+                for _ in items:
+                    pass
+                collection = create_collection_from_xml(root, user_name)
+            else:
+                collection = create_collection_from_xml(_root_attributes(root), user_name)
+
+            if collection is not None:
+                for item in items:
+                    add_collection_item_from_xml(collection, item)
+        finally:
+            # closes the response, if the items weren't all parsed
+            items.close()
+
+        return collection
+
+    def _cache_key(self, url, params):
+        """
+        Returns the key of an API call in the object caches
+        """
+        return object_cache_key(url, _canonical_params(params))
+
+    def _get_cached_object(self, url, params):
+        """
+        Returns the object built out of an API call, if it's in the object cache
+        """
+        if self._object_cache is None:
+            return None
+        return self._object_cache.get(self._cache_key(url, params))
+
+    def _cache_object(self, url, params, obj):
+        """
+        Adds the object built out of an API call to the object cache
+        """
+        if self._object_cache is not None and obj is not None:
+            self._object_cache.put(self._cache_key(url, params), obj)
+
+    def _remember_rank(self, game):
+        """
+        Adds the rank of a retrieved game to the rank table, if the client was given one
+        """
+        if self._rank_table is not None:
+            self._rank_table[game.id] = game.boardgame_rank
 
-    def _get_game_id(self, name, game_type, choose):
+    def _is_not_found(self, url, params):
+        """
+        Checks if an API call recently found nothing
+        """
+        return self._negative_cache is not None and self._negative_cache.get(self._cache_key(url, params)) is not None
+
+    def _not_found(self, url, params):
+        """
+        Remembers that an API call found nothing, so it's not made again for a while, and returns ``None``
+        """
+        if self._negative_cache is not None:
+            self._negative_cache.put(self._cache_key(url, params), True)
+            # the negative result is only kept for the negative cache's ttl, not the (longer) one of the HTTP cache
+            self._drop_cached_response(url, params)
+        return None
+
+    def _get_game_from_cached_response(self, game_id):
+        """
+        Returns a game out of the cached response of a ``/thing`` call for it, without calling the API
+
+        :return: tuple (game, fallback): the game, ``None`` if the response isn't cached or can't be used, and the game
+                 out of the expired response to use if retrieving it fails (in the ``"prefer-cache"`` mode)
+        """
+        params = _canonical_params(_game_params(game_id))
+        response, fallback = get_cached_response(self.requests_session, self._thing_api_url, params)
+        return self._game_from_response(response, game_id), self._game_from_response(fallback, game_id)
+
+    def _game_from_response(self, response, game_id):
+        """
+        Creates a game out of a (cached) response to a ``/thing`` call
+        """
+        if response is None:
+            return None
+
+        try:
+            games, _ = _create_games_from_batch_xml(xml_fromstring(response.content, self._xml_parser), [game_id],
+                                                    lazy=self._lazy_games)
+        except XML_PARSE_ERRORS:
+            return None
+
+        return games.get(game_id)
+
+    def _cache_game_responses(self, xml_root):
+        """
+        Caches the items of the response to a ``/thing`` call for several games as if each game was requested
+        separately, so that later calls for some of them don't need to request them again
+        """
+        for item in xml_findall(xml_root, "item"):
+            try:
+                game_id = int(item.attrib["id"])
+            except (KeyError, ValueError):
+                continue
+
+            cache_response(self.requests_session, self._thing_api_url, _canonical_params(_game_params(game_id)),
+                           b"<items>" + xml_tostring(item) + b"</items>")
+
+    def _drop_cached_response(self, url, params):
+        """
+        Removes the response of an API call from the HTTP cache, if there's one
+        """
+        cache = getattr(self.requests_session, "cache", None)
+        if cache is not None:
+            # the cached sessions sort the parameters before making the requests
+            params = _canonical_params(params)
+            cache.delete_url(requests.Request("GET", url, params=sorted(params.items())).prepare().url)
+
+    def invalidate(self, user=None, guild_id=None, plays_user=None, plays_game_id=None, collection=None,
+                   game_id=None):
+        """
+        Forgets the cached results of some lookups (including not finding anything), so they're retrieved from BGG
+        the next time.
+
+        :param str user: name of the user
+        :param integer guild_id: id of the guild
+        :param str plays_user: name of the user whose plays to retrieve again (without date filtering)
+        :param integer plays_game_id: id of the game whose plays to retrieve again (without date filtering)
+        :param str collection: name of the user whose collection to retrieve again
+        :param integer game_id: id of the game
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+        """
+        calls = []
+        if user is not None:
+            calls.append((self._user_api_url, _user_params(user)))
+        if guild_id is not None:
+            calls.append((self._guild_api_url, {"id": _guild_id(guild_id), "members": 1}))
+        if plays_user is not None:
+            calls.append((self._plays_api_url, _plays_params(plays_user, None, None, None)))
+        if plays_game_id is not None:
+            calls.append((self._plays_api_url, _plays_params(None, plays_game_id, None, None)))
+        if collection is not None:
+            calls.append((self._collection_api_url, _collection_params(collection)))
+        if game_id is not None:
+            calls.append((self._thing_api_url, _game_params(game_id)))
+
+        for url, params in calls:
+            key = self._cache_key(url, params)
+            for cache in [self._negative_cache, self._object_cache]:
+                if cache is not None:
+                    cache.invalidate(key)
+            self._drop_cached_response(url, params)
+
+    def _get_game_id(self, name, game_type, choose, priority=None):
         """
         Returns the BGG ID of a game, searching by name
 
         :param str name: the name of the game to search for
         :param str game_type: the game type ("rpgitem", "videogame", "boardgame", "boardgameexpansion")
         :param str choose: method of selecting the game by name, when dealing with multiple results. Valid values are "first", "recent" or "best-rank"
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: ``None`` if game wasn't found
         :return: game's id
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid name
@@ -102,27 +633,29 @@ class BoardGameGeekNetworkAPI(object):
             raise BoardGameGeekError("invalid value for parameter 'choose': {}".format(choose))
 
         log.debug("getting game id for '{}'".format(name))
-        res = self.search(name, search_type=[game_type], exact=True)
+        res = self.search(name, search_type=[game_type], exact=True, priority=priority)
 
         if not res:
             return None
 
-        if choose == "first":
-            return res[0].id
-        elif choose == "recent":
-            return max(res, key=lambda x: x.year if x.year is not None else -300000).id
-        else:
-            # getting the best rank requires fetching the data of all games returned
-            game_data = [self.game(game_id=r.id) for r in res]
-            # ...and selecting the one with the best ranking
-            return min(game_data, key=lambda x: x.boardgame_rank if x.boardgame_rank is not None else 10000000000).id
+        ranks = {}
+        if choose == "best-rank":
+            # getting the best rank requires the rank of all the games returned. Use the ones we already know and
+            # fetch the data of the others with as few calls as possible
+            ranks, unknown = _known_ranks(res, self._rank_table)
+            if unknown:
+                for game in self.games_by_id(unknown, priority=priority, on_error=_raise_fetch_error):
+                    ranks[game.id] = game.boardgame_rank
+
+        return _select_game_id(res, choose, ranks)
 
-    def guild(self, guild_id, progress=None):
+    def guild(self, guild_id, progress=None, priority=None):
         """
         Retrieves details about a guild
 
         :param integer guild_id: the id number of the guild
         :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: ``Guild`` object containing the data
         :return: ``None`` if the information couldn't be retrieved
         :rtype: :py:class:`boardgamegeek.guild.Guild`
@@ -132,90 +665,55 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
 
-        try:
-            guild_id = int(guild_id)
-        except:
-            raise BoardGameGeekError("invalid guild id")
+        guild_id = _guild_id(guild_id)
+        params = {"id": guild_id, "members": 1}
+
+        guild = self._get_cached_object(self._guild_api_url, params)
+        if guild is not None or self._is_not_found(self._guild_api_url, params):
+            return guild
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._guild_api_url,
-                                           params={"id": guild_id, "members": 1},
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root = self._get(self._guild_api_url, params=params, priority=priority)
         except BoardGameGeekAPINonXMLError:
-            return None
-
-        if "name" not in root.attrib:
-            log.warn("unable to get guild information (name not found)".format(guild_id))
-            return None
+            return self._not_found(self._guild_api_url, params)
 
-        kwargs = {"name": root.attrib["name"],
-                  "created": root.attrib.get("created"),
-                  "id": guild_id,
-                  "members": []}
+        guild = create_guild_from_xml(root, guild_id)
+        if guild is None:
+            return self._not_found(self._guild_api_url, params)
 
-        # grab initial info from first page
-        for tag in ["category", "website", "manager"]:
-            kwargs[tag] = xml_subelement_text(root, tag)
-
-        kwargs["description"] = xml_subelement_text(root, "description", convert=html_parser.unescape, quiet=True)
-
-        # Grab location info
-        location = root.find("location")
-        if location is not None:
-            kwargs["city"] = xml_subelement_text(location, "city")
-            kwargs["country"] = xml_subelement_text(location, "country")
-            kwargs["postalcode"] = xml_subelement_text(location, "postalcode")
-            kwargs["addr1"] = xml_subelement_text(location, "addr1")
-            kwargs["addr2"] = xml_subelement_text(location, "addr2")
-            kwargs["stateorprovince"] = xml_subelement_text(location, "stateorprovince")
-
-        el = root.find(".//members[@count]")
-        count = int(el.attrib["count"])
-
-        # first page of members has already been retrieved with the initial call
-        for el in root.findall(".//member"):
-            kwargs["members"].append(el.attrib["name"])
+        count = get_guild_member_count_from_xml(root)
 
         def _call_progress_cb():
             if progress is not None:
-                progress(len(kwargs["members"]), count)
+                progress(len(guild), count)
 
         _call_progress_cb()
 
-        page = 2
+        if len(guild) < count:
 
-        while len(kwargs["members"]) < count:
-            added_member = False
-            log.debug("fetching page {}".format(page))
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._guild_api_url,
-                                           params={"id": guild_id, "members": 1, "page": page},
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            def _fetch_page(page):
+                return self._get(self._guild_api_url, params=dict(params, page=page), priority=priority)
 
-            for el in root.findall(".//member"):
-                kwargs["members"].append(el.attrib["name"])
-                added_member = True
+            last_page = get_page_count(count, max(GUILD_MEMBERS_PER_PAGE, len(guild)))
 
-            _call_progress_cb()
+            # stop when a page with no members is found
+            for root in fetch_pages(_fetch_page, 2, last_page,
+                                    concurrency=self._concurrent_pages,
+                                    is_empty=_is_guild_page_empty):
+                add_guild_members_from_xml(guild, root)
+                _call_progress_cb()
 
-            page += 1
-            if not added_member:
-                # didn't add anything anymore? break
-                break
+        self._cache_object(self._guild_api_url, params, guild)
 
-        return Guild(kwargs)
+        return guild
 
-    def user(self, name, progress=None):
+    def user(self, name, progress=None, priority=None):
         """
         Retrieves details about an user
 
         :param str name: user's login name
         :param callable progress: an optional callable for reporting progress when fetching the buddy list/guilds, taking two integers (``current``, ``total``) as arguments
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
 
         :return: ``User`` object
         :rtype: :py:class:`boardgamegeek.user.User`
@@ -227,80 +725,28 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
 
-        if not name:
-            raise BoardGameGeekError("no user name specified")
+        params = _user_params(name)
 
-        params = {"name": name, "buddies": 1, "guilds": 1, "hot": 1, "top": 1}
+        user = self._get_cached_object(self._user_api_url, params)
+        if user is not None or self._is_not_found(self._user_api_url, params):
+            return user
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._user_api_url,
-                                           params=params,
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root = self._get(self._user_api_url, params=params, priority=priority)
         except BoardGameGeekAPINonXMLError:
             # if the api doesn't return XML, assume the user wasn't found
-            return None
-
-        # when the user is not found, the API returns an response, but with most fields empty. id is empty too
-        try:
-            kwargs = {"name": root.attrib["name"],
-                      "id": int(root.attrib["id"])}
-        except:
-            return None
+            return self._not_found(self._user_api_url, params)
 
-        for i in ["firstname", "lastname", "avatarlink",
-                  "stateorprovince", "country", "webaddress", "xboxaccount",
-                  "wiiaccount", "steamaccount", "psnaccount", "traderating"]:
-            kwargs[i] = xml_subelement_attr(root, i)
-
-        kwargs["lastlogin"] = xml_subelement_attr(root,
-                                                  "lastlogin",
-                                                  convert=lambda x: datetime.datetime.strptime(x, "%Y-%m-%d"),
-                                                  quiet=True)
-
-        kwargs["yearregistered"] = xml_subelement_attr(root, "yearregistered", convert=int, quiet=True)
-
-        user = User(kwargs)
-
-        # add top items
-        for top_item in root.findall(".//top/item"):
-            user.add_top_item({"id": int(top_item.attrib["id"]),
-                                "name": top_item.attrib["name"]})
-
-        # add hot items
-        for hot_item in root.findall(".//hot/item"):
-            user.add_hot_item({"id": int(hot_item.attrib["id"]),
-                                "name": hot_item.attrib["name"]})
-
-        total_buddies = 0
-        total_guilds = 0
-
-        buddies = root.find("buddies")
-        if buddies is not None:
-            total_buddies = int(buddies.attrib["total"])
-            if total_buddies > 0:
-                # add the buddies from the first page
-                for buddy in buddies.findall(".//buddy"):
-                    user.add_buddy({"name": buddy.attrib["name"],
-                                    "id": buddy.attrib["id"]})
-
-        guilds = root.find("guilds")
-        if guilds is not None:
-            total_guilds = int(guilds.attrib["total"])
-            if total_guilds > 0:
-                # add the guilds from the first page
-                for guild in guilds.findall(".//guild"):
-                    user.add_guild({"name": guild.attrib["name"],
-                                    "id": guild.attrib["id"]})
+        user = create_user_from_xml(root)
+        if user is None:
+            return self._not_found(self._user_api_url, params)
 
         # It seems that the BGG API can return more results than what's specified in the documentation (they say
         # page size is 100, but for an user with 114 friends, all buddies are there on the first page).
         # Therefore, we'll keep fetching pages until we reach the number of items we're expecting or we don't get
         # any more data
 
-        max_items_to_fetch = max(total_buddies, total_guilds)
+        max_items_to_fetch = max(get_user_buddy_and_guild_count_from_xml(root))
 
         def _call_progress_cb():
             if progress is not None:
@@ -308,36 +754,25 @@ class BoardGameGeekNetworkAPI(object):
 
         _call_progress_cb()
 
-        page = 2
-        while max(user.total_buddies, user.total_guilds) < max_items_to_fetch:
-            added_buddy = False
-            added_guild = False
-            params["page"] = page
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._user_api_url,
-                                           params=params,
-                                           timeout=self._timeout)
-
-            for buddy in root.findall(".//buddy"):
-                user.add_buddy({"name": buddy.attrib["name"],
-                                "id": buddy.attrib["id"]})
-                added_buddy = True
-
-            for guild in root.findall(".//guild"):
-                user.add_guild({"name": guild.attrib["name"],
-                                "id": guild.attrib["id"]})
-                added_guild = True
-
-            _call_progress_cb()
-            page += 1
-
-            if not added_buddy and not added_guild:
-                log.debug("didn't add any buddy/guild after fetching page {}, stopping here".format(page))
-                break
+        if max(user.total_buddies, user.total_guilds) < max_items_to_fetch:
+
+            def _fetch_page(page):
+                return self._get(self._user_api_url, params=dict(params, page=page), priority=priority)
+
+            items_per_page = max(USER_ITEMS_PER_PAGE, user.total_buddies, user.total_guilds)
+            last_page = get_page_count(max_items_to_fetch, items_per_page)
+
+            for root in fetch_pages(_fetch_page, 2, last_page,
+                                    concurrency=self._concurrent_pages,
+                                    is_empty=_is_user_page_empty):
+                add_user_buddies_and_guilds_from_xml(user, root)
+                _call_progress_cb()
+
+        self._cache_object(self._user_api_url, params, user)
 
         return user
 
-    def plays(self, name=None, game_id=None, progress=None, min_date=None, max_date=None):
+    def plays(self, name=None, game_id=None, progress=None, min_date=None, max_date=None, priority=None):
         """
         Retrieves the plays for an user (if using ``name``) or for a game (if using ``game_id``)
 
@@ -346,6 +781,7 @@ class BoardGameGeekNetworkAPI(object):
         :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
         :param datetime.date min_date: return only plays of the specified date or later.
         :param datetime.date max_date: return only plays of the specified date or earlier.
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
 
         :return: object containing all the plays
         :rtype: :py:class:`boardgamegeek.plays.Plays`
@@ -356,96 +792,33 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
 
         """
-        if not name and not game_id:
-            raise BoardGameGeekError("no user name specified")
-
-        if name and game_id:
-            raise BoardGameGeekError("can't retrieve by user and by game at the same time")
+        params = _plays_params(name, game_id, min_date, max_date)
 
-        if name:
-            params = {"username": name}
-        else:
-            try:
-                params = {"id": int(game_id)}
-            except:
-                raise BoardGameGeekError("invalid game id")
-
-        if min_date:
-            try:
-                params["mindate"] = min_date.isoformat()
-            except AttributeError:
-                raise BoardGameGeekError("mindate must be a datetime.date object")
-
-        if max_date:
-            try:
-                params["maxdate"] = max_date.isoformat()
-            except AttributeError:
-                raise BoardGameGeekError("maxdate must be a datetime.date object")
+        plays = self._get_cached_object(self._plays_api_url, params)
+        if plays is not None or self._is_not_found(self._plays_api_url, params):
+            return plays
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._plays_api_url,
-                                           params=params,
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root, play_elements = self._get_streamed(self._plays_api_url, params, "play", priority=priority)
         except BoardGameGeekAPINonXMLError as e:
             # The API seems to return HTML in case of an invalid username.
             # just return None for the time being.
             log.error("error trying to fetch plays: {}".format(e))
-            return None
+            return self._not_found(self._plays_api_url, params)
 
         try:
-            # in case of error, the root node doesn't have a 'total' attribute
-            count = int(root.attrib["total"])   # how many plays
-        except:
-            return None
+            plays = create_plays_from_xml(_root_attributes(root), game_id=params.get("id"))
+            if plays is None:
+                return self._not_found(self._plays_api_url, params)
 
-        if name:
-            plays = Plays({"username": root.attrib["username"],
-                           "user_id": int(root.attrib["userid"])})
-        else:
-            plays = Plays({"game_id": game_id})
-
-        def _add_plays(plays, root):
-            added_plays = False
-            for play in root.findall(".//play"):
-                added_plays = True
-
-                # if we're listing plays by game, each <play> has an userid. If this isn't set, we must be listing
-                # an user's collection, thus set it from plays.user_id
-                userid = int(play.attrib.get("userid", plays.user_id))
-
-                player_list = []
-                # TODO: add the game subtype too
-                kwargs = {"id": int(play.attrib["id"]),
-                          "date": play.attrib["date"],
-                          "quantity": int(play.attrib["quantity"]),
-                          "duration": int(play.attrib["length"]),
-                          "incomplete": int(play.attrib["incomplete"]),
-                          "nowinstats": int(play.attrib["nowinstats"]),
-                          "user_id": userid,
-                          "game_id": xml_subelement_attr(play, "item", attribute="objectid", convert=int),
-                          "game_name": xml_subelement_attr(play, "item", attribute="name"),
-                          "comment": xml_subelement_text(play, "comments"),
-                          "players": player_list}
-
-                for player in play.findall(".//player"):
-                    player_data = {"username": player.attrib.get("username"),
-                                   "user_id": int(player.attrib.get("userid", -1)),
-                                   "name": player.attrib.get("name"),
-                                   "startposition": player.attrib.get("startposition"),
-                                   "new": player.attrib.get("new"),
-                                   "win": player.attrib.get("win"),
-                                   "rating": player.attrib.get("rating"),
-                                   "score": player.attrib.get("score")}
-
-                    player_list.append(player_data)
-                plays.add_play(kwargs)
-
-            return added_plays
-
-        _add_plays(plays, root)
+            # the plays are added as they're parsed, without keeping the whole response in memory
+            for play in play_elements:
+                add_play_from_xml(plays, play)
+        finally:
+            # closes the response, if the plays weren't all parsed
+            play_elements.close()
+
+        count = get_plays_count_from_xml(root)
 
         def _call_progress_cb():
             if progress is not None:
@@ -453,33 +826,35 @@ class BoardGameGeekNetworkAPI(object):
 
         _call_progress_cb()
 
-        page = 2
-        while len(plays) < count:
-            log.debug("fetching page {} of plays".format(page))
+        if len(plays) < count:
 
-            params["page"] = page
+            def _fetch_page(page):
+                log.debug("fetching page {} of plays".format(page))
 
-            # fetch the next pages of plays
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._plays_api_url,
-                                           params=params,
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+                # fetch the next pages of plays. Pages can be retrieved concurrently, so keep just the <play> elements
+                _, page_plays = self._get_streamed(self._plays_api_url, dict(params, page=page), "play",
+                                                   priority=priority)
+                return list(page_plays)
 
-            if not _add_plays(plays, root):
-                break
+            last_page = get_page_count(count, PLAYS_PER_PAGE)
 
-            page += 1
-            _call_progress_cb()
+            for page_plays in fetch_pages(_fetch_page, 2, last_page,
+                                          concurrency=self._concurrent_pages,
+                                          is_empty=lambda page_plays: not page_plays):
+                for play in page_plays:
+                    add_play_from_xml(plays, play)
+                _call_progress_cb()
+
+        self._cache_object(self._plays_api_url, params, plays)
 
         return plays
 
-    def hot_items(self, item_type):
+    def hot_items(self, item_type, priority=None):
         """
         Return the list of "Hot Items"
 
         :param str item_type: hot item type. Valid values: "boardgame", "rpg", "videogame", "boardgameperson", "rpgperson", "boardgamecompany", "rpgcompany", "videogamecompany")
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
 
         :return: ``HotItems`` object
         :rtype: :py:class:`boardgamegeek.hotitems.HotItems`
@@ -490,39 +865,22 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
-        if item_type not in HOT_ITEM_CHOICES:
-            raise BoardGameGeekError("invalid type specified")
-
-        params = {"type": item_type}
+        params = _hot_items_params(item_type)
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._hot_api_url,
-                                           params=params,
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root = self._get(self._hot_api_url, params=params, priority=priority)
         except BoardGameGeekAPINonXMLError:
             # if the api doesn't return XML, assume there was some error
             return None
 
-        hot_items = HotItems({})
-
-        for item in root.findall("item"):
-            kwargs = {"name": xml_subelement_attr(item, "name"),
-                      "id": int(item.attrib["id"]),
-                      "rank": int(item.attrib["rank"]),
-                      "yearpublished": xml_subelement_attr(item, "yearpublished", convert=int, quiet=True),
-                      "thumbnail": xml_subelement_attr(item, "thumbnail")}
-            hot_items.add_hot_item(kwargs)
-
-        return hot_items
+        return create_hot_items_from_xml(root)
 
-    def collection(self, user_name):
+    def collection(self, user_name, priority=None):
         """
         Returns the user's game collection
 
         :param str user_name: user name to retrieve the collection for
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: ``Collection`` object
         :rtype: :py:class:`boardgamegeek.collection.Collection`
         :return: ``None`` if user not found
@@ -532,62 +890,122 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
-        if not user_name:
-            raise BoardGameGeekError("no user name specified")
+        params = _collection_params(user_name)
+
+        collection = self._get_cached_object(self._collection_api_url, params)
+        if collection is not None or self._is_not_found(self._collection_api_url, params):
+            return collection
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._collection_api_url,
-                                           params={"username": user_name, "stats": 1},
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            collection = self._get_collection(user_name, params, priority=priority)
         except BoardGameGeekAPINonXMLError:
-            return None
-
-        # check if there's an error (e.g. invalid username)
-        error = root.find(".//error")
-        if error is not None:
-            message = xml_subelement_text(error, "message")
-            log.error("error fetching collection for {}: {}".format(user_name, message))
-            return None
+            return self._not_found(self._collection_api_url, params)
 
-        collection = Collection({"owner": user_name, "items": []})
-
-        # search for all boardgames in the collection, add them to the list
-        for xml_el in root.findall(".//item[@subtype='boardgame']"):
-            # get the user's rating for this game in his collection
-            stats = xml_el.find("stats")
-            rating = xml_subelement_attr(stats, "rating", convert=float, quiet=True)
-
-            # name and id of the game in collection
-            game = {"name": xml_subelement_text(xml_el, "name"),
-                    "id": int(xml_el.attrib.get("objectid")),
-                    "rating": rating}
-
-            status = xml_el.find("status")
-            game.update({stat: status.attrib.get(stat) for stat in ["lastmodified",
-                                                                    "own",
-                                                                    "preordered",
-                                                                    "prevowned",
-                                                                    "want",
-                                                                    "wanttobuy",
-                                                                    "wanttoplay",
-                                                                    "fortrade",
-                                                                    "wishlist",
-                                                                    "wishlistpriority"]})
-
-            collection.add_game(game)
+        if collection is None:
+            return self._not_found(self._collection_api_url, params)
+        self._cache_object(self._collection_api_url, params, collection)
 
         return collection
 
-    def search(self, query, search_type=None, exact=False):
+    def collections(self, user_names, max_polls=DEFAULT_COLLECTION_POLLS, poll_delay=None, on_error=None,
+                    priority=None):
+        """
+        Retrieves the collections of several users.
+
+        The API answers with HTTP 202 while it prepares a collection, so instead of waiting for each collection in
+        turn, all of them are requested up front and the ones which weren't ready are requested again, round-robin,
+        until they are. The collections are returned as soon as they're retrieved.
+
+        Failing to retrieve a collection doesn't abort the whole operation: the error is reported for that user (to
+        ``on_error`` if specified, logged otherwise) and the remaining collections are still returned.
+
+        :param list user_names: the names of the users to retrieve the collections for
+        :param integer max_polls: how many times to request a collection before giving up
+        :param float poll_delay: minimum number of seconds between two requests for the same collection. If not
+                                 specified, the client's ``retry_delay`` is used.
+        :param callable on_error: an optional callable taking an user name and the exception raised while trying to retrieve the collection
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: generator yielding (user name, ``Collection``) tuples, in the order in which the collections are retrieved. The ``Collection`` is ``None`` if the user wasn't found
+        :rtype: generator of (str, :py:class:`boardgamegeek.collection.Collection`) tuples
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+        """
+        # validate all the names before starting
+        pending = [(user_name, _collection_params(user_name)) for user_name in user_names]
+
+        if max_polls < 1:
+            raise BoardGameGeekError("invalid number of polls")
+
+        if poll_delay is None:
+            poll_delay = self._retry_delay
+
+        def _report_error(user_name, error):
+            if on_error is not None:
+                on_error(user_name, error)
+            else:
+                log.warning("couldn't retrieve the collection of {}: {}".format(user_name, error))
+
+        def _poll(user):
+            user_name, params = user
+
+            collection = self._get_cached_object(self._collection_api_url, params)
+            if collection is not None or self._is_not_found(self._collection_api_url, params):
+                return collection, None
+
+            try:
+                # no retries, the collections which aren't ready are requested again in the next round
+                collection = self._get_collection(user_name, params, priority=priority, retries=0)
+            except BoardGameGeekAPINonXMLError:
+                return self._not_found(self._collection_api_url, params), None
+            except (BoardGameGeekAPIRetryError, BoardGameGeekAPIError, BoardGameGeekTimeoutError,
+                    BoardGameGeekCacheMissError, BoardGameGeekRateLimitQueueFullError) as e:
+                return None, e
+
+            if collection is None:
+                return self._not_found(self._collection_api_url, params), None
+            self._cache_object(self._collection_api_url, params, collection)
+
+            return collection, None
+
+        for poll in range(max_polls):
+            round_start = time.time()
+            not_ready = []
+
+            for user, (collection, error) in fetch_as_completed(_poll, pending, concurrency=self._concurrent_pages):
+                user_name, params = user
+
+                # the rate limiter's queue being full is temporary too, the collection is requested again later
+                if isinstance(error, (BoardGameGeekAPIRetryError, BoardGameGeekTimeoutError,
+                                      BoardGameGeekRateLimitQueueFullError)):
+                    if poll < max_polls - 1:
+                        not_ready.append(user)
+                    else:
+                        msg = "collection not ready after {} requests".format(max_polls)
+                        _report_error(user_name, BoardGameGeekAPIRetryError(msg))
+                elif error is not None:
+                    _report_error(user_name, error)
+                else:
+                    yield user_name, collection
+
+            pending = not_ready
+            if not pending:
+                break
+
+            log.debug("{} collections not ready yet".format(len(pending)))
+
+            # don't request the same collection again too soon
+            need_to_wait = poll_delay - (time.time() - round_start)
+            if need_to_wait > 0:
+                time.sleep(need_to_wait)
+
+    def search(self, query, search_type=None, exact=False, priority=None):
         """
         Search for a game
 
         :param str query: the string to search for
         :param str search_type: list of strings indicating what to search for. Valid contained values are: "rpgitem", "videogame", "boardgame" (default), "boardgameexpansion"
         :param bool exact: if True, try to match the name exactly
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: list of ``SearchResult``
         :rtype: list of :py:class:`boardgamegeek.search.SearchResult`
 
@@ -596,68 +1014,15 @@ class BoardGameGeekNetworkAPI(object):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
-        if not query:
-            raise BoardGameGeekError("invalid query string")
-
-        if search_type is None:
-            search_type = ["boardgame"]
-
-        params = {"query": query}
-
-        if type(search_type) != list:
-            warnings.warn("numeric values for the `search_type` parameter will no longer be supported in future versions. See the documentation for details",
-                          UserWarning)
-
-            s_type = []
-
-            if search_type:
-                if search_type & BoardGameGeekNetworkAPI.SEARCH_BOARD_GAME:
-                    s_type.append("boardgame")
-                if search_type & BoardGameGeekNetworkAPI.SEARCH_BOARD_GAME_EXPANSION:
-                    s_type.append("boardgameexpansion")
-                if search_type & BoardGameGeekNetworkAPI.SEARCH_RPG_ITEM:
-                    s_type.append("rpgitem")
-                if search_type & BoardGameGeekNetworkAPI.SEARCH_VIDEO_GAME:
-                    s_type.append("videogame")
-
-            if s_type:
-                params["type"] = ",".join(s_type)
-        else:
-            if search_type:
-                for s in search_type:
-                    if s not in ["rpgitem", "videogame", "boardgame", "boardgameexpansion"]:
-                        raise BoardGameGeekError("invalid search type: {}".format(search_type))
-
-                params["type"] = ",".join(search_type)
-
-        if exact:
-            params["exact"] = 1
+        params = _search_params(query, search_type, exact)
 
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._search_api_url,
-                                           params=params,
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root = self._get(self._search_api_url, params=params, priority=priority)
         except BoardGameGeekAPINonXMLError:
             # if the api doesn't return XML, assume there was some error
             return None
 
-        results = []
-        for item in root.findall("item"):
-            kwargs = {"id": item.attrib["id"],
-                      "name": xml_subelement_attr(item, "name"),
-                      "yearpublished": fix_unsigned_negative(xml_subelement_attr(item,
-                                                                                 "yearpublished",
-                                                                                 default=0,
-                                                                                 convert=int,
-                                                                                 quiet=True)),
-                      "type": item.attrib["type"]}
-
-            results.append(SearchResult(kwargs))
-
-        return results
+        return create_search_results_from_xml(root)
 
 
 class BoardGameGeek(BoardGameGeekNetworkAPI):
@@ -673,6 +1038,37 @@ class BoardGameGeek(BoardGameGeekNetworkAPI):
         :param retry_delay: Time to sleep between retries when the API returns HTTP 202 (retry)
         :param disable_ssl: If true, use HTTP instead of HTTPS for calling the BGG API
         :param requests_per_minute: how many requests per minute to allow to go out to BGG (throttle prevention)
+        :param rank_table: dictionary mapping game ids to their board game rank, used when selecting games by rank
+                           (``choose="best-rank"``). The ranks of retrieved games are added to it. If not specified,
+                           the ranks aren't kept.
+        :param concurrent_pages: how many pages to retrieve at the same time when fetching paginated data (plays,
+                                 guild members, user's buddies and guilds)
+        :param rate_limiter: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter` deciding when requests can be
+                             made. If not specified, each client gets its own
+                             :py:class:`boardgamegeek.ratelimit.AdaptiveRateLimiter` allowing up to
+                             ``requests_per_minute`` requests, which slows down when BGG starts throttling the
+                             requests. Pass the same limiter to several clients to make them share the budget.
+        :param priority: default priority of the API calls made by this client (``"interactive"``, ``"normal"`` or
+                         ``"bulk"``). When the rate limit is reached, the calls with higher priorities are made first.
+                         Each API call can override it using its ``priority`` parameter.
+        :param object_cache: :py:class:`boardgamegeek.cache.ObjectCache` keeping the objects built out of the API
+                             responses (games, users, collections, plays, guilds), so that retrieving them again skips
+                             parsing the responses. ``None`` (default) to disable.
+        :param cache_ttl_policy: :py:class:`boardgamegeek.cache.TTLPolicy` setting for how long the responses of each
+                                 API endpoint are cached (e.g. longer for game information than for the hot items),
+                                 overriding the ``ttl`` of the ``cache`` URI.
+        :param negative_cache_ttl: for how many seconds to remember the users, guilds, plays, collections and games
+                                   which weren't found, returning ``None`` for them without calling the API again.
+                                   ``None`` to disable. Use :py:meth:`invalidate` to forget them sooner.
+        :param mode: ``"online"`` (default) to call the API when the responses aren't cached, ``"offline"`` to only
+                     use the cached responses (regardless of their age), raising
+                     :py:exc:`boardgamegeek.exceptions.BoardGameGeekCacheMissError` for the ones which aren't cached,
+                     or ``"prefer-cache"`` to use the expired responses when they can't be refreshed (network errors,
+                     timeouts, BGG being unavailable), instead of failing or retrying.
+        :param xml_parser: ``"etree"`` (default) to parse the API responses with ElementTree, or ``"lxml"`` to use lxml
+        :param lazy_games: if ``True``, the games keep a reference to their part of the API response and decode each
+                           piece of information the first time it's accessed, which is faster when only some of it
+                           is used. The games behave the same way otherwise.
 
         Example usage::
 
@@ -684,7 +1080,10 @@ class BoardGameGeek(BoardGameGeekNetworkAPI):
             >>> bgg_sqlite_cache = BoardGameGeek(cache="sqlite:///path/to/cache.db?ttl=3600")
 
     """
-    def __init__(self, cache="memory:///?ttl=3600", timeout=15, retries=3, retry_delay=5, disable_ssl=False, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    def __init__(self, cache="memory:///?ttl=3600", timeout=15, retries=3, retry_delay=5, disable_ssl=False, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 rank_table=None, concurrent_pages=DEFAULT_CONCURRENT_PAGES, rate_limiter=None, priority=None,
+                 object_cache=None, cache_ttl_policy=None, negative_cache_ttl=DEFAULT_NEGATIVE_CACHE_TTL,
+                 mode="online", xml_parser=None, lazy_games=False):
 
         api_endpoint = "http{}://www.boardgamegeek.com/xmlapi2".format("" if disable_ssl else "s")
         super(BoardGameGeek, self).__init__(api_endpoint=api_endpoint,
@@ -692,14 +1091,25 @@ class BoardGameGeek(BoardGameGeekNetworkAPI):
                                             timeout=timeout,
                                             retries=retries,
                                             retry_delay=retry_delay,
-                                            requests_per_minute=requests_per_minute)
-
-    def get_game_id(self, name, choose="first"):
+                                            requests_per_minute=requests_per_minute,
+                                            rank_table=rank_table,
+                                            concurrent_pages=concurrent_pages,
+                                            rate_limiter=rate_limiter,
+                                            priority=priority,
+                                            object_cache=object_cache,
+                                            cache_ttl_policy=cache_ttl_policy,
+                                            negative_cache_ttl=negative_cache_ttl,
+                                            mode=mode,
+                                            xml_parser=xml_parser,
+                                            lazy_games=lazy_games)
+
+    def get_game_id(self, name, choose="first", priority=None):
         """
         Returns the BGG ID of a game, searching by name
 
         :param str name: The name of the game to search for
         :param str choose: method of selecting the game by name, when dealing with multiple results. Valid values are "first", "recent" or "best-rank"
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: the game's id
         :rtype: integer
         :return: ``None`` if game wasn't found
@@ -708,15 +1118,16 @@ class BoardGameGeek(BoardGameGeekNetworkAPI):
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
-        return self._get_game_id(name, game_type="boardgame", choose=choose)
+        return self._get_game_id(name, game_type="boardgame", choose=choose, priority=priority)
 
-    def game(self, name=None, game_id=None, choose="first"):
+    def game(self, name=None, game_id=None, choose="first", priority=None):
         """
         Get information about a game.
 
         :param str name: If not None, get information about a game with this name
         :param integer game_id:  If not None, get information about a game with this id
         :param str choose: method of selecting the game by name, when dealing with multiple results. Valid values are "first", "recent" or "best-rank"
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
         :return: ``BoardGame`` object
         :rtype: :py:class:`boardgamegeek.games.BoardGame`
         :return: ``None`` if the game wasn't found
@@ -731,114 +1142,133 @@ class BoardGameGeek(BoardGameGeekNetworkAPI):
             raise BoardGameGeekError("game name or id not specified")
 
         if game_id is None:
-            game_id = self.get_game_id(name, choose=choose)
+            game_id = self.get_game_id(name, choose=choose, priority=priority)
             if game_id is None:
                 log.error("couldn't find any game named '{}'".format(name))
                 return None
 
         log.debug("retrieving game id {}{}".format(game_id, " ({})".format(name) if name is not None else ""))
 
+        params = _game_params(game_id)
+
+        game = self._get_cached_object(self._thing_api_url, params)
+        if game is not None or self._is_not_found(self._thing_api_url, params):
+            return game
+
         try:
-            root = get_parsed_xml_response(self.requests_session,
-                                           self._thing_api_url,
-                                           params={"id": game_id, "stats": 1},
-                                           timeout=self._timeout,
-                                           retries=self._retries,
-                                           retry_delay=self._retry_delay)
+            root = self._get(self._thing_api_url, params=params, priority=priority)
         except BoardGameGeekAPINonXMLError:
-            return None
+            return self._not_found(self._thing_api_url, params)
 
-        # xml is structured like <item ...> blablabla><item>..
-        root = root.find("item")
+        # xml is structured like <item ...> blablabla><item>.., with no <item> if there's no game with this id
+        root = xml_find(root, "item")
         if root is None:
-            msg = "error parsing game data for game id: {}{}".format(game_id,
-                                                                      " ({})".format(name) if name is not None else "")
-            raise BoardGameGeekAPIError(msg)
-
-        game_type = root.attrib["type"]
-        if game_type not in ["boardgame", "boardgameexpansion"]:
-            log.debug("item id {} is not a boardgame (type: {})".format(game_id, game_type))
-            raise BoardGameGeekError("item is not a board game")
-
-        kwargs = {"id": game_id,
-                  "thumbnail": xml_subelement_text(root, "thumbnail"),
-                  "image": xml_subelement_text(root, "image"),
-                  "expansion": game_type == "boardgameexpansion",       # is this game an expansion?
-                  "families": xml_subelement_attr_list(root, ".//link[@type='boardgamefamily']"),
-                  "categories": xml_subelement_attr_list(root, ".//link[@type='boardgamecategory']"),
-                  "implementations": xml_subelement_attr_list(root, ".//link[@type='boardgameimplementation']"),
-                  "mechanics": xml_subelement_attr_list(root, ".//link[@type='boardgamemechanic']"),
-                  "designers": xml_subelement_attr_list(root, ".//link[@type='boardgamedesigner']"),
-                  "artists": xml_subelement_attr_list(root, ".//link[@type='boardgameartist']"),
-                  "publishers": xml_subelement_attr_list(root, ".//link[@type='boardgamepublisher']")}
-
-        expands = []        # list of items this game expands
-        expansions = []     # list of expansions this game has
-        for e in root.findall(".//link[@type='boardgameexpansion']"):
-            item = {"id": e.attrib["id"],
-                    "name": e.attrib["value"]}
-
-            if e.attrib.get("inbound", "false").lower()[0] == 't':
-                # this is an item expanded by game_id
-                expands.append(item)
+            log.error("couldn't find any game with id {}{}".format(game_id,
+                                                                   " ({})".format(name) if name is not None else ""))
+            return self._not_found(self._thing_api_url, params)
+
+        game = create_game_from_xml(root, game_id=game_id, lazy=self._lazy_games)
+        self._remember_rank(game)
+        self._cache_object(self._thing_api_url, params, game)
+
+        return game
+
+    def games_by_id(self, game_ids, batch_size=DEFAULT_THING_BATCH_SIZE, progress=None, on_error=None,
+                    priority=None):
+        """
+        Get information about several games, fetching up to ``batch_size`` of them with a single API call.
+
+        Failing to retrieve a game doesn't abort the whole operation: the error is reported for that id (to
+        ``on_error`` if specified, logged otherwise) and the remaining games are still returned.
+
+        :param list game_ids: ids of the games to retrieve
+        :param integer batch_size: how many games to request with each API call
+        :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
+        :param callable on_error: an optional callable taking a game id and the exception raised while trying to retrieve it
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: list of ``BoardGame`` objects, in the order in which they were requested
+        :rtype: list of :py:class:`boardgamegeek.games.BoardGame`
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid game ids or batch size
+        """
+        batch_size = _batch_size(batch_size)
+        ids, unique_ids = _game_ids(game_ids)
+
+        def _report_error(game_id, error):
+            if on_error is not None:
+                on_error(game_id, error)
             else:
-                expansions.append(item)
-
-        kwargs["expansions"] = expansions
-        kwargs["expands"] = expands
-        kwargs["description"] = xml_subelement_text(root, "description", convert=html_parser.unescape, quiet=True)
-
-        # These XML elements have a numberic value, attempt to convert them to integers
-        for i in ["yearpublished", "minplayers", "maxplayers", "playingtime", "minage"]:
-            kwargs[i] = xml_subelement_attr(root, i, convert=int, quiet=True)
-
-        # What's the name of the game :P
-        kwargs["name"] = xml_subelement_attr(root, ".//name[@type='primary']")
-
-        # Get alternative names too
-        kwargs["alternative_names"] = xml_subelement_attr_list(root, ".//name[@type='alternate']")
-
-        # look for statistics info
-        stats = root.find(".//ratings")
-        kwargs.update({
-            "usersrated": xml_subelement_attr(stats, "usersrated", convert=int, quiet=True),
-            "average": xml_subelement_attr(stats, "average", convert=float, quiet=True),
-            "bayesaverage": xml_subelement_attr(stats, "bayesaverage", convert=float, quiet=True),
-            "stddev": xml_subelement_attr(stats, "stddev", convert=float, quiet=True),
-            "median": xml_subelement_attr(stats, "median", convert=float, quiet=True),
-            "owned": xml_subelement_attr(stats, "owned", convert=int, quiet=True),
-            "trading": xml_subelement_attr(stats, "trading", convert=int, quiet=True),
-            "wanting": xml_subelement_attr(stats, "wanting", convert=int, quiet=True),
-            "wishing": xml_subelement_attr(stats, "wishing", convert=int, quiet=True),
-            "numcomments": xml_subelement_attr(stats, "numcomments", convert=int, quiet=True),
-            "numweights": xml_subelement_attr(stats, "numweights", convert=int, quiet=True),
-            "averageweight": xml_subelement_attr(stats, "averageweight", convert=float, quiet=True)
-        })
-
-        kwargs["ranks"] = []
-        ranks = root.findall(".//rank")
-        for rank in ranks:
+                log.warning("couldn't retrieve game id {}: {}".format(game_id, error))
+
+        games = {}
+        fallbacks = {}          # game id -> game out of the expired response, used if retrieving it fails
+
+        # the games in the object cache or in the HTTP cache aren't requested again (they're cached individually,
+        # like the ones retrieved with game())
+        for game_id in unique_ids:
+            game = self._get_cached_object(self._thing_api_url, _game_params(game_id))
+            if game is None:
+                game, fallback = self._get_game_from_cached_response(game_id)
+                if game is not None:
+                    self._remember_rank(game)
+                    self._cache_object(self._thing_api_url, _game_params(game_id), game)
+                elif fallback is not None:
+                    fallbacks[game_id] = fallback
+            if game is not None:
+                games[game_id] = game
+
+        to_fetch = [game_id for game_id in unique_ids if game_id not in games]
+
+        for i in range(0, len(to_fetch), batch_size):
+            batch = to_fetch[i:i + batch_size]
+
+            log.debug("retrieving game ids {}".format(batch))
+
             try:
-                rank_value = int(rank.attrib.get("value"))
-            except:
-                rank_value = None
-            kwargs["ranks"].append({"name": rank.attrib.get("name"),
-                                    "friendlyname": rank.attrib.get("friendlyname"),
-                                    "value": rank_value})
+                root = self._get(self._thing_api_url, params=_thing_batch_params(batch), priority=priority)
+            except (BoardGameGeekAPIError, BoardGameGeekTimeoutError, BoardGameGeekCacheMissError,
+                    BoardGameGeekRateLimitQueueFullError) as e:
+                for game_id in batch:
+                    if game_id in fallbacks:
+                        log.warning("error retrieving game id {}, using the expired response: {}".format(game_id, e))
+                        games[game_id] = fallbacks[game_id]
+                    else:
+                        _report_error(game_id, e)
+                continue
+
+            if len(batch) > 1:
+                self._cache_game_responses(root)
+
+            batch_games, batch_errors = _create_games_from_batch_xml(root, batch, lazy=self._lazy_games)
+
+            for game_id in batch:
+                if game_id in batch_games:
+                    games[game_id] = batch_games[game_id]
+                    self._remember_rank(games[game_id])
+                    self._cache_object(self._thing_api_url, _game_params(game_id), games[game_id])
+                else:
+                    _report_error(game_id, batch_errors[game_id])
+
+            if progress is not None:
+                progress(len(unique_ids) - len(to_fetch) + min(i + batch_size, len(to_fetch)), len(unique_ids))
 
-        return BoardGame(kwargs)
+        return [games[game_id] for game_id in ids if game_id in games]
 
-    def games(self, name):
+    def games(self, name, priority=None):
         """
         Return a list containing all games with the given name
 
         :param str name: the name of the game to search for
-        :return: list of :py:class:`boardgamegeek.games.BoardGame`
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: list of :py:class:`boardgamegeek.games.BoardGame`, without the games which weren't found
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
         """
-        return [self.game(game_id=s.id)
-                for s in self.search(name,
-                                     search_type=["boardgame", "boardgameexpansion"],
-                                     exact=True)]
+        return self.games_by_id([s.id
+                                 for s in self.search(name,
+                                                      search_type=["boardgame", "boardgameexpansion"],
+                                                      exact=True,
+                                                      priority=priority)],
+                                on_error=_raise_fetch_error,
+                                priority=priority)
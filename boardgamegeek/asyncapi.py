@@ -0,0 +1,725 @@
+# coding: utf-8
+"""
+:mod:`boardgamegeek.asyncapi` - asyncio client
+==============================================
+
+This module contains a client for the BoardGameGeek API which doesn't block the asyncio event loop. It returns the
+same objects as :py:class:`boardgamegeek.api.BoardGameGeek`.
+
+Requires Python 3.5+ and the ``aiohttp`` package (``pip install boardgamegeek[async]``).
+
+.. module:: boardgamegeek.asyncapi
+   :platform: Unix, Windows
+   :synopsis: asyncio interface to the BoardGameGeek API
+
+.. moduleauthor:: Cosmin Luță <q4break@gmail.com>
+"""
+import asyncio
+import functools
+import logging
+from urllib.parse import urlparse
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .api import DEFAULT_THING_BATCH_SIZE, PLAYS_PER_PAGE, GUILD_MEMBERS_PER_PAGE, USER_ITEMS_PER_PAGE
+from .api import _guild_id, _user_params, _plays_params, _hot_items_params, _collection_params, _search_params
+from .api import _game_ids, _batch_size, _thing_batch_params, _create_games_from_batch_xml, _raise_fetch_error
+from .api import _select_game_id, _known_ranks
+from .api import _is_guild_page_empty, _is_user_page_empty, _is_plays_page_empty
+from .exceptions import BoardGameGeekError, BoardGameGeekAPIError, BoardGameGeekAPIRetryError
+from .exceptions import BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError, BoardGameGeekRateLimitQueueFullError
+from .exceptions import BoardGameGeekCacheMissError
+from .loaders import create_game_from_xml, create_guild_from_xml, add_guild_members_from_xml
+from .loaders import get_guild_member_count_from_xml, create_user_from_xml, add_user_buddies_and_guilds_from_xml
+from .loaders import get_user_buddy_and_guild_count_from_xml, create_plays_from_xml, add_plays_from_xml
+from .loaders import get_plays_count_from_xml, create_hot_items_from_xml, create_collection_from_xml
+from .loaders import create_search_results_from_xml
+from .ratelimit import AdaptiveRateLimiter, PRIORITIES, DEFAULT_PRIORITY
+from .utils import get_page_count, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_CONCURRENT_PAGES
+from .utils import check_xml_parser, xml_find, xml_fromstring, XML_PARSE_ERRORS
+
+
+log = logging.getLogger("boardgamegeek.asyncapi")
+
+
+async def _call_limiter(rate_limiter, method, *args):
+    """
+    Calls a method of ``rate_limiter``, in a thread if it may block on I/O (its ``blocking`` attribute is set), so
+    that the event loop isn't blocked
+    """
+    if not rate_limiter.blocking:
+        return method(*args)
+    return await asyncio.get_event_loop().run_in_executor(None, functools.partial(method, *args))
+
+
+async def _acquire(rate_limiter, url, priority=None):
+    """
+    Waits, without blocking the event loop, until ``rate_limiter`` allows a request to ``url``. The limiters keeping
+    their state out of the process (e.g. :py:class:`boardgamegeek.ratelimit.SqliteRateLimiter`) are called in a
+    thread, since they may have to wait for other processes.
+    """
+    path = urlparse(url).path
+    request = await _call_limiter(rate_limiter, rate_limiter.enqueue, path, priority or DEFAULT_PRIORITY)
+    try:
+        while True:
+            need_to_wait = await _call_limiter(rate_limiter, rate_limiter.poll, path, request)
+            if need_to_wait <= 0:
+                return
+            await asyncio.sleep(need_to_wait)
+    except BaseException:
+        await _call_limiter(rate_limiter, rate_limiter.cancel, path, request)
+        raise
+
+
+async def get_parsed_xml_response(session, url, params=None, timeout=15, retries=3, retry_delay=5, rate_limiter=None,
+                                  priority=None, xml_parser=None):
+    """
+    Downloads an XML from the specified url, parses it and returns the xml ElementTree. The asyncio counterpart of
+    :py:func:`boardgamegeek.utils.get_parsed_xml_response`.
+
+    :param session: ``aiohttp.ClientSession`` used to fetch the url
+    :param url: the address where to get the XML from
+    :param params: dictionary containing the parameters which should be sent with the request
+    :param timeout: number of seconds after which the request times out
+    :param retries: number of retries to perform in case of timeout
+    :param retry_delay: the amount of seconds to sleep when retrying an API call that returned 202
+    :param rate_limiter: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter` to wait for before each request
+    :param priority: priority of the request for the rate limiter, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`
+    :param xml_parser: the parser to use, one of :py:data:`boardgamegeek.utils.XML_PARSERS`; ``None`` for the default
+                       one
+    :return: :py:func:`xml.etree.ElementTree` corresponding to the XML
+    :raises: :py:class:`BoardGameGeekAPINonXMLError` if the API response wasn't XML
+    :raises: :py:class:`BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+    :raises: :py:class:`BoardGameGeekAPIError` if the response couldn't be parsed
+    :raises: :py:class:`BoardGameGeekTimeoutError` if there was a timeout
+    :raises: :py:class:`BoardGameGeekRateLimitQueueFullError` if there were too many requests waiting for the rate
+             limiter
+    """
+    if priority is not None and priority not in PRIORITIES:
+        raise BoardGameGeekError("invalid priority: {}".format(priority))
+
+    xml_parser = check_xml_parser(xml_parser)
+
+    retr = retries
+
+    # aiohttp only accepts strings as parameter values
+    if params is not None:
+        params = {k: str(v) for k, v in params.items()}
+
+    # retry loop
+    while retr >= 0:
+        retr -= 1
+        try:
+            if rate_limiter is not None:
+                await _acquire(rate_limiter, url, priority)
+
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+
+                if rate_limiter is not None:
+                    await _call_limiter(rate_limiter, rate_limiter.response_received, urlparse(url).path, r.status,
+                                        r.headers.get("Retry-After"))
+
+                if r.status == 202:
+                    if retries == 0:
+                        # no retries have been requested, therefore raise exception to signal the application that it
+                        # needs to retry
+                        raise BoardGameGeekAPIRetryError()
+                    elif retr == 0:
+                        # retries were requested, but we reached 0. Signal the application that it needs to retry
+                        raise BoardGameGeekAPIRetryError("failed to retrieve data after {} retries".format(retries))
+                    else:
+                        log.debug("API call will be retried in {} seconds ({} more retries)".format(retry_delay, retr))
+                        if retr >= 0:
+                            await asyncio.sleep(retry_delay)
+                            retry_delay *= 1.5
+                        continue
+                elif r.status in [429, 503]:
+                    log.warning("API returned {}, retrying".format(r.status))
+                    if retr >= 0:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 3
+                    continue
+
+                if not r.headers.get("content-type", "").startswith("text/xml"):
+                    raise BoardGameGeekAPINonXMLError("non-XML reply")
+
+                xml = await r.read()
+
+            return xml_fromstring(xml, xml_parser)
+
+        except asyncio.TimeoutError:
+            if retries == 0:
+                raise BoardGameGeekTimeoutError()
+            elif retr == 0:
+                # ... reached 0 retries
+                raise BoardGameGeekTimeoutError("failed to retrieve data after {} retries".format(retries))
+            else:
+                log.debug("API request timeout, retrying {} more times w/timeout {}".format(retr, timeout))
+                timeout *= 2.5
+                continue
+
+        except XML_PARSE_ERRORS as e:
+            raise BoardGameGeekAPIError("error decoding BGG API response: {}".format(e))
+
+        except (BoardGameGeekAPIRetryError, BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError,
+                BoardGameGeekRateLimitQueueFullError):
+            raise
+
+        except asyncio.CancelledError:
+            # derives from Exception before Python 3.8, the task being cancelled isn't an API error
+            raise
+
+        except Exception as e:
+            raise BoardGameGeekAPIError("error fetching BGG API response: {}".format(e))
+
+    raise BoardGameGeekAPIError("couldn't fetch data within the configured number of retries")
+
+
+async def fetch_pages(fetch_page, first_page, last_page, concurrency=DEFAULT_CONCURRENT_PAGES, is_empty=None):
+    """
+    Retrieves the pages ``first_page`` .. ``last_page`` of a paginated API response, keeping up to ``concurrency``
+    requests in flight. The asyncio counterpart of :py:func:`boardgamegeek.utils.fetch_pages`.
+
+    :param fetch_page: coroutine function taking a page number as argument and returning that page
+    :param integer first_page: the first page to retrieve
+    :param integer last_page: the last page to retrieve
+    :param integer concurrency: maximum number of pages being retrieved at the same time
+    :param callable is_empty: an optional callable which receives a page and returns ``True`` if it's empty
+    :return: list of pages, in order, up to the first empty one
+    :raises: the exception raised by ``fetch_page``
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    state = {"last_page": last_page}    # lowered when an empty page is found
+
+    async def _fetch(page):
+        async with semaphore:
+            if page > state["last_page"]:
+                return None
+            result = await fetch_page(page)
+            if is_empty is not None and is_empty(result):
+                # nothing after an empty page, don't request anything past it
+                state["last_page"] = min(state["last_page"], page - 1)
+            return result
+
+    tasks = [asyncio.ensure_future(_fetch(page)) for page in range(first_page, last_page + 1)]
+    pages = []
+    try:
+        for page, task in zip(range(first_page, last_page + 1), tasks):
+            result = await task
+            if page > state["last_page"]:
+                break
+            pages.append(result)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # wait for the cancelled requests to finish, so they don't outlive the call
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return pages
+
+
+class AsyncBoardGameGeek(object):
+    """
+        asyncio interface for www.boardgamegeek.com's XML API 2. The methods are coroutines returning the same
+        objects as the ones of :py:class:`boardgamegeek.api.BoardGameGeek`.
+
+        HTTP caching isn't supported by this client.
+
+        :param timeout: Timeout for network operations
+        :param retries: Number of retries to perform in case the API returns HTTP 202 (retry) or in case of timeouts
+        :param retry_delay: Time to sleep between retries when the API returns HTTP 202 (retry)
+        :param disable_ssl: If true, use HTTP instead of HTTPS for calling the BGG API
+        :param requests_per_minute: how many requests per minute to allow to go out to BGG (throttle prevention)
+        :param rank_table: dictionary mapping game ids to their board game rank, used when selecting games by rank
+                           (``choose="best-rank"``). The ranks of retrieved games are added to it. If not specified,
+                           the ranks aren't kept.
+        :param concurrent_pages: how many pages to retrieve at the same time when fetching paginated data (plays,
+                                 guild members, user's buddies and guilds) or games in batches
+        :param rate_limiter: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter` deciding when requests can be
+                             made. If not specified, the client gets its own
+                             :py:class:`boardgamegeek.ratelimit.AdaptiveRateLimiter` allowing up to
+                             ``requests_per_minute`` requests. It can be shared with other clients, including
+                             synchronous ones. Limiters shared with other processes (e.g.
+                             :py:class:`boardgamegeek.ratelimit.SqliteRateLimiter`) are called in a thread.
+        :param priority: default priority of the API calls made by this client (``"interactive"``, ``"normal"`` or
+                         ``"bulk"``). Each API call can override it using its ``priority`` parameter.
+        :param session: ``aiohttp.ClientSession`` to use. If not specified, one is created (and closed by
+                        :py:meth:`close`)
+        :param xml_parser: parser for the API responses, one of :py:data:`boardgamegeek.utils.XML_PARSERS`. If not
+                           specified, ElementTree is used.
+        :param lazy_games: if ``True``, the games decode their data out of the API response when it's first accessed
+                           (see :py:class:`boardgamegeek.loaders.LazyGameData`), instead of when they're created
+
+        Example usage::
+
+            >>> async def main():
+            ...     async with AsyncBoardGameGeek() as bgg:
+            ...         games = await asyncio.gather(bgg.game(game_id=31260), bgg.game(game_id=124742))
+    """
+    def __init__(self, timeout=15, retries=3, retry_delay=5, disable_ssl=False,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, rank_table=None,
+                 concurrent_pages=DEFAULT_CONCURRENT_PAGES, rate_limiter=None, priority=None, session=None,
+                 xml_parser=None, lazy_games=False):
+
+        if aiohttp is None:
+            raise BoardGameGeekError("the aiohttp package is required for using the asyncio client")
+
+        api_endpoint = "http{}://www.boardgamegeek.com/xmlapi2".format("" if disable_ssl else "s")
+
+        self._search_api_url = api_endpoint + "/search"
+        self._thing_api_url = api_endpoint + "/thing"
+        self._guild_api_url = api_endpoint + "/guild"
+        self._user_api_url = api_endpoint + "/user"
+        self._plays_api_url = api_endpoint + "/plays"
+        self._hot_api_url = api_endpoint + "/hot"
+        self._collection_api_url = api_endpoint + "/collection"
+        self._timeout = timeout
+        self._retries = retries
+        self._retry_delay = retry_delay
+        self._rank_table = rank_table
+        self._concurrent_pages = concurrent_pages
+        self._rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter(rpm=requests_per_minute)
+
+        if priority is not None and priority not in PRIORITIES:
+            raise BoardGameGeekError("invalid priority: {}".format(priority))
+        self._priority = priority
+        self._xml_parser = check_xml_parser(xml_parser)
+        self._lazy_games = lazy_games
+
+        self._session = session
+        self._owns_session = session is None
+
+    @property
+    def rate_limiter(self):
+        """
+        :return: the rate limiter used by this client
+        :rtype: :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter`
+        """
+        return self._rate_limiter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the HTTP session, if it was created by this client
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _remember_rank(self, game):
+        """
+        Adds the rank of a retrieved game to the rank table, if the client was given one
+        """
+        if self._rank_table is not None:
+            self._rank_table[game.id] = game.boardgame_rank
+
+    async def _get(self, url, params, priority=None):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+
+        return await get_parsed_xml_response(self._session,
+                                             url,
+                                             params=params,
+                                             timeout=self._timeout,
+                                             retries=self._retries,
+                                             retry_delay=self._retry_delay,
+                                             rate_limiter=self._rate_limiter,
+                                             priority=priority or self._priority,
+                                             xml_parser=self._xml_parser)
+
+    async def get_game_id(self, name, choose="first", priority=None):
+        """
+        Returns the BGG ID of a game, searching by name
+
+        :param str name: The name of the game to search for
+        :param str choose: method of selecting the game by name, when dealing with multiple results. Valid values are "first", "recent" or "best-rank"
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: the game's id
+        :rtype: integer
+        :return: ``None`` if game wasn't found
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid name
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        if choose not in ["first", "recent", "best-rank"]:
+            raise BoardGameGeekError("invalid value for parameter 'choose': {}".format(choose))
+
+        log.debug("getting game id for '{}'".format(name))
+        res = await self.search(name, search_type=["boardgame"], exact=True, priority=priority)
+
+        if not res:
+            return None
+
+        ranks = {}
+        if choose == "best-rank":
+            ranks, unknown = _known_ranks(res, self._rank_table)
+            if unknown:
+                for game in await self.games_by_id(unknown, priority=priority, on_error=_raise_fetch_error):
+                    ranks[game.id] = game.boardgame_rank
+
+        return _select_game_id(res, choose, ranks)
+
+    async def game(self, name=None, game_id=None, choose="first", priority=None):
+        """
+        Get information about a game.
+
+        :param str name: If not None, get information about a game with this name
+        :param integer game_id:  If not None, get information about a game with this id
+        :param str choose: method of selecting the game by name, when dealing with multiple results. Valid values are "first", "recent" or "best-rank"
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: ``BoardGame`` object
+        :rtype: :py:class:`boardgamegeek.games.BoardGame`
+        :return: ``None`` if the game wasn't found
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid name or game_id
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        if not name and game_id is None:
+            raise BoardGameGeekError("game name or id not specified")
+
+        if game_id is None:
+            game_id = await self.get_game_id(name, choose=choose, priority=priority)
+            if game_id is None:
+                log.error("couldn't find any game named '{}'".format(name))
+                return None
+
+        log.debug("retrieving game id {}{}".format(game_id, " ({})".format(name) if name is not None else ""))
+
+        try:
+            root = await self._get(self._thing_api_url, params={"id": game_id, "stats": 1}, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            return None
+
+        # xml is structured like <item ...> blablabla><item>.., with no <item> if there's no game with this id
+        root = xml_find(root, "item")
+        if root is None:
+            log.error("couldn't find any game with id {}{}".format(game_id,
+                                                                   " ({})".format(name) if name is not None else ""))
+            return None
+
+        game = create_game_from_xml(root, game_id=game_id, lazy=self._lazy_games)
+        self._remember_rank(game)
+
+        return game
+
+    async def games_by_id(self, game_ids, batch_size=DEFAULT_THING_BATCH_SIZE, progress=None, on_error=None,
+                          priority=None):
+        """
+        Get information about several games, fetching up to ``batch_size`` of them with a single API call.
+
+        Failing to retrieve a game doesn't abort the whole operation: the error is reported for that id (to
+        ``on_error`` if specified, logged otherwise) and the remaining games are still returned.
+
+        :param list game_ids: ids of the games to retrieve
+        :param integer batch_size: how many games to request with each API call
+        :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
+        :param callable on_error: an optional callable taking a game id and the exception raised while trying to retrieve it
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: list of ``BoardGame`` objects, in the order in which they were requested
+        :rtype: list of :py:class:`boardgamegeek.games.BoardGame`
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid game ids or batch size
+        """
+        batch_size = _batch_size(batch_size)
+        ids, unique_ids = _game_ids(game_ids)
+
+        def _report_error(game_id, error):
+            if on_error is not None:
+                on_error(game_id, error)
+            else:
+                log.warning("couldn't retrieve game id {}: {}".format(game_id, error))
+
+        batches = [unique_ids[i:i + batch_size] for i in range(0, len(unique_ids), batch_size)]
+        games = {}
+        done = [0]
+
+        async def _fetch_batch(batch):
+            log.debug("retrieving game ids {}".format(batch))
+            try:
+                root = await self._get(self._thing_api_url, params=_thing_batch_params(batch), priority=priority)
+            except (BoardGameGeekAPIError, BoardGameGeekTimeoutError, BoardGameGeekCacheMissError,
+                    BoardGameGeekRateLimitQueueFullError) as e:
+                for game_id in batch:
+                    _report_error(game_id, e)
+                return
+
+            batch_games, batch_errors = _create_games_from_batch_xml(root, batch, lazy=self._lazy_games)
+
+            for game_id in batch:
+                if game_id in batch_games:
+                    games[game_id] = batch_games[game_id]
+                    self._remember_rank(games[game_id])
+                else:
+                    _report_error(game_id, batch_errors[game_id])
+
+            done[0] += len(batch)
+            if progress is not None:
+                progress(done[0], len(unique_ids))
+
+        await fetch_pages(lambda i: _fetch_batch(batches[i]), 0, len(batches) - 1, concurrency=self._concurrent_pages)
+
+        return [games[game_id] for game_id in ids if game_id in games]
+
+    async def games(self, name, priority=None):
+        """
+        Return a list containing all games with the given name
+
+        :param str name: the name of the game to search for
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: list of :py:class:`boardgamegeek.games.BoardGame`, without the games which weren't found
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        results = await self.search(name,
+                                    search_type=["boardgame", "boardgameexpansion"],
+                                    exact=True,
+                                    priority=priority)
+        return await self.games_by_id([s.id for s in results], on_error=_raise_fetch_error, priority=priority)
+
+    async def guild(self, guild_id, progress=None, priority=None):
+        """
+        Retrieves details about a guild
+
+        :param integer guild_id: the id number of the guild
+        :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: ``Guild`` object containing the data
+        :return: ``None`` if the information couldn't be retrieved
+        :rtype: :py:class:`boardgamegeek.guild.Guild`
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of an invalid guild id
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        guild_id = _guild_id(guild_id)
+
+        try:
+            root = await self._get(self._guild_api_url, params={"id": guild_id, "members": 1}, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            return None
+
+        guild = create_guild_from_xml(root, guild_id)
+        if guild is None:
+            return None
+
+        count = get_guild_member_count_from_xml(root)
+
+        def _call_progress_cb():
+            if progress is not None:
+                progress(len(guild), count)
+
+        _call_progress_cb()
+
+        if len(guild) < count:
+
+            async def _fetch_page(page):
+                return await self._get(self._guild_api_url,
+                                       params={"id": guild_id, "members": 1, "page": page},
+                                       priority=priority)
+
+            last_page = get_page_count(count, max(GUILD_MEMBERS_PER_PAGE, len(guild)))
+
+            for root in await fetch_pages(_fetch_page, 2, last_page,
+                                          concurrency=self._concurrent_pages,
+                                          is_empty=_is_guild_page_empty):
+                add_guild_members_from_xml(guild, root)
+                _call_progress_cb()
+
+        return guild
+
+    async def user(self, name, progress=None, priority=None):
+        """
+        Retrieves details about an user
+
+        :param str name: user's login name
+        :param callable progress: an optional callable for reporting progress when fetching the buddy list/guilds, taking two integers (``current``, ``total``) as arguments
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+
+        :return: ``User`` object
+        :rtype: :py:class:`boardgamegeek.user.User`
+        :return: ``None`` if the user couldn't be found
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid user name
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        params = _user_params(name)
+
+        try:
+            root = await self._get(self._user_api_url, params=params, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            # if the api doesn't return XML, assume the user wasn't found
+            return None
+
+        user = create_user_from_xml(root)
+        if user is None:
+            return None
+
+        max_items_to_fetch = max(get_user_buddy_and_guild_count_from_xml(root))
+
+        def _call_progress_cb():
+            if progress is not None:
+                progress(max(user.total_buddies, user.total_guilds), max_items_to_fetch)
+
+        _call_progress_cb()
+
+        if max(user.total_buddies, user.total_guilds) < max_items_to_fetch:
+
+            async def _fetch_page(page):
+                return await self._get(self._user_api_url, params=dict(params, page=page), priority=priority)
+
+            items_per_page = max(USER_ITEMS_PER_PAGE, user.total_buddies, user.total_guilds)
+            last_page = get_page_count(max_items_to_fetch, items_per_page)
+
+            for root in await fetch_pages(_fetch_page, 2, last_page,
+                                          concurrency=self._concurrent_pages,
+                                          is_empty=_is_user_page_empty):
+                add_user_buddies_and_guilds_from_xml(user, root)
+                _call_progress_cb()
+
+        return user
+
+    async def plays(self, name=None, game_id=None, progress=None, min_date=None, max_date=None, priority=None):
+        """
+        Retrieves the plays for an user (if using ``name``) or for a game (if using ``game_id``)
+
+        :param str name: user name to retrieve the plays for
+        :param integer game_id: game id to retrieve the plays for
+        :param callable progress: an optional callable for reporting progress, taking two integers (``current``, ``total``) as arguments
+        :param datetime.date min_date: return only plays of the specified date or later.
+        :param datetime.date max_date: return only plays of the specified date or earlier.
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+
+        :return: object containing all the plays
+        :rtype: :py:class:`boardgamegeek.plays.Plays`
+        :return: ``None`` if the user/game couldn't be found
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` on errors
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        params = _plays_params(name, game_id, min_date, max_date)
+
+        try:
+            root = await self._get(self._plays_api_url, params=params, priority=priority)
+        except BoardGameGeekAPINonXMLError as e:
+            # The API seems to return HTML in case of an invalid username.
+            log.error("error trying to fetch plays: {}".format(e))
+            return None
+
+        plays = create_plays_from_xml(root, game_id=params.get("id"))
+        if plays is None:
+            return None
+
+        count = get_plays_count_from_xml(root)
+
+        def _call_progress_cb():
+            if progress is not None:
+                progress(len(plays), count)
+
+        _call_progress_cb()
+
+        if len(plays) < count:
+
+            async def _fetch_page(page):
+                log.debug("fetching page {} of plays".format(page))
+                return await self._get(self._plays_api_url, params=dict(params, page=page), priority=priority)
+
+            last_page = get_page_count(count, PLAYS_PER_PAGE)
+
+            for root in await fetch_pages(_fetch_page, 2, last_page,
+                                          concurrency=self._concurrent_pages,
+                                          is_empty=_is_plays_page_empty):
+                add_plays_from_xml(plays, root)
+                _call_progress_cb()
+
+        return plays
+
+    async def hot_items(self, item_type, priority=None):
+        """
+        Return the list of "Hot Items"
+
+        :param str item_type: hot item type. Valid values: "boardgame", "rpg", "videogame", "boardgameperson", "rpgperson", "boardgamecompany", "rpgcompany", "videogamecompany")
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+
+        :return: ``HotItems`` object
+        :rtype: :py:class:`boardgamegeek.hotitems.HotItems`
+        :return: ``None`` in case the hot items couldn't be retrieved
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` if the parameter is invalid
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        params = _hot_items_params(item_type)
+
+        try:
+            root = await self._get(self._hot_api_url, params=params, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            # if the api doesn't return XML, assume there was some error
+            return None
+
+        return create_hot_items_from_xml(root)
+
+    async def collection(self, user_name, priority=None):
+        """
+        Returns the user's game collection
+
+        :param str user_name: user name to retrieve the collection for
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: ``Collection`` object
+        :rtype: :py:class:`boardgamegeek.collection.Collection`
+        :return: ``None`` if user not found
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        params = _collection_params(user_name)
+
+        try:
+            root = await self._get(self._collection_api_url, params=params, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            return None
+
+        return create_collection_from_xml(root, user_name)
+
+    async def search(self, query, search_type=None, exact=False, priority=None):
+        """
+        Search for a game
+
+        :param str query: the string to search for
+        :param str search_type: list of strings indicating what to search for. Valid contained values are: "rpgitem", "videogame", "boardgame" (default), "boardgameexpansion"
+        :param bool exact: if True, try to match the name exactly
+        :param str priority: priority of the API calls, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`. If not specified, the client's default is used
+        :return: list of ``SearchResult``
+        :rtype: list of :py:class:`boardgamegeek.search.SearchResult`
+
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid query
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the response couldn't be parsed
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekTimeoutError` if there was a timeout
+        """
+        params = _search_params(query, search_type, exact)
+
+        try:
+            root = await self._get(self._search_api_url, params=params, priority=priority)
+        except BoardGameGeekAPINonXMLError:
+            # if the api doesn't return XML, assume there was some error
+            return None
+
+        return create_search_results_from_xml(root)
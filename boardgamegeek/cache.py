@@ -0,0 +1,1111 @@
+# coding: utf-8
+"""
+:mod:`boardgamegeek.cache` - Caching
+====================================
+
+Cache for the objects built out of the API responses, so that retrieving the same data again skips both the HTTP
+request and the parsing of the response, and additional storage backends for the HTTP cache.
+
+.. module:: boardgamegeek.cache
+   :platform: Unix, Windows
+   :synopsis: caching of the API responses
+
+.. moduleauthor:: Cosmin Luță <q4break@gmail.com>
+"""
+from __future__ import unicode_literals
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import requests
+from requests.hooks import dispatch_hook
+from requests_cache.backends.base import BaseCache
+from requests_cache.core import CachedSession
+
+from .exceptions import BoardGameGeekError, BoardGameGeekCacheMissError
+from .ratelimit import request_priority
+
+
+log = logging.getLogger("boardgamegeek.cache")
+
+DEFAULT_OBJECT_CACHE_SIZE = 1000
+DEFAULT_OBJECT_CACHE_TTL = 3600
+DEFAULT_NEGATIVE_CACHE_TTL = 600
+
+# "online": the responses not cached (or expired) are requested from BGG
+# "offline": only the cached responses are used, regardless of their age
+# "prefer-cache": the expired responses are refreshed, but still used if BGG can't be reached
+MODES = ["online", "offline", "prefer-cache"]
+# status codes showing that BGG is unavailable (or throttling the requests)
+DEGRADED_STATUS_CODES = [429, 500, 502, 503, 504]
+
+EVICTION_POLICIES = ["lru", "lfu"]
+DEFAULT_MEMORY_CACHE_SIZE = 128 * 1024 * 1024
+DEFAULT_L1_CACHE_SIZE = 16 * 1024 * 1024
+DEFAULT_SWEEP_INTERVAL = 60
+RESPONSE_OVERHEAD = 2048                    # estimated size of a cached response, besides its content
+
+COMPRESSIONS = ["zlib", "zstd"]
+DEFAULT_DICTIONARY_SIZE = 32 * 1024         # zlib can't use more than 32KB of a dictionary
+
+
+def object_cache_key(url, params):
+    """
+    Returns the key under which the object built out of an API call is cached
+
+    :param str url: the API's url
+    :param dict params: the parameters of the call
+    :return: the cache key
+    """
+    return url, tuple(sorted((k, "{}".format(v)) for k, v in (params or {}).items()))
+
+
+class ObjectCache(object):
+    """
+    Thread safe in-memory cache holding up to ``max_items`` objects, each for ``ttl`` seconds. When full, the least
+    recently used objects are evicted.
+
+    The cached objects are shared by all the callers retrieving them, and shouldn't be modified.
+
+    :param integer max_items: maximum number of objects to keep
+    :param integer ttl: how many seconds to keep an object for, ``None`` for no expiration
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+
+    Example usage::
+
+        >>> bgg = BoardGameGeek(object_cache=ObjectCache(max_items=5000, ttl=3600))
+    """
+    def __init__(self, max_items=DEFAULT_OBJECT_CACHE_SIZE, ttl=DEFAULT_OBJECT_CACHE_TTL):
+        if max_items < 1:
+            raise BoardGameGeekError("invalid maximum number of cached objects")
+
+        if ttl is not None and ttl <= 0:
+            raise BoardGameGeekError("invalid ttl")
+
+        self._max_items = max_items
+        self._ttl = ttl
+        self._items = OrderedDict()         # key -> (object, expiration time), least recently used first
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """
+        Returns a cached object
+
+        :param key: the object's key
+        :return: the object, ``None`` if it's not in the cache (or it expired)
+        """
+        with self._lock:
+            item = self._items.pop(key, None)
+
+            if item is None or (item[1] is not None and item[1] <= time.time()):
+                self._misses += 1
+                return None
+
+            # move it to the end, as the most recently used
+            self._items[key] = item
+            self._hits += 1
+            return item[0]
+
+    def put(self, key, obj):
+        """
+        Adds an object to the cache, evicting the least recently used ones if it's full
+
+        :param key: the object's key
+        :param obj: the object
+        """
+        expires = time.time() + self._ttl if self._ttl is not None else None
+
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (obj, expires)
+
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Removes an object from the cache
+
+        :param key: the object's key
+        """
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all the objects from the cache
+        """
+        with self._lock:
+            self._items.clear()
+
+    @property
+    def hits(self):
+        """
+        :return: number of lookups which found the object in the cache
+        :rtype: integer
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        :return: number of lookups which didn't find the object in the cache
+        :rtype: integer
+        """
+        return self._misses
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class TTLPolicy(object):
+    """
+    Decides for how long the responses of the API calls are cached, depending on the endpoint and the parameters of
+    each call.
+
+    The rules are keyed by the endpoint's URL (e.g. ``BoardGameGeekNetworkAPI._thing_api_url``) or its name (the last
+    part of the URL, e.g. ``"thing"``). A rule can also require some parameters, in which case it only applies to the
+    calls having them (with the given values, or any value if ``None``). When several rules apply, the one requiring
+    the most parameters wins.
+
+    :param integer default: ttl (seconds) of the responses no rule applies to, ``None`` to use the cache's ttl
+    :param dict ttls: dictionary mapping endpoints to their ttls
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+
+    Example usage::
+
+        >>> policy = TTLPolicy(ttls={"hot": 3600, "thing": 7 * 86400, "search": 30 * 86400})
+        >>> policy.set("thing", 86400, params={"stats": 1})
+        >>> bgg = BoardGameGeek(cache="sqlite:///path/to/cache.db?ttl=3600", cache_ttl_policy=policy)
+    """
+    def __init__(self, default=None, ttls=None):
+        if default is not None and default < 0:
+            raise BoardGameGeekError("invalid ttl")
+
+        self.default = default
+        self._rules = {}            # endpoint name -> list of (params, ttl), the most specific first
+
+        for endpoint, ttl in (ttls or {}).items():
+            self.set(endpoint, ttl)
+
+    @staticmethod
+    def _endpoint_name(url):
+        return urlparse.urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+    def set(self, endpoint, ttl, params=None):
+        """
+        Sets the ttl of an endpoint's responses, replacing the rule requiring the same parameters
+
+        :param str endpoint: the endpoint's URL or name
+        :param integer ttl: how many seconds to cache the responses for
+        :param dict params: parameters the calls must have for the rule to apply, mapped to their required values
+                            (``None`` for any value)
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+        """
+        if ttl is None or ttl < 0:
+            raise BoardGameGeekError("invalid ttl")
+
+        params = {k: "{}".format(v) if v is not None else None for k, v in (params or {}).items()}
+
+        rules = [rule for rule in self._rules.get(self._endpoint_name(endpoint), []) if rule[0] != params]
+        rules.append((params, ttl))
+        rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+        self._rules[self._endpoint_name(endpoint)] = rules
+
+    def ttl(self, url, params=None):
+        """
+        Returns the ttl of an API call's response
+
+        :param str url: the call's URL
+        :param dict params: the call's parameters. If not specified, they're taken from the URL's query string
+        :return: how many seconds to cache the response for, the default if no rule applies
+        :rtype: integer
+        """
+        if params is None:
+            params = {k: v[0] for k, v in urlparse.parse_qs(urlparse.urlparse(url).query).items()}
+
+        for required, ttl in self._rules.get(self._endpoint_name(url), []):
+            if all(k in params and (v is None or "{}".format(params[k]) == v) for k, v in required.items()):
+                return ttl
+
+        return self.default
+
+    def max_ttl(self):
+        """
+        :return: the longest ttl of the policy, ``None`` if it has no rules nor default
+        :rtype: integer
+        """
+        ttls = [ttl for rules in self._rules.values() for _, ttl in rules]
+        if self.default is not None:
+            ttls.append(self.default)
+        return max(ttls) if ttls else None
+
+
+def get_cached_response(session, url, params):
+    """
+    Returns the cached response of an API call, without making the call if it's not cached. A
+    :py:class:`TTLCachedSession` decides, following its mode, whether the response can be used (see
+    :py:meth:`TTLCachedSession.lookup`)
+
+    :param session: the (cached) session making the API calls
+    :param str url: the API's url
+    :param dict params: the parameters of the call
+    :return: tuple (response, fallback): the cached response if it can be used without making the call, ``None``
+             otherwise, and the expired response to use if making the call fails (in the ``"prefer-cache"`` mode)
+    """
+    cache = getattr(session, "cache", None)
+    if cache is None:
+        return None, None
+
+    # the cached sessions sort the parameters before making the requests
+    request = requests.Request("GET", url, params=sorted(params.items())).prepare()
+
+    if isinstance(session, TTLCachedSession):
+        response, usable = session.lookup(request)
+        if usable:
+            return response, None
+        return None, response if session.mode == "prefer-cache" else None
+
+    response, timestamp = cache.get_response_and_time(cache.create_key(request))
+    if response is None:
+        return None, None
+
+    expire_after = session._cache_expire_after
+    if expire_after is not None and datetime.utcnow() - timestamp > expire_after:
+        return None, None
+
+    return response, None
+
+
+def cache_response(session, url, params, content):
+    """
+    Caches a response for an API call, as if the call was made (e.g. a part of the response of a call for several
+    items, which can be used for calls requesting only some of them)
+
+    :param session: the (cached) session making the API calls
+    :param str url: the API's url
+    :param dict params: the parameters of the call
+    :param bytes content: the response's content
+    """
+    cache = getattr(session, "cache", None)
+    if cache is None:
+        return
+
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.headers["Content-Type"] = "text/xml; charset=utf-8"
+    response.encoding = "utf-8"
+    response.request = requests.Request("GET", url, params=sorted(params.items())).prepare()
+    response.url = response.request.url
+    response._content = content
+
+    cache.save_response(cache.create_key(response.request), response)
+
+
+class TTLCachedSession(CachedSession):
+    """
+    ``requests-cache`` session expiring the cached responses according to a :py:class:`TTLPolicy`. The responses the
+    policy has no ttl for expire after ``expire_after``.
+
+    With ``stale_while_revalidate`` set, responses expired for at most that many seconds are still returned right
+    away, while a background thread refreshes them (at the ``"bulk"`` priority). Concurrent requests for the same
+    stale response trigger a single refresh.
+
+    In the ``"offline"`` mode no requests are made: the cached responses are returned regardless of their age, and
+    :py:exc:`boardgamegeek.exceptions.BoardGameGeekCacheMissError` is raised for the ones which aren't cached. In the
+    ``"prefer-cache"`` mode the expired responses are refreshed, but if that fails (network errors, timeouts, BGG
+    being unavailable or throttling the requests) they're returned instead.
+
+    :param ttl_policy: the :py:class:`TTLPolicy`, ``None`` for using ``expire_after`` for all the responses
+    :param integer stale_while_revalidate: for how many seconds past their expiration the responses can be returned
+                                           while being refreshed, ``None`` to disable
+    :param str mode: one of :py:data:`MODES`
+    :param kwargs: the parameters of ``requests_cache.core.CachedSession``
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    def __init__(self, ttl_policy=None, stale_while_revalidate=None, mode="online", **kwargs):
+        if mode not in MODES:
+            raise BoardGameGeekError("invalid mode: {}".format(mode))
+
+        super(TTLCachedSession, self).__init__(**kwargs)
+        self.ttl_policy = ttl_policy
+        self.mode = mode
+        self._stale_while_revalidate = timedelta(seconds=stale_while_revalidate or 0)
+        self._refreshing = set()            # keys of the responses being refreshed
+        self._refresh_queue = queue.Queue()
+        self._refresh_thread = None
+        self._lock = threading.Lock()
+
+    def _expire_after(self, request):
+        ttl = self.ttl_policy.ttl(request.url) if self.ttl_policy is not None else None
+        if ttl is None:
+            return self._cache_expire_after
+        return timedelta(seconds=ttl)
+
+    def _send_and_cache(self, cache_key, request, **kwargs):
+        # skip CachedSession's lookup, the response isn't cached (or it expired)
+        response = super(CachedSession, self).send(request, **kwargs)
+        if response.status_code in self._cache_allowable_codes:
+            self.cache.save_response(cache_key, response)
+        response.from_cache = False
+        return response
+
+    def _schedule_refresh(self, cache_key, request, **kwargs):
+        """
+        Makes the background thread refresh a cached response, unless it's already being refreshed
+        """
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(target=self._refresh_worker, name="bgg-cache-refresh")
+                self._refresh_thread.daemon = True
+                self._refresh_thread.start()
+
+        self._refresh_queue.put((cache_key, request, kwargs))
+
+    def _refresh_worker(self):
+        while True:
+            cache_key, request, kwargs = self._refresh_queue.get()
+            try:
+                log.debug("refreshing stale response for {}".format(request.url))
+                with request_priority("bulk"):
+                    self._send_and_cache(cache_key, request, **kwargs)
+            except Exception as e:
+                # the stale response stays cached, the next request for it will try again
+                log.warning("error refreshing the response for {}: {}".format(request.url, e))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+    def _refresh_or_stale(self, cache_key, request, stale_response, **kwargs):
+        """
+        Refreshes an expired response, returning the expired one (from calling ``stale_response``) if BGG can't be
+        reached
+        """
+        try:
+            response = self._send_and_cache(cache_key, request, **kwargs)
+        except requests.exceptions.RequestException as e:
+            log.warning("error refreshing the response for {}, using the expired one: {}".format(request.url, e))
+            return stale_response()
+
+        if response.status_code in DEGRADED_STATUS_CODES:
+            log.warning("BGG returned {} for {}, using the expired response".format(response.status_code,
+                                                                                    request.url))
+            return stale_response()
+
+        return response
+
+    def lookup(self, request, **kwargs):
+        """
+        Looks up the cached response of a request, deciding whether it can be used without making the request, as
+        :py:meth:`send` does: the fresh responses can, and so can the stale ones (whose refresh is then scheduled) and
+        any response in the ``"offline"`` mode
+
+        :param request: the (prepared) request
+        :return: tuple (response, usable): the cached response, ``None`` if there's none, and whether it can be used
+        """
+        cache_key = self.cache.create_key(request)
+        response, timestamp = self.cache.get_response_and_time(cache_key)
+        if response is None:
+            return None, False
+
+        expire_after = self._expire_after(request)
+        age = datetime.utcnow() - timestamp
+
+        if self.mode == "offline" or expire_after is None or age <= expire_after:
+            return response, True
+
+        if age <= expire_after + self._stale_while_revalidate:
+            self._schedule_refresh(cache_key, request.copy(), **kwargs)
+            return response, True
+
+        return response, False
+
+    def send(self, request, **kwargs):
+        if self.mode == "offline":
+            if self._is_cache_disabled or request.method not in self._cache_allowable_methods:
+                raise BoardGameGeekCacheMissError("can't make requests in offline mode: {}".format(request.url))
+        elif self._is_cache_disabled or request.method not in self._cache_allowable_methods:
+            return super(TTLCachedSession, self).send(request, **kwargs)
+
+        cache_key = self.cache.create_key(request)
+        response, usable = self.lookup(request, **kwargs)
+
+        def _cached_response():
+            # dispatch hook here, as they're removed before pickling
+            response.from_cache = True
+            return dispatch_hook("response", request.hooks, response, **kwargs)
+
+        if usable:
+            return _cached_response()
+
+        if response is None:
+            if self.mode == "offline":
+                raise BoardGameGeekCacheMissError("response not cached: {}".format(request.url))
+            return self._send_and_cache(cache_key, request, **kwargs)
+
+        if self.mode == "prefer-cache":
+            return self._refresh_or_stale(cache_key, request, _cached_response, **kwargs)
+
+        self.cache.delete(cache_key)
+        return self._send_and_cache(cache_key, request, **kwargs)
+
+
+class ResponseCodec(object):
+    """
+    Serializes the cached responses, optionally compressing them with ``zlib`` or ``zstd`` (the latter requires the
+    ``zstandard`` package). A dictionary (e.g. created with :py:func:`train_dictionary` out of BGG responses) improves
+    the compression of small responses considerably.
+
+    The compressed values start with a byte telling how they were compressed, while the uncompressed ones are plain
+    pickles (as stored by ``requests-cache``), so values written with any settings can be read back, as long as the
+    dictionary they were compressed with is available. Values which can't be decoded
+    raise ``KeyError``, so the cache treats them as missing.
+
+    The codec keeps count of the bytes going through it, see :py:attr:`compression_ratio`.
+
+    :param str compression: ``"zlib"``, ``"zstd"`` or ``None`` for no compression
+    :param bytes dictionary: compression dictionary
+    :param integer level: compression level, ``None`` for the library's default
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    _ZLIB = b"z"
+    _ZLIB_DICT = b"Z"
+    _ZSTD = b"s"
+    _ZSTD_DICT = b"S"
+
+    def __init__(self, compression=None, dictionary=None, level=None):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise BoardGameGeekError("invalid compression: {}".format(compression))
+
+        if dictionary is not None and compression is None:
+            raise BoardGameGeekError("a dictionary requires compression")
+
+        self._compression = compression
+        self._dictionary = dictionary
+        self._level = level
+        self._lock = threading.Lock()
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+
+        if compression == "zstd":
+            import zstandard
+            self._zstd = zstandard
+            self._zstd_dict = zstandard.ZstdCompressionDict(dictionary) if dictionary is not None else None
+
+    def _count(self, raw_bytes, stored_bytes):
+        with self._lock:
+            self._raw_bytes += raw_bytes
+            self._stored_bytes += stored_bytes
+
+    def _compress(self, data):
+        if self._compression == "zlib":
+            level = self._level if self._level is not None else -1
+            if self._dictionary is None:
+                return self._ZLIB + zlib.compress(data, level)
+            compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL,
+                                          zlib.Z_DEFAULT_STRATEGY, self._dictionary)
+            return self._ZLIB_DICT + compressor.compress(data) + compressor.flush()
+
+        if self._compression == "zstd":
+            compressor = self._zstd.ZstdCompressor(level=self._level if self._level is not None else 3,
+                                                   dict_data=self._zstd_dict)
+            return (self._ZSTD_DICT if self._zstd_dict is not None else self._ZSTD) + compressor.compress(data)
+
+        return data
+
+    def _decompress(self, value):
+        header, data = value[:1], value[1:]
+
+        if header == self._ZLIB:
+            return zlib.decompress(data)
+
+        if header == self._ZLIB_DICT:
+            if self._compression != "zlib" or self._dictionary is None:
+                raise ValueError("no zlib dictionary")
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS, self._dictionary)
+            return decompressor.decompress(data) + decompressor.flush()
+
+        if header in [self._ZSTD, self._ZSTD_DICT]:
+            if header == self._ZSTD_DICT and (self._compression != "zstd" or self._zstd_dict is None):
+                raise ValueError("no zstd dictionary")
+            import zstandard
+            dict_data = self._zstd_dict if header == self._ZSTD_DICT else None
+            return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+        # not compressed
+        return value
+
+    def dumps(self, item):
+        """
+        Serializes an item
+
+        :param item: the item to serialize
+        :return: the serialized item
+        :rtype: bytes
+        """
+        data = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        value = self._compress(data)
+        self._count(len(data), len(value))
+        return value
+
+    def loads(self, value):
+        """
+        Deserializes an item
+
+        :param bytes value: the serialized item
+        :return: the item
+        :raises: ``KeyError`` if the item can't be deserialized
+        """
+        value = bytes(value)
+        try:
+            data = self._decompress(value)
+            item = pickle.loads(data)
+        except Exception as e:
+            log.warning("unable to decode cached item: {}".format(e))
+            raise KeyError("undecodable item")
+
+        self._count(len(data), len(value))
+        return item
+
+    @property
+    def raw_bytes(self):
+        """
+        :return: size of the items serialized or deserialized, before compression
+        :rtype: integer
+        """
+        return self._raw_bytes
+
+    @property
+    def stored_bytes(self):
+        """
+        :return: size of the items serialized or deserialized, as stored
+        :rtype: integer
+        """
+        return self._stored_bytes
+
+    @property
+    def compression_ratio(self):
+        """
+        :return: ratio between the size of the items and their stored size (e.g. ``5.0`` means the stored items are
+                 five times smaller), ``None`` if no items were processed yet
+        :rtype: float
+        """
+        with self._lock:
+            if not self._stored_bytes:
+                return None
+            return float(self._raw_bytes) / self._stored_bytes
+
+
+def train_dictionary(samples, compression="zstd", size=DEFAULT_DICTIONARY_SIZE):
+    """
+    Creates a compression dictionary out of sample data (e.g. API responses), which can be saved to a file and used by
+    the compressed caches (see the ``dictionary`` parameter of the cache URIs).
+
+    For ``zstd`` the dictionary is trained with the ``zstandard`` package (which needs a fair number of samples), for
+    ``zlib`` it's made of the samples themselves, up to ``size`` bytes.
+
+    :param list samples: list of sample data (``bytes``)
+    :param str compression: ``"zlib"`` or ``"zstd"``
+    :param integer size: maximum size of the dictionary, in bytes
+    :return: the dictionary
+    :rtype: bytes
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    if compression not in COMPRESSIONS:
+        raise BoardGameGeekError("invalid compression: {}".format(compression))
+
+    if not samples:
+        raise BoardGameGeekError("no samples to train the dictionary with")
+
+    if compression == "zstd":
+        import zstandard
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+    # zlib looks for matches starting with the end of the dictionary, so put the first samples there
+    dictionary = b""
+    for sample in samples:
+        dictionary = sample[:size - len(dictionary)] + dictionary
+        if len(dictionary) >= size:
+            break
+    return dictionary
+
+
+class SqliteDict(MutableMapping):
+    """
+    Dictionary-like interface to a sqlite table, with the same layout as the tables of ``requests-cache``'s sqlite
+    backend (so its databases can be reused).
+
+    :param str filename: database file
+    :param str table_name: table storing the items
+    :param bool fast_save: don't wait for the data to be written to the disk, which is much faster but can lose or
+                           corrupt the data if the system crashes
+    :param codec: :py:class:`ResponseCodec` instance serializing the values, ``None`` to store them as they are
+    """
+    def __init__(self, filename, table_name, fast_save=False, codec=None):
+        self.codec = codec
+        self._table_name = table_name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        if fast_save:
+            self._connection.execute("PRAGMA synchronous = OFF")
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS `{}` (key PRIMARY KEY, value)".format(table_name))
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            with self._connection:
+                return self._connection.execute(query.format(self._table_name), params).fetchall()
+
+    def __getitem__(self, key):
+        rows = self._execute("SELECT value FROM `{}` WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return self.codec.loads(rows[0][0]) if self.codec is not None else rows[0][0]
+
+    def __setitem__(self, key, item):
+        if self.codec is not None:
+            item = sqlite3.Binary(self.codec.dumps(item))
+        self._execute("INSERT OR REPLACE INTO `{}` (key, value) VALUES (?, ?)", (key, item))
+
+    def __delitem__(self, key):
+        with self._lock:
+            with self._connection:
+                deleted = self._connection.execute("DELETE FROM `{}` WHERE key = ?".format(self._table_name),
+                                                   (key,)).rowcount
+        if not deleted:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for row in self._execute("SELECT key FROM `{}`"):
+            yield row[0]
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(key) FROM `{}`")[0][0]
+
+    def clear(self):
+        self._execute("DELETE FROM `{}`")
+
+
+class SqliteCache(BaseCache):
+    """
+    ``requests-cache`` backend storing the responses in a sqlite database, optionally compressed. Existing databases
+    can be used with any compression settings: their responses are read as they were stored, and stored with the new
+    settings once they're refreshed.
+
+    :param str path: path to the sqlite database
+    :param bool fast_save: trade durability for speed
+    :param codec: :py:class:`ResponseCodec` instance compressing the responses
+    """
+    def __init__(self, path, fast_save=False, codec=None, **options):
+        super(SqliteCache, self).__init__(**options)
+        self.responses = SqliteDict(path, "responses", fast_save=fast_save, codec=codec or ResponseCodec())
+        self.keys_map = SqliteDict(path, "urls", fast_save=fast_save)
+
+    @property
+    def compression_ratio(self):
+        """
+        :return: compression ratio of the responses stored or read so far, see
+                 :py:attr:`ResponseCodec.compression_ratio`
+        :rtype: float
+        """
+        return self.responses.codec.compression_ratio
+
+
+def estimate_size(item):
+    """
+    Estimates how much memory a cached item takes
+
+    :param item: the item, usually a (response, timestamp) tuple
+    :return: the estimated size, in bytes
+    :rtype: integer
+    """
+    response = item[0] if isinstance(item, tuple) and item else item
+    content = getattr(response, "_content", None)
+    if isinstance(content, bytes):
+        return len(content) + RESPONSE_OVERHEAD
+    return len(pickle.dumps(item, pickle.HIGHEST_PROTOCOL))
+
+
+class BoundedMemoryDict(MutableMapping):
+    """
+    Thread safe in-memory dictionary holding up to ``max_size`` bytes of items, evicting the least recently used
+    (``"lru"``) or the least frequently used (``"lfu"``) ones when full.
+
+    The items older than ``ttl`` seconds are removed when read, as well as by a sweep of the whole dictionary done
+    (while adding or reading items) at most once every ``sweep_interval`` seconds.
+
+    :param integer max_size: maximum size of the items, in bytes, ``None`` for no limit
+    :param str eviction: the eviction policy, one of :py:data:`EVICTION_POLICIES`
+    :param integer ttl: how many seconds to keep the items for, ``None`` for no expiration
+    :param integer sweep_interval: how often to remove all the expired items, in seconds
+    :param callable size_of: callable returning the size of an item, :py:func:`estimate_size` by default
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    def __init__(self, max_size=DEFAULT_MEMORY_CACHE_SIZE, eviction="lru", ttl=None,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL, size_of=estimate_size):
+        if max_size is not None and max_size < 1:
+            raise BoardGameGeekError("invalid maximum cache size")
+
+        if eviction not in EVICTION_POLICIES:
+            raise BoardGameGeekError("invalid eviction policy: {}".format(eviction))
+
+        self._max_size = max_size
+        self._eviction = eviction
+        self._ttl = ttl
+        self._sweep_interval = sweep_interval
+        self._size_of = size_of
+        self._lock = threading.RLock()
+
+        self._items = {}                    # key -> (item, size, time added)
+        self._recent = OrderedDict()        # lru: keys, least recently used first
+        self._uses = {}                     # lfu: key -> number of uses
+        self._by_uses = {}                  # lfu: number of uses -> keys with that many uses, least recently used first
+        self._min_uses = 0
+
+        self._size = 0
+        self._last_sweep = time.time()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _add_use(self, key, new=False):
+        if self._eviction == "lru":
+            self._recent.pop(key, None)
+            self._recent[key] = True
+            return
+
+        uses = 0 if new else self._uses[key]
+        if not new:
+            del self._by_uses[uses][key]
+            if not self._by_uses[uses]:
+                del self._by_uses[uses]
+                if self._min_uses == uses:
+                    self._min_uses = uses + 1
+
+        self._uses[key] = uses + 1
+        self._by_uses.setdefault(uses + 1, OrderedDict())[key] = True
+        if new:
+            self._min_uses = 1
+
+    def _remove(self, key):
+        _, size, _ = self._items.pop(key)
+        self._size -= size
+
+        if self._eviction == "lru":
+            del self._recent[key]
+            return
+
+        uses = self._uses.pop(key)
+        del self._by_uses[uses][key]
+        if not self._by_uses[uses]:
+            del self._by_uses[uses]
+            if self._min_uses == uses:
+                self._min_uses = min(self._by_uses) if self._by_uses else 0
+
+    def _evict(self):
+        if self._eviction == "lru":
+            key = next(iter(self._recent))
+        else:
+            key = next(iter(self._by_uses[self._min_uses]))
+        self._remove(key)
+        self._evictions += 1
+
+    def _is_expired(self, added, now):
+        return self._ttl is not None and now - added > self._ttl
+
+    def _sweep(self, now):
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+
+        for key in [key for key, (_, _, added) in self._items.items() if self._is_expired(added, now)]:
+            self._remove(key)
+            self._expirations += 1
+
+    def __getitem__(self, key):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+
+            if key in self._items and self._is_expired(self._items[key][2], now):
+                self._remove(key)
+                self._expirations += 1
+
+            if key not in self._items:
+                self._misses += 1
+                raise KeyError(key)
+
+            self._add_use(key)
+            self._hits += 1
+            return self._items[key][0]
+
+    def __setitem__(self, key, item):
+        size = self._size_of(item)
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+
+            if key in self._items:
+                self._remove(key)
+
+            if self._max_size is not None and size > self._max_size:
+                # it would evict everything else, and then some
+                return
+
+            while self._max_size is not None and self._size + size > self._max_size:
+                self._evict()
+
+            self._items[key] = (item, size, now)
+            self._size += size
+            self._add_use(key, new=True)
+
+    def __delitem__(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def __contains__(self, key):
+        # unlike reading the item, checking for it isn't a use
+        with self._lock:
+            return key in self._items
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._items))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._items):
+                self._remove(key)
+
+    def metrics(self):
+        """
+        :return: dictionary with the number of ``entries``, their ``size`` (bytes), the ``max_size``, and how many
+                 ``hits``, ``misses``, ``evictions`` and ``expirations`` there were
+        :rtype: dict
+        """
+        with self._lock:
+            return {"entries": len(self._items),
+                    "size": self._size,
+                    "max_size": self._max_size,
+                    "hits": self._hits,
+                    "misses": self._misses,
+                    "evictions": self._evictions,
+                    "expirations": self._expirations}
+
+
+class BoundedMemoryCache(BaseCache):
+    """
+    ``requests-cache`` backend keeping the responses in memory, up to a total size. Unlike ``requests-cache``'s
+    memory backend, the expired responses are removed even if they're never requested again, so the memory used by
+    long running processes stays flat.
+
+    :param integer max_size: maximum size of the cached responses, in bytes, ``None`` for no limit
+    :param str eviction: which responses to evict when full, the least recently used (``"lru"``) or the least
+                         frequently used (``"lfu"``)
+    :param integer ttl: how many seconds to keep the responses for, ``None`` for no expiration
+    :param integer sweep_interval: how often to remove all the expired responses, in seconds
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    def __init__(self, max_size=DEFAULT_MEMORY_CACHE_SIZE, eviction="lru", ttl=None,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL, **options):
+        super(BoundedMemoryCache, self).__init__(**options)
+        self.responses = BoundedMemoryDict(max_size=max_size, eviction=eviction, ttl=ttl,
+                                           sweep_interval=sweep_interval)
+        # only used for redirects, mapping the original URLs to the final ones
+        self.keys_map = BoundedMemoryDict(max_size=None, ttl=ttl, sweep_interval=sweep_interval,
+                                          size_of=lambda item: 0)
+
+    def metrics(self):
+        """
+        :return: the metrics of the cached responses, see :py:meth:`BoundedMemoryDict.metrics`
+        :rtype: dict
+        """
+        return self.responses.metrics()
+
+
+class TieredDict(MutableMapping):
+    """
+    Dictionary-like interface to two tiers of storage: a fast one (e.g. a :py:class:`BoundedMemoryDict`) in front of
+    a slower, persistent one. Items are read from the first tier when found there, otherwise from the second one,
+    being copied to the first. Writes and deletions go to both tiers.
+
+    :param l1: the fast storage, holding a subset of the items
+    :param l2: the persistent storage, holding all the items
+    """
+    def __init__(self, l1, l2):
+        self.l1 = l1
+        self.l2 = l2
+
+    def __getitem__(self, key):
+        try:
+            return self.l1[key]
+        except KeyError:
+            pass
+
+        item = self.l2[key]
+        self.l1[key] = item
+        return item
+
+    def __setitem__(self, key, item):
+        self.l2[key] = item
+        self.l1[key] = item
+
+    def __delitem__(self, key):
+        try:
+            del self.l1[key]
+        except KeyError:
+            pass
+        del self.l2[key]
+
+    def __contains__(self, key):
+        return key in self.l1 or key in self.l2
+
+    def __iter__(self):
+        return iter(self.l2)
+
+    def __len__(self):
+        return len(self.l2)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    ``requests-cache`` backend keeping the most used responses in memory, in front of a persistent backend (e.g.
+    :py:class:`SqliteCache` or :py:class:`RedisCache`), so that they're returned without querying and deserializing
+    them again.
+
+    The responses are written to both tiers. If other processes share the persistent backend, the responses they
+    update are only seen once they're evicted from memory (or ``l1_ttl`` passes).
+
+    :param l2: the persistent ``requests-cache`` backend
+    :param integer l1_size: maximum size of the responses kept in memory, in bytes
+    :param str l1_eviction: which responses to evict from memory when full, ``"lru"`` or ``"lfu"``
+    :param integer l1_ttl: how many seconds to keep the responses in memory for, ``None`` for no expiration
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    def __init__(self, l2, l1_size=DEFAULT_L1_CACHE_SIZE, l1_eviction="lru", l1_ttl=None, **options):
+        super(TieredCache, self).__init__(**options)
+        self.l1 = BoundedMemoryCache(max_size=l1_size, eviction=l1_eviction, ttl=l1_ttl)
+        self.l2 = l2
+        self.responses = TieredDict(self.l1.responses, l2.responses)
+        self.keys_map = TieredDict(self.l1.keys_map, l2.keys_map)
+
+    def metrics(self):
+        """
+        :return: the metrics of the responses cached in memory, see :py:meth:`BoundedMemoryDict.metrics`
+        :rtype: dict
+        """
+        return self.l1.metrics()
+
+
+class RedisDict(MutableMapping):
+    """
+    Dictionary-like interface to a redis server, storing each item under its own key (``<prefix>:<key>``), so that the
+    items can expire on their own.
+
+    :param connection: ``redis.StrictRedis`` instance
+    :param str prefix: prefix of the redis keys
+    :param integer ttl: how many seconds to keep the items for, ``None`` for no expiration
+    :param codec: :py:class:`ResponseCodec` instance serializing the values
+    """
+    def __init__(self, connection, prefix, ttl=None, codec=None):
+        self.connection = connection
+        self.codec = codec or ResponseCodec()
+        self._prefix = prefix + ":"
+        self._ttl = ttl
+
+    def _key(self, key):
+        return self._prefix + key
+
+    def __getitem__(self, key):
+        value = self.connection.get(self._key(key))
+        if value is None:
+            raise KeyError(key)
+        return self.codec.loads(value)
+
+    def __setitem__(self, key, item):
+        self.connection.set(self._key(key), self.codec.dumps(item), ex=self._ttl)
+
+    def __delitem__(self, key):
+        if not self.connection.delete(self._key(key)):
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.connection.scan_iter(match=self._prefix + "*"):
+            if not isinstance(key, type(self._prefix)):
+                key = key.decode("utf-8")
+            yield key[len(self._prefix):]
+
+    def __len__(self):
+        return sum(1 for _ in self.connection.scan_iter(match=self._prefix + "*"))
+
+    def clear(self):
+        keys = list(self.connection.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self.connection.delete(*keys)
+
+
+class RedisCache(BaseCache):
+    """
+    ``requests-cache`` backend storing the responses on a redis server, so that several clients (e.g. running on
+    different machines) can share them.
+
+    :param connection: ``redis.StrictRedis`` instance
+    :param str prefix: prefix of the redis keys used by the cache
+    :param integer ttl: how many seconds to keep the responses for, ``None`` for no expiration
+    :param codec: :py:class:`ResponseCodec` instance compressing the responses
+    """
+    def __init__(self, connection, prefix="bgg", ttl=None, codec=None, **options):
+        super(RedisCache, self).__init__(**options)
+        self.responses = RedisDict(connection, prefix + ":responses", ttl=ttl, codec=codec)
+        self.keys_map = RedisDict(connection, prefix + ":urls", ttl=ttl)
+
+    @property
+    def compression_ratio(self):
+        """
+        :return: compression ratio of the responses stored or read so far, see
+                 :py:attr:`ResponseCodec.compression_ratio`
+        :rtype: float
+        """
+        return self.responses.codec.compression_ratio
@@ -29,3 +29,11 @@ class BoardGameGeekAPIRetryError(BoardGameGeekAPIError):
 
 class BoardGameGeekAPINonXMLError(BoardGameGeekAPIError):
     pass
+
+
+class BoardGameGeekRateLimitQueueFullError(BoardGameGeekError):
+    pass
+
+
+class BoardGameGeekCacheMissError(BoardGameGeekError):
+    pass
@@ -142,52 +142,78 @@ class BoardGame(Thing):
 
         kw = copy(data)
 
-        # if we have any "expansions" for this item..
-        if "expansions" not in kw:
-            kw["expansions"] = []
+        self._expansions = None             # list of Thing for the expansions
+        self._expands = None                # list of Thing which this item expands
+        self._boardgame_rank = None
+        self._boardgame_rank_loaded = False
 
-        for to_fix in ["thumbnail", "image"]:
-            if to_fix in kw:
-                kw[to_fix] = fix_url(kw[to_fix])
+        if isinstance(kw, dict):
+            # if we have any "expansions" for this item..
+            if "expansions" not in kw:
+                kw["expansions"] = []
 
-        self._expansions = []           # list of Thing for the expansions
-        self._expansions_set = set()    # set for making sure things are unique
+            # if this item expands something...
+            if "expands" not in kw:
+                kw["expands"] = []
+
+            for to_fix in ["thumbnail", "image"]:
+                if to_fix in kw:
+                    kw[to_fix] = fix_url(kw[to_fix])
+
+            self._load_expansions(kw)
+            self._load_expands(kw)
+            self._load_boardgame_rank(kw)
+
+        # otherwise the data is decoded as it's accessed (see :py:class:`boardgamegeek.loaders.LazyGameData`) and
+        # already has this form, the expansions and the rank are computed when they're first needed
+
+        super(BoardGame, self).__init__(kw)
+
+    # the lazily decoded games are shared by threads (e.g. through the object cache), so the lists and the rank are
+    # built first and assigned at the end, never being seen partially built
+
+    def _load_expansions(self, kw):
+        expansions = []                 # list of Thing for the expansions
+        expansions_set = set()          # set for making sure things are unique
         for data in kw["expansions"]:
             try:
-                if data["id"] not in self._expansions_set:
-                    self._expansions_set.add(data["id"])
-                    self._expansions.append(Thing(data))
+                if data["id"] not in expansions_set:
+                    expansions_set.add(data["id"])
+                    expansions.append(Thing(data))
             except KeyError:
                 raise BoardGameGeekError("invalid expansion data")
 
-        # if this item expands something...
-        if "expands" not in kw:
-            kw["expands"] = []
+        self._expansions_set = expansions_set
+        self._expansions = expansions
 
-        self._expands = []              # list of Thing which this item expands
-        self._expands_set = set()       # set for keeping things unique
+    def _load_expands(self, kw):
+        expands = []                    # list of Thing which this item expands
+        expands_set = set()             # set for keeping things unique
         for data in kw["expands"]:         # for all the items this game expands, create a Thing
             try:
-                if data["id"] not in self._expands_set:
-                    self._expands_set.add(data["id"])
-                    self._expands.append(Thing(data))
+                if data["id"] not in expands_set:
+                    expands_set.add(data["id"])
+                    expands.append(Thing(data))
             except KeyError:
                 raise BoardGameGeekError("invalid expanded game data")
 
-        self.boardgame_rank = None
+        self._expands_set = expands_set
+        self._expands = expands
+
+    def _load_boardgame_rank(self, kw):
+        boardgame_rank = None
 
         if "ranks" in kw:
             # try to search for the boardgame rank of this game
             for rank in kw["ranks"]:
                 if rank.get("name") == "boardgame":
                     value = rank.get("value")
-                    if value is None:
-                        self.boardgame_rank = None
-                    else:
-                        self.boardgame_rank = int(value)
+                    if value is not None:
+                        boardgame_rank = int(value)
                     break
 
-        super(BoardGame, self).__init__(kw)
+        self._boardgame_rank = boardgame_rank
+        self._boardgame_rank_loaded = True
 
     def __repr__(self):
         return "BoardGame (id: {})".format(self.id)
@@ -199,6 +225,9 @@ class BoardGame(Thing):
         :param dict data: expanded game's data
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` if data is invalid
         """
+        if self._expands is None:
+            self._load_expands(self._data)
+
         try:
             if data["id"] not in self._expands_set:
                 self._data["expands"].append(data)
@@ -214,6 +243,9 @@ class BoardGame(Thing):
         :param dict data: expansion data
         :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` if data is invalid
         """
+        if self._expansions is None:
+            self._load_expansions(self._data)
+
         try:
             if data["id"] not in self._expansions_set:
                 self._data["expansions"].append(data)
@@ -295,6 +327,42 @@ class BoardGame(Thing):
         log.info("ranks             : {}".format(self.ranks))
         log.info("description       : {}".format(self.description))
 
+    @property
+    def boardgame_rank(self):
+        """
+        :return: the game's rank in the board games ranking
+        :rtype: integer
+        :return: ``None`` if not ranked
+        """
+        if not self._boardgame_rank_loaded:
+            self._load_boardgame_rank(self._data)
+        return self._boardgame_rank
+
+    @boardgame_rank.setter
+    def boardgame_rank(self, value):
+        self._boardgame_rank = value
+        self._boardgame_rank_loaded = True
+
+    def data(self):
+        """
+        Access to the internal data dictionary, for easy dumping
+        :return: the internal data dictionary
+        """
+        data = self._data
+        if not isinstance(data, dict):
+            # decode everything, the data is plain from now on (decoding it again returns the same dictionary, in case
+            # another thread is doing it as well)
+            data = data.decode_all()
+            self._data = data
+
+        # creating the Things converts the ids of the expansions, as when the game is created out of a dictionary
+        if self._expansions is None:
+            self._load_expansions(data)
+        if self._expands is None:
+            self._load_expands(data)
+
+        return data
+
     @property
     def alternative_names(self):
         """
@@ -359,6 +427,8 @@ class BoardGame(Thing):
         :return: expansions
         :rtype: list of :py:class:`boardgamegeek.things.Thing`
         """
+        if self._expansions is None:
+            self._load_expansions(self._data)
         return self._expansions
 
     @property
@@ -367,6 +437,8 @@ class BoardGame(Thing):
         :return: games this item expands
         :rtype: list of :py:class:`boardgamegeek.things.Thing`
         """
+        if self._expands is None:
+            self._load_expands(self._data)
         return self._expands
 
     @property
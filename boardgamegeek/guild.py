@@ -19,6 +19,16 @@ class Guild(Thing):
     """
     Class containing guild information
     """
+    def add_member(self, name):
+        """
+        Add a member to this guild
+
+        :param str name: member's name
+        """
+        if "members" not in self._data:
+            self._data["members"] = []
+        self._data["members"].append(name)
+
     def _format(self, log):
         log.info("id         : {}".format(self.id))
         log.info("name       : {}".format(self.name))
@@ -0,0 +1,719 @@
+# coding: utf-8
+"""
+:mod:`boardgamegeek.loaders` - Parsing XML responses into objects
+=================================================================
+
+.. module:: boardgamegeek.loaders
+   :platform: Unix, Windows
+   :synopsis: functions which create library objects out of the XML returned by the BGG API
+
+.. moduleauthor:: Cosmin Luță <q4break@gmail.com>
+
+"""
+from __future__ import unicode_literals
+
+import datetime
+import logging
+import sys
+import threading
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+# This is required for decoding HTML entities from the description text
+# of games
+if sys.version_info >= (3,):
+    import html.parser as hp
+else:
+    import HTMLParser as hp
+
+from .games import BoardGame
+from .guild import Guild
+from .user import User
+from .collection import Collection
+from .hotitems import HotItems
+from .plays import Plays
+from .search import SearchResult
+from .exceptions import BoardGameGeekAPIError, BoardGameGeekError
+from .utils import xml_subelement_attr, xml_subelement_text, xml_subelement_attr_list, fix_unsigned_negative
+from .utils import fix_url, xml_find, xml_findall
+
+
+log = logging.getLogger("boardgamegeek.loaders")
+
+# the <link> types of a game holding lists of names -> their keys in the game's data (expansions are handled separately)
+GAME_LINK_TYPES = {"boardgamefamily": "families",
+                   "boardgamecategory": "categories",
+                   "boardgameimplementation": "implementations",
+                   "boardgamemechanic": "mechanics",
+                   "boardgamedesigner": "designers",
+                   "boardgameartist": "artists",
+                   "boardgamepublisher": "publishers"}
+
+# the elements of a game holding integer values
+GAME_INT_ELEMENTS = ["yearpublished", "minplayers", "maxplayers", "playingtime", "minage"]
+
+# the statistics of a game (children of <ratings>) -> their types
+GAME_STATS = {"usersrated": int,
+              "average": float,
+              "bayesaverage": float,
+              "stddev": float,
+              "median": float,
+              "owned": int,
+              "trading": int,
+              "wanting": int,
+              "wishing": int,
+              "numcomments": int,
+              "numweights": int,
+              "averageweight": float}
+
+# all the keys of a game's data
+GAME_KEYS = (["id", "thumbnail", "image", "expansion", "expansions", "expands", "description", "name",
+              "alternative_names", "ranks"] + sorted(GAME_LINK_TYPES.values()) + GAME_INT_ELEMENTS + sorted(GAME_STATS))
+
+try:
+    # HTMLParser.unescape() is gone in newer Python versions, html.unescape() replaces it
+    from html import unescape as html_unescape
+except ImportError:
+    html_unescape = hp.HTMLParser().unescape
+
+
+def create_game_from_xml(xml_root, game_id=None, lazy=False):
+    """
+    Creates a :py:class:`boardgamegeek.games.BoardGame` out of an ``<item>`` element returned by the ``/thing`` API
+
+    :param xml_root: the ``<item>`` element containing the game's data
+    :param integer game_id: id of the game; if ``None``, it's read from the ``<item>`` element
+    :param bool lazy: if ``True``, the game keeps a reference to ``xml_root`` and decodes its data as it's accessed,
+                      see :py:class:`LazyGameData`
+    :return: ``BoardGame`` object
+    :rtype: :py:class:`boardgamegeek.games.BoardGame`
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` if the item is not a board game
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekAPIError` if the item couldn't be parsed
+    """
+    if game_id is None:
+        try:
+            game_id = int(xml_root.attrib["id"])
+        except (KeyError, ValueError):
+            raise BoardGameGeekAPIError("item without a valid id")
+
+    game_type = xml_root.attrib.get("type")
+    if game_type not in ["boardgame", "boardgameexpansion"]:
+        log.debug("item id {} is not a boardgame (type: {})".format(game_id, game_type))
+        raise BoardGameGeekError("item is not a board game")
+
+    if lazy:
+        return BoardGame(LazyGameData(xml_root, game_id))
+
+    kwargs = {"id": game_id,
+              "thumbnail": None,
+              "image": None,
+              "expansion": game_type == "boardgameexpansion",       # is this game an expansion?
+              "expansions": [],     # list of expansions this game has
+              "expands": [],        # list of items this game expands
+              "description": None,
+              "name": None,
+              "alternative_names": [],
+              "ranks": []}
+    kwargs.update({attr: [] for attr in GAME_LINK_TYPES.values()})
+    kwargs.update({tag: None for tag in GAME_INT_ELEMENTS})
+    kwargs.update({tag: None for tag in GAME_STATS})
+
+    # walk the children once, instead of searching the item for each piece of information. Only the first element of
+    # the ones which aren't lists is used.
+    seen = set()
+    for el in xml_root:
+        tag = el.tag
+
+        if tag == "link":
+            link_type = el.attrib.get("type")
+            if link_type == "boardgameexpansion":
+                item = {"id": el.attrib["id"],
+                        "name": el.attrib["value"]}
+
+                if el.attrib.get("inbound", "false").lower()[0] == 't':
+                    # this is an item expanded by game_id
+                    kwargs["expands"].append(item)
+                else:
+                    kwargs["expansions"].append(item)
+            elif link_type in GAME_LINK_TYPES:
+                kwargs[GAME_LINK_TYPES[link_type]].append(el.attrib.get("value"))
+
+        elif tag == "name":
+            if el.attrib.get("type") == "alternate":
+                kwargs["alternative_names"].append(el.attrib.get("value"))
+            elif el.attrib.get("type") == "primary" and "name" not in seen:
+                seen.add("name")
+                kwargs["name"] = el.attrib.get("value")
+
+        elif tag in seen:
+            continue
+
+        elif tag in ["thumbnail", "image"]:
+            seen.add(tag)
+            kwargs[tag] = el.text
+
+        elif tag == "description":
+            seen.add(tag)
+            kwargs["description"] = _convert_quietly(el.text, html_unescape)
+
+        elif tag in GAME_INT_ELEMENTS:
+            # These XML elements have a numeric value, attempt to convert them to integers
+            seen.add(tag)
+            kwargs[tag] = _convert_quietly(el.attrib.get("value"), int)
+
+        elif tag == "statistics":
+            seen.add(tag)
+            ratings = xml_find(el, "ratings")
+            if ratings is not None:
+                _add_game_stats_from_xml(kwargs, ratings)
+
+    return BoardGame(kwargs)
+
+
+class LazyGameData(MutableMapping):
+    """
+    The data of a :py:class:`boardgamegeek.games.BoardGame`, decoded out of its ``<item>`` element only when (and if)
+    it's accessed. Each value is decoded at most once, the same way :py:func:`create_game_from_xml` does it, and the
+    element is released once everything was decoded.
+
+    The element is kept in memory until then: the subtree of the game for ElementTree, the whole response for lxml.
+    The data can be accessed from several threads.
+
+    :param xml_root: the ``<item>`` element containing the game's data
+    :param integer game_id: id of the game
+    """
+    def __init__(self, xml_root, game_id):
+        self._xml = xml_root
+        self._data = {"id": game_id,
+                      "expansion": xml_root.attrib.get("type") == "boardgameexpansion"}
+        self._deleted = set()
+        self._lock = threading.Lock()   # held while decoding, since the element is released afterwards
+
+    def _decode(self, key):
+        xml_root = self._xml
+
+        if key in GAME_LINK_TYPES.values() or key in ["expansions", "expands"]:
+            links = {attr: [] for attr in GAME_LINK_TYPES.values()}
+            links.update({"expansions": [], "expands": []})
+
+            for el in xml_findall(xml_root, "link"):
+                link_type = el.attrib.get("type")
+                if link_type == "boardgameexpansion":
+                    item = {"id": el.attrib["id"],
+                            "name": el.attrib["value"]}
+                    if el.attrib.get("inbound", "false").lower()[0] == 't':
+                        links["expands"].append(item)
+                    else:
+                        links["expansions"].append(item)
+                elif link_type in GAME_LINK_TYPES:
+                    links[GAME_LINK_TYPES[link_type]].append(el.attrib.get("value"))
+
+            self._set_decoded(links)
+
+        elif key == "name":
+            self._set_decoded({key: xml_subelement_attr(xml_root, "name[@type='primary']")})
+
+        elif key == "alternative_names":
+            self._set_decoded({key: xml_subelement_attr_list(xml_root, "name[@type='alternate']")})
+
+        elif key in ["thumbnail", "image"]:
+            self._set_decoded({key: fix_url(xml_subelement_text(xml_root, key))})
+
+        elif key == "description":
+            self._set_decoded({key: _convert_quietly(xml_subelement_text(xml_root, key), html_unescape)})
+
+        elif key in GAME_INT_ELEMENTS:
+            self._set_decoded({key: _convert_quietly(xml_subelement_attr(xml_root, key), int)})
+
+        elif key in GAME_STATS or key == "ranks":
+            statistics = xml_find(xml_root, "statistics")
+            ratings = xml_find(statistics, "ratings") if statistics is not None else None
+            if ratings is None:
+                self._set_decoded({"ranks": []})
+                self._set_decoded({stat: None for stat in GAME_STATS})
+            elif key in GAME_STATS:
+                self._set_decoded({key: _convert_quietly(xml_subelement_attr(ratings, key), GAME_STATS[key])})
+            else:
+                stats = {"ranks": []}
+                for ranks in xml_findall(ratings, "ranks"):
+                    _add_game_ranks_from_xml(stats, ranks)
+                self._set_decoded(stats)
+
+    def _set_decoded(self, values):
+        for key, value in values.items():
+            # don't overwrite the values which were changed or deleted
+            if key not in self._data and key not in self._deleted:
+                self._data[key] = value
+
+        if self._xml is not None and all(key in self._data or key in self._deleted for key in GAME_KEYS):
+            # everything was decoded
+            self._xml = None
+
+    def decode_all(self):
+        """
+        Decodes all the data
+
+        :return: ``dict`` containing the data of the game
+        """
+        with self._lock:
+            for key in GAME_KEYS:
+                if self._xml is None:
+                    break
+                if key not in self._data and key not in self._deleted:
+                    self._decode(key)
+
+        return self._data
+
+    def __getitem__(self, key):
+        if key not in self._data and key in GAME_KEYS:
+            with self._lock:
+                # checked again with the lock held, another thread could have decoded everything in the meantime
+                if key not in self._data and key not in self._deleted and self._xml is not None:
+                    self._decode(key)
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        with self._lock:
+            self._data.pop(key, None)
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        # the keys are known without decoding anything
+        if key in self._data:
+            return True
+        return self._xml is not None and key in GAME_KEYS and key not in self._deleted
+
+    def __iter__(self):
+        for key in GAME_KEYS:
+            if key in self:
+                yield key
+        for key in list(self._data):
+            if key not in GAME_KEYS:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __copy__(self):
+        data = LazyGameData.__new__(LazyGameData)
+        with self._lock:
+            data._xml = self._xml
+            data._data = dict(self._data)
+            data._deleted = set(self._deleted)
+        data._lock = threading.Lock()
+        return data
+
+    def __reduce__(self):
+        # pickled as a plain dictionary, the elements can't always be pickled
+        return dict, (self.decode_all(),)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def _convert_quietly(value, convert):
+    # like the xml_subelement_* helpers with quiet=True: None if the value is missing or can't be converted
+    if value is None:
+        return None
+    try:
+        return convert(value)
+    except:
+        return None
+
+
+def _add_game_stats_from_xml(kwargs, ratings):
+    """
+    Adds the statistics and ranks of a game to the ``kwargs`` of its :py:class:`boardgamegeek.games.BoardGame`, walking
+    the children of its ``<ratings>`` element once
+
+    :param dict kwargs: the data of the game
+    :param ratings: the ``<ratings>`` element of the game
+    """
+    seen = set()
+    for el in ratings:
+        tag = el.tag
+        if tag in GAME_STATS:
+            if tag not in seen:
+                seen.add(tag)
+                kwargs[tag] = _convert_quietly(el.attrib.get("value"), GAME_STATS[tag])
+        elif tag == "ranks":
+            _add_game_ranks_from_xml(kwargs, el)
+
+
+def _add_game_ranks_from_xml(kwargs, ranks):
+    for rank in ranks:
+        if rank.tag != "rank":
+            continue
+        try:
+            rank_value = int(rank.attrib.get("value"))
+        except:
+            rank_value = None
+        kwargs["ranks"].append({"name": rank.attrib.get("name"),
+                                "friendlyname": rank.attrib.get("friendlyname"),
+                                "value": rank_value})
+
+
+def create_guild_from_xml(xml_root, guild_id):
+    """
+    Creates a :py:class:`boardgamegeek.guild.Guild` out of the first page returned by the ``/guild`` API
+
+    :param xml_root: root element of the API response
+    :param integer guild_id: id of the guild
+    :return: ``Guild`` object, containing the members from this page
+    :rtype: :py:class:`boardgamegeek.guild.Guild`
+    :return: ``None`` if the response doesn't contain guild information
+    """
+    if "name" not in xml_root.attrib:
+        log.warning("unable to get guild information (name not found) for guild id {}".format(guild_id))
+        return None
+
+    kwargs = {"name": xml_root.attrib["name"],
+              "created": xml_root.attrib.get("created"),
+              "id": guild_id,
+              "members": []}
+
+    # grab initial info from first page
+    for tag in ["category", "website", "manager"]:
+        kwargs[tag] = xml_subelement_text(xml_root, tag)
+
+    kwargs["description"] = xml_subelement_text(xml_root, "description", convert=html_unescape, quiet=True)
+
+    # Grab location info
+    location = xml_find(xml_root, "location")
+    if location is not None:
+        kwargs["city"] = xml_subelement_text(location, "city")
+        kwargs["country"] = xml_subelement_text(location, "country")
+        kwargs["postalcode"] = xml_subelement_text(location, "postalcode")
+        kwargs["addr1"] = xml_subelement_text(location, "addr1")
+        kwargs["addr2"] = xml_subelement_text(location, "addr2")
+        kwargs["stateorprovince"] = xml_subelement_text(location, "stateorprovince")
+
+    guild = Guild(kwargs)
+
+    add_guild_members_from_xml(guild, xml_root)
+
+    return guild
+
+
+def get_guild_member_count_from_xml(xml_root):
+    """
+    Returns the total number of members of a guild, from a page returned by the ``/guild`` API
+
+    :param xml_root: root element of the API response
+    :return: number of members
+    :rtype: integer
+    """
+    el = xml_find(xml_root, ".//members[@count]")
+    return int(el.attrib["count"])
+
+
+def add_guild_members_from_xml(guild, xml_root):
+    """
+    Adds the members found in a page returned by the ``/guild`` API to a guild
+
+    :param guild: the :py:class:`boardgamegeek.guild.Guild` to add the members to
+    :param xml_root: root element of the API response
+    :return: ``True`` if members were added
+    :rtype: bool
+    """
+    added_member = False
+    for el in xml_findall(xml_root, ".//member"):
+        guild.add_member(el.attrib["name"])
+        added_member = True
+    return added_member
+
+
+def create_user_from_xml(xml_root):
+    """
+    Creates a :py:class:`boardgamegeek.user.User` out of the first page returned by the ``/user`` API
+
+    :param xml_root: root element of the API response
+    :return: ``User`` object, containing the buddies and guilds from this page
+    :rtype: :py:class:`boardgamegeek.user.User`
+    :return: ``None`` if the response doesn't contain user information
+    """
+    # when the user is not found, the API returns an response, but with most fields empty. id is empty too
+    try:
+        kwargs = {"name": xml_root.attrib["name"],
+                  "id": int(xml_root.attrib["id"])}
+    except:
+        return None
+
+    for i in ["firstname", "lastname", "avatarlink",
+              "stateorprovince", "country", "webaddress", "xboxaccount",
+              "wiiaccount", "steamaccount", "psnaccount", "traderating"]:
+        kwargs[i] = xml_subelement_attr(xml_root, i)
+
+    kwargs["lastlogin"] = xml_subelement_attr(xml_root,
+                                              "lastlogin",
+                                              convert=lambda x: datetime.datetime.strptime(x, "%Y-%m-%d"),
+                                              quiet=True)
+
+    kwargs["yearregistered"] = xml_subelement_attr(xml_root, "yearregistered", convert=int, quiet=True)
+
+    user = User(kwargs)
+
+    # add top items
+    for top_item in xml_findall(xml_root, ".//top/item"):
+        user.add_top_item({"id": int(top_item.attrib["id"]),
+                           "name": top_item.attrib["name"]})
+
+    # add hot items
+    for hot_item in xml_findall(xml_root, ".//hot/item"):
+        user.add_hot_item({"id": int(hot_item.attrib["id"]),
+                           "name": hot_item.attrib["name"]})
+
+    add_user_buddies_and_guilds_from_xml(user, xml_root)
+
+    return user
+
+
+def get_user_buddy_and_guild_count_from_xml(xml_root):
+    """
+    Returns the total number of buddies and guilds of an user, from the first page returned by the ``/user`` API
+
+    :param xml_root: root element of the API response
+    :return: tuple (total buddies, total guilds)
+    """
+    total_buddies = 0
+    total_guilds = 0
+
+    buddies = xml_find(xml_root, "buddies")
+    if buddies is not None:
+        total_buddies = int(buddies.attrib["total"])
+
+    guilds = xml_find(xml_root, "guilds")
+    if guilds is not None:
+        total_guilds = int(guilds.attrib["total"])
+
+    return total_buddies, total_guilds
+
+
+def add_user_buddies_and_guilds_from_xml(user, xml_root):
+    """
+    Adds the buddies and guilds found in a page returned by the ``/user`` API to an user
+
+    :param user: the :py:class:`boardgamegeek.user.User` to add the data to
+    :param xml_root: root element of the API response
+    :return: ``True`` if any buddy or guild was added
+    :rtype: bool
+    """
+    added_items = False
+
+    for buddy in xml_findall(xml_root, ".//buddy"):
+        user.add_buddy({"name": buddy.attrib["name"],
+                        "id": buddy.attrib["id"]})
+        added_items = True
+
+    for guild in xml_findall(xml_root, ".//guild"):
+        user.add_guild({"name": guild.attrib["name"],
+                        "id": guild.attrib["id"]})
+        added_items = True
+
+    return added_items
+
+
+def create_plays_from_xml(xml_root, game_id=None):
+    """
+    Creates a :py:class:`boardgamegeek.plays.Plays` out of the first page returned by the ``/plays`` API
+
+    :param xml_root: root element of the API response
+    :param integer game_id: id of the game, if retrieving a game's plays; ``None`` if retrieving an user's plays
+    :return: ``Plays`` object, containing the plays from this page
+    :rtype: :py:class:`boardgamegeek.plays.Plays`
+    :return: ``None`` if the response doesn't contain plays information
+    """
+    if "total" not in xml_root.attrib:
+        # in case of error, the root node doesn't have a 'total' attribute
+        return None
+
+    if game_id is None:
+        plays = Plays({"username": xml_root.attrib["username"],
+                       "user_id": int(xml_root.attrib["userid"])})
+    else:
+        plays = Plays({"game_id": game_id})
+
+    add_plays_from_xml(plays, xml_root)
+
+    return plays
+
+
+def get_plays_count_from_xml(xml_root):
+    """
+    Returns the total number of plays, from a page returned by the ``/plays`` API
+
+    :param xml_root: root element of the API response
+    :return: number of plays
+    :rtype: integer
+    """
+    return int(xml_root.attrib["total"])
+
+
+def add_plays_from_xml(plays, xml_root):
+    """
+    Adds the plays found in a page returned by the ``/plays`` API
+
+    :param plays: the :py:class:`boardgamegeek.plays.Plays` to add the plays to
+    :param xml_root: root element of the API response
+    :return: ``True`` if plays were added
+    :rtype: bool
+    """
+    added_plays = False
+    for play in xml_findall(xml_root, ".//play"):
+        added_plays = True
+        add_play_from_xml(plays, play)
+
+    return added_plays
+
+
+def add_play_from_xml(plays, play):
+    """
+    Adds a play to a :py:class:`boardgamegeek.plays.Plays`
+
+    :param plays: the :py:class:`boardgamegeek.plays.Plays` to add the play to
+    :param play: ``<play>`` element from a page returned by the ``/plays`` API
+    """
+    # if we're listing plays by game, each <play> has an userid. If this isn't set, we must be listing
+    # an user's collection, thus set it from plays.user_id
+    userid = int(play.attrib.get("userid", plays.user_id))
+
+    player_list = []
+    # TODO: add the game subtype too
+    kwargs = {"id": int(play.attrib["id"]),
+              "date": play.attrib["date"],
+              "quantity": int(play.attrib["quantity"]),
+              "duration": int(play.attrib["length"]),
+              "incomplete": int(play.attrib["incomplete"]),
+              "nowinstats": int(play.attrib["nowinstats"]),
+              "user_id": userid,
+              "game_id": xml_subelement_attr(play, "item", attribute="objectid", convert=int),
+              "game_name": xml_subelement_attr(play, "item", attribute="name"),
+              "comment": xml_subelement_text(play, "comments"),
+              "players": player_list}
+
+    for player in xml_findall(play, ".//player"):
+        player_data = {"username": player.attrib.get("username"),
+                       "user_id": int(player.attrib.get("userid", -1)),
+                       "name": player.attrib.get("name"),
+                       "startposition": player.attrib.get("startposition"),
+                       "new": player.attrib.get("new"),
+                       "win": player.attrib.get("win"),
+                       "rating": player.attrib.get("rating"),
+                       "score": player.attrib.get("score")}
+
+        player_list.append(player_data)
+    plays.add_play(kwargs)
+
+
+def create_hot_items_from_xml(xml_root):
+    """
+    Creates a :py:class:`boardgamegeek.hotitems.HotItems` out of the response of the ``/hot`` API
+
+    :param xml_root: root element of the API response
+    :return: ``HotItems`` object
+    :rtype: :py:class:`boardgamegeek.hotitems.HotItems`
+    """
+    hot_items = HotItems({})
+
+    for item in xml_findall(xml_root, "item"):
+        kwargs = {"name": xml_subelement_attr(item, "name"),
+                  "id": int(item.attrib["id"]),
+                  "rank": int(item.attrib["rank"]),
+                  "yearpublished": xml_subelement_attr(item, "yearpublished", convert=int, quiet=True),
+                  "thumbnail": xml_subelement_attr(item, "thumbnail")}
+        hot_items.add_hot_item(kwargs)
+
+    return hot_items
+
+
+def create_collection_from_xml(xml_root, user_name):
+    """
+    Creates a :py:class:`boardgamegeek.collection.Collection` out of the response of the ``/collection`` API
+
+    :param xml_root: root element of the API response
+    :param str user_name: the owner of the collection
+    :return: ``Collection`` object
+    :rtype: :py:class:`boardgamegeek.collection.Collection`
+    :return: ``None`` if the API returned an error (e.g. invalid user name)
+    """
+    # check if there's an error (e.g. invalid username)
+    error = xml_find(xml_root, ".//error")
+    if error is not None:
+        message = xml_subelement_text(error, "message")
+        log.error("error fetching collection for {}: {}".format(user_name, message))
+        return None
+
+    collection = Collection({"owner": user_name, "items": []})
+
+    # search for all boardgames in the collection, add them to the list
+    for xml_el in xml_findall(xml_root, ".//item[@subtype='boardgame']"):
+        add_collection_item_from_xml(collection, xml_el)
+
+    return collection
+
+
+def add_collection_item_from_xml(collection, xml_el):
+    """
+    Adds an item to a :py:class:`boardgamegeek.collection.Collection`, if it's a board game
+
+    :param collection: the :py:class:`boardgamegeek.collection.Collection` to add the item to
+    :param xml_el: ``<item>`` element from the response of the ``/collection`` API
+    """
+    if xml_el.attrib.get("subtype") != "boardgame":
+        return
+
+    # get the user's rating for this game in his collection
+    stats = xml_find(xml_el, "stats")
+    rating = xml_subelement_attr(stats, "rating", convert=float, quiet=True)
+
+    # name and id of the game in collection
+    game = {"name": xml_subelement_text(xml_el, "name"),
+            "id": int(xml_el.attrib.get("objectid")),
+            "rating": rating}
+
+    status = xml_find(xml_el, "status")
+    game.update({stat: status.attrib.get(stat) for stat in ["lastmodified",
+                                                            "own",
+                                                            "preordered",
+                                                            "prevowned",
+                                                            "want",
+                                                            "wanttobuy",
+                                                            "wanttoplay",
+                                                            "fortrade",
+                                                            "wishlist",
+                                                            "wishlistpriority"]})
+
+    collection.add_game(game)
+
+
+def create_search_results_from_xml(xml_root):
+    """
+    Creates the list of results out of the response of the ``/search`` API
+
+    :param xml_root: root element of the API response
+    :return: list of ``SearchResult``
+    :rtype: list of :py:class:`boardgamegeek.search.SearchResult`
+    """
+    results = []
+    for item in xml_findall(xml_root, "item"):
+        kwargs = {"id": item.attrib["id"],
+                  "name": xml_subelement_attr(item, "name"),
+                  "yearpublished": fix_unsigned_negative(xml_subelement_attr(item,
+                                                                             "yearpublished",
+                                                                             default=0,
+                                                                             convert=int,
+                                                                             quiet=True)),
+                  "type": item.attrib["type"]}
+
+        results.append(SearchResult(kwargs))
+
+    return results
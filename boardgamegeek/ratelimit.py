@@ -0,0 +1,549 @@
+# coding: utf-8
+"""
+:mod:`boardgamegeek.ratelimit` - Rate limiting
+==============================================
+
+Limiters used for spacing out the requests made to the BGG site, so that the clients don't get throttled.
+
+By default each client gets its own limiter. Clients which should share the request budget (for example, several
+clients using the same IP address) can be given the same limiter object::
+
+    >>> limiter = TokenBucketRateLimiter(rpm=30, burst=5)
+    >>> bgg1 = BoardGameGeek(rate_limiter=limiter)
+    >>> bgg2 = BoardGameGeek(rate_limiter=limiter)
+
+Processes running on the same host can share the budget using a :py:class:`SqliteRateLimiter`.
+
+.. module:: boardgamegeek.ratelimit
+   :platform: Unix, Windows
+   :synopsis: rate limiting for the requests made to the BGG site
+
+.. moduleauthor:: Cosmin Luță <q4break@gmail.com>
+"""
+from __future__ import unicode_literals
+
+import contextlib
+import email.utils
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .exceptions import BoardGameGeekError, BoardGameGeekRateLimitQueueFullError
+
+
+log = logging.getLogger("boardgamegeek.ratelimit")
+
+DEFAULT_REQUESTS_PER_MINUTE = 30
+
+# HTTP status codes with which BGG signals that requests are made too often
+THROTTLING_STATUS_CODES = [429, 503]
+
+# request priority classes, from the highest to the lowest
+PRIORITIES = ["interactive", "normal", "bulk"]
+DEFAULT_PRIORITY = "normal"
+
+# how long (in seconds) a request has to wait in order to be promoted to the next priority class
+DEFAULT_PRIORITY_AGING = 60
+
+_request_context = threading.local()
+
+
+def get_request_priority():
+    """
+    :return: the priority of the requests made by the current thread
+    :rtype: str
+    """
+    return getattr(_request_context, "priority", None) or DEFAULT_PRIORITY
+
+
+@contextlib.contextmanager
+def request_priority(priority):
+    """
+    Context manager setting the priority of the requests made by the current thread
+
+    :param str priority: one of :py:data:`PRIORITIES`, ``None`` for leaving the current priority unchanged
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid priority
+    """
+    if priority is not None and priority not in PRIORITIES:
+        raise BoardGameGeekError("invalid priority: {}".format(priority))
+
+    previous = getattr(_request_context, "priority", None)
+    _request_context.priority = priority or previous
+    try:
+        yield
+    finally:
+        _request_context.priority = previous
+
+
+def parse_retry_after(value):
+    """
+    Parses the value of a ``Retry-After`` HTTP header
+
+    :param str value: the header's value, either a number of seconds or a HTTP date
+    :return: the number of seconds to wait
+    :rtype: float
+    :return: ``None`` if the value is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+class TokenBucketRateLimiter(object):
+    """
+    Token bucket rate limiter. The bucket holds up to ``burst`` tokens and is refilled at a rate of ``rpm`` tokens per
+    minute; each request consumes a token, waiting for one to become available if the bucket is empty.
+
+    With ``burst=1`` (default) there's an interval of at least 60 / ``rpm`` seconds between consecutive requests,
+    larger values allow short bursts of requests while keeping the same average rate.
+
+    Requests which have to wait are queued and sleep without holding any lock. Each one has a priority (one of
+    :py:data:`PRIORITIES`): the queued requests of the highest priority are served first, in the order in which they
+    arrived. So that lower priority requests don't wait forever, a request is promoted to the next priority class
+    after each ``aging`` seconds spent in the queue. The number of requests waiting can be capped with ``max_queue``.
+
+    :param rpm: how many requests per minute to allow
+    :param integer burst: how many requests can be made in a row without waiting
+    :param bool per_path: if ``True``, each API endpoint (URL path) gets its own bucket, so requests to one endpoint
+                          don't delay the ones to another
+    :param integer max_queue: how many requests (per bucket) can be waiting for their turn, at least 1. Requests
+                              beyond this limit fail with
+                              :py:exc:`boardgamegeek.exceptions.BoardGameGeekRateLimitQueueFullError` instead of
+                              waiting. ``None`` (default) means no limit.
+    :param float aging: how many seconds a queued request waits before being promoted to the next priority class
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid burst size or queue length
+    """
+    # whether the methods may block on I/O (e.g. waiting for other processes), in which case the asyncio client calls
+    # them in a thread
+    blocking = False
+
+    def __init__(self, rpm=DEFAULT_REQUESTS_PER_MINUTE, burst=1, per_path=False, max_queue=None,
+                 aging=DEFAULT_PRIORITY_AGING):
+        if rpm <= 0:
+            log.warning("invalid requests per minute value ({}), falling back to default".format(rpm))
+            rpm = DEFAULT_REQUESTS_PER_MINUTE
+
+        try:
+            burst = int(burst)
+        except:
+            raise BoardGameGeekError("invalid burst size")
+
+        if burst < 1:
+            raise BoardGameGeekError("invalid burst size")
+
+        if max_queue is not None and max_queue < 1:
+            # every request goes through the queue, even the ones which don't have to wait
+            raise BoardGameGeekError("invalid maximum queue length")
+
+        if aging <= 0:
+            raise BoardGameGeekError("invalid priority aging interval")
+
+        self._rate = float(rpm) / 60.0         # tokens added to the bucket each second
+        self._burst = burst
+        self._per_path = per_path
+        self._max_queue = max_queue
+        self._aging = float(aging)
+        self._buckets = {}                      # bucket key -> [tokens, time of last refill]. The tokens go negative
+                                                # when the requests are paused (e.g. because of a Retry-After header)
+        self._lock = threading.Lock()
+        self._queues = {}                       # bucket key -> list of queued requests (priority, sequence number,
+                                                # time when queued)
+        self._queue_sequence = 0
+        self._queue_changed = threading.Condition()
+        self._queue_version = 0                 # incremented when requests leave the queues
+
+    @property
+    def requests_per_minute(self):
+        """
+        :return: how many requests per minute are allowed
+        :rtype: float
+        """
+        return self._rate * 60.0
+
+    @property
+    def burst(self):
+        """
+        :return: the size of the bucket
+        :rtype: integer
+        """
+        return self._burst
+
+    def _refill(self, bucket):
+        """
+        Adds the tokens accumulated since the last refill to ``bucket``
+        """
+        now = time.time()
+        bucket[0] = min(float(self._burst), bucket[0] + (now - bucket[1]) * self._rate)
+        bucket[1] = now
+
+    def _bucket(self, path):
+        """
+        Returns the bucket used for ``path``, refilled up to the current time. Must be called with the lock held.
+        """
+        key = path if self._per_path else None
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self._burst), time.time()]
+        else:
+            self._refill(bucket)
+
+        return bucket
+
+    @contextlib.contextmanager
+    def _locked_bucket(self, path):
+        """
+        Context manager providing exclusive access to the bucket used for ``path``, refilled up to the current time
+        """
+        with self._lock:
+            yield self._bucket(path)
+
+    def tokens(self, path=None):
+        """
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :return: the number of tokens currently in the bucket, negative if the requests are paused
+        :rtype: float
+        """
+        with self._locked_bucket(path) as bucket:
+            return bucket[0]
+
+    def wait_time(self, path=None):
+        """
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :return: the number of seconds until a request can be made
+        :rtype: float
+        """
+        with self._locked_bucket(path) as bucket:
+            return max(0.0, (1.0 - bucket[0]) / self._rate)
+
+    def queue_depth(self, path=None):
+        """
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :return: the number of requests waiting for their turn
+        :rtype: integer
+        """
+        with self._queue_changed:
+            return len(self._queues.get(path if self._per_path else None, []))
+
+    def enqueue(self, path=None, priority=None):
+        """
+        Queues a request, which must then wait until :py:meth:`poll` allows it to be made (or be removed from the queue
+        with :py:meth:`cancel`). Used for waiting without blocking (e.g. in asyncio code), :py:meth:`acquire` does
+        all of this.
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param str priority: the priority of the request, one of :py:data:`PRIORITIES`. If not specified, the
+                             priority set for the current thread is used (see :py:func:`request_priority`).
+        :return: the queued request
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid priority
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekRateLimitQueueFullError` if there are already
+                 ``max_queue`` requests waiting
+        """
+        if priority is None:
+            priority = get_request_priority()
+
+        if priority not in PRIORITIES:
+            raise BoardGameGeekError("invalid priority: {}".format(priority))
+
+        with self._queue_changed:
+            queue = self._queues.setdefault(path if self._per_path else None, [])
+
+            if self._max_queue is not None and len(queue) >= self._max_queue:
+                raise BoardGameGeekRateLimitQueueFullError("too many requests waiting ({})".format(len(queue)))
+
+            self._queue_sequence += 1
+            request = (PRIORITIES.index(priority), self._queue_sequence, time.time())
+            queue.append(request)
+
+            return request
+
+    def _next_in_queue(self, queue):
+        """
+        Returns the queued request which should be served next, taking into account how long they've been waiting
+        """
+        now = time.time()
+        return min(queue, key=lambda r: (r[0] - (now - r[2]) / self._aging, r[1]))
+
+    def poll(self, path, request):
+        """
+        Checks whether a queued request can be made. If so, a token is taken from the bucket and the request is
+        removed from the queue.
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param request: the request returned by :py:meth:`enqueue`
+        :return: 0 if the request can be made, otherwise the number of seconds to wait before polling again
+        :rtype: float
+        """
+        with self._queue_changed:
+            queue = self._queues[path if self._per_path else None]
+            its_turn = self._next_in_queue(queue) == request
+
+        # the bucket is used without holding the queue's lock, as it may have to wait for other processes (see
+        # SqliteRateLimiter). The request keeps its turn if another one is queued meanwhile, the rate is still kept.
+        with self._locked_bucket(path) as bucket:
+            need_to_wait = max(0.0, (1.0 - bucket[0]) / self._rate)
+
+            if not its_turn:
+                # not its turn yet, at least one more slot has to pass
+                return need_to_wait + 1.0 / self._rate
+
+            if need_to_wait > 0:
+                return need_to_wait
+
+            bucket[0] -= 1.0
+
+        self._dequeue(queue, request)
+        return 0.0
+
+    def _dequeue(self, queue, request):
+        """
+        Removes a request from its queue, waking up the requests waiting for their turn
+        """
+        with self._queue_changed:
+            if request in queue:
+                queue.remove(request)
+                self._queue_version += 1
+                self._queue_changed.notify_all()
+
+    def cancel(self, path, request):
+        """
+        Removes a request from the queue
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param request: the request returned by :py:meth:`enqueue`
+        """
+        with self._queue_changed:
+            self._dequeue(self._queues.get(path if self._per_path else None, []), request)
+
+    def acquire(self, path=None, priority=None):
+        """
+        Waits until a request can be made, taking a token from the bucket
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param str priority: the priority of the request, one of :py:data:`PRIORITIES`. If not specified, the
+                             priority set for the current thread is used (see :py:func:`request_priority`).
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid priority
+        :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekRateLimitQueueFullError` if there are already
+                 ``max_queue`` requests waiting
+        """
+        request = self.enqueue(path, priority)
+
+        try:
+            while True:
+                with self._queue_changed:
+                    version = self._queue_version
+
+                need_to_wait = self.poll(path, request)
+                if need_to_wait <= 0:
+                    return
+
+                log.debug("rate limiting, need to wait: {}".format(need_to_wait))
+                with self._queue_changed:
+                    # the other requests wake it up when the queue changes, unless that happened while polling
+                    if self._queue_version == version:
+                        self._queue_changed.wait(need_to_wait)
+        except BaseException:
+            self.cancel(path, request)
+            raise
+
+    def response_received(self, path, status_code, retry_after=None):
+        """
+        Informs the limiter about the response to a request, so it can adapt to the site's throttling.
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param integer status_code: the HTTP status code of the response
+        :param str retry_after: the value of the ``Retry-After`` header of the response, if any
+        """
+        if status_code in THROTTLING_STATUS_CODES:
+            log.debug("throttled (HTTP {}), retry after: {}".format(status_code, retry_after))
+            self.throttled(path, parse_retry_after(retry_after))
+        elif 200 <= status_code < 300 and status_code != 202:
+            # 202 means the data is being prepared (e.g. collections), not that the request was rejected
+            self.succeeded(path)
+
+    def throttled(self, path=None, retry_after=None):
+        """
+        Called when a request was rejected because of too many requests being made. No requests are allowed until
+        ``retry_after`` seconds have passed.
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        :param float retry_after: how many seconds to wait before making other requests, if known
+        """
+        if retry_after:
+            with self._locked_bucket(path) as bucket:
+                self._pause(bucket, retry_after)
+
+    def succeeded(self, path=None):
+        """
+        Called when a request was successful
+
+        :param str path: the URL path of the request (only relevant when using a bucket per path)
+        """
+        pass
+
+    def _pause(self, bucket, seconds):
+        """
+        Pushes the next free slot of ``bucket`` at least ``seconds`` in the future
+        """
+        bucket[0] = min(bucket[0], 1.0 - seconds * self._rate)
+
+
+class AdaptiveRateLimiter(TokenBucketRateLimiter):
+    """
+    Token bucket rate limiter which adapts its rate to the site's throttling (AIMD): the rate is multiplied by
+    ``decrease_factor`` when the site signals that too many requests are made (HTTP 429 or 503) and increases by
+    ``increase_rpm`` requests per minute for each minute of successful requests, up to ``max_rpm``. ``Retry-After``
+    headers are honored.
+
+    The rate is shared by all the buckets.
+
+    :param rpm: how many requests per minute to allow initially
+    :param integer burst: how many requests can be made in a row without waiting
+    :param bool per_path: if ``True``, each API endpoint (URL path) gets its own bucket
+    :param integer max_queue: how many requests (per bucket) can be waiting for their turn, ``None`` for no limit
+    :param float aging: how many seconds a queued request waits before being promoted to the next priority class
+    :param min_rpm: the rate isn't decreased below this many requests per minute
+    :param max_rpm: the rate isn't increased above this many requests per minute. If not specified, ``rpm`` is used,
+                    so the rate only goes down after being throttled and recovers afterwards.
+    :param float decrease_factor: the rate is multiplied with this value when throttled
+    :param increase_rpm: how many requests per minute to add to the rate after each minute of successful requests
+    :param float decrease_interval: minimum interval between two rate decreases (in seconds), so that the responses to
+                                    requests already in flight don't decrease it again
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+    """
+    def __init__(self, rpm=DEFAULT_REQUESTS_PER_MINUTE, burst=1, per_path=False, max_queue=None,
+                 aging=DEFAULT_PRIORITY_AGING, min_rpm=1, max_rpm=None, decrease_factor=0.5, increase_rpm=5,
+                 decrease_interval=5):
+        super(AdaptiveRateLimiter, self).__init__(rpm=rpm, burst=burst, per_path=per_path, max_queue=max_queue,
+                                                  aging=aging)
+
+        if max_rpm is None:
+            max_rpm = self.requests_per_minute
+
+        if not 0 < min_rpm <= max_rpm:
+            raise BoardGameGeekError("invalid minimum/maximum requests per minute")
+
+        if not 0 < decrease_factor < 1:
+            raise BoardGameGeekError("invalid decrease factor")
+
+        self._min_rate = float(min_rpm) / 60.0
+        self._max_rate = float(max_rpm) / 60.0
+        self._rate = min(max(self._rate, self._min_rate), self._max_rate)
+        self._decrease_factor = decrease_factor
+        self._increase_rpm = float(increase_rpm)
+        self._decrease_interval = decrease_interval
+        self._last_decrease = None
+
+    def throttled(self, path=None, retry_after=None):
+        with self._lock:
+            now = time.time()
+            if self._last_decrease is None or now - self._last_decrease >= self._decrease_interval:
+                # bring the buckets up to date before changing the rate they're filled with
+                for key in list(self._buckets):
+                    self._bucket(key)
+
+                self._rate = max(self._min_rate, self._rate * self._decrease_factor)
+                self._last_decrease = now
+                log.info("throttled by the site, decreasing rate to {:.2f} requests per minute".format(self._rate * 60))
+
+        # wait at least one interval (at the new rate) before sending anything else
+        with self._locked_bucket(path) as bucket:
+            self._pause(bucket, max(retry_after or 0, 1.0 / self._rate))
+
+    def succeeded(self, path=None):
+        with self._lock:
+            if self._rate < self._max_rate:
+                for key in list(self._buckets):
+                    self._bucket(key)
+
+                # a minute's worth of successful requests at the current rate adds increase_rpm to the rate
+                rpm = self._rate * 60.0 + self._increase_rpm / (self._rate * 60.0)
+                self._rate = min(self._max_rate, rpm / 60.0)
+
+
+class SqliteRateLimiter(TokenBucketRateLimiter):
+    """
+    Token bucket rate limiter keeping its buckets in a sqlite database, so that it can be shared by several processes
+    on the same host (e.g. the workers of a web application): all the limiters using the same database file share the
+    request budget, keeping the aggregate rate at ``rpm`` requests per minute.
+
+    All the processes should use the same ``rpm``, ``burst`` and ``per_path`` settings.
+
+    :param str path: path of the sqlite database file (created if it doesn't exist)
+    :param rpm: how many requests per minute to allow, in total, for all the processes
+    :param integer burst: how many requests can be made in a row without waiting
+    :param bool per_path: if ``True``, each API endpoint (URL path) gets its own bucket
+    :param integer max_queue: how many requests (per bucket) can be waiting for their turn, ``None`` for no limit
+    :param float aging: how many seconds a queued request waits before being promoted to the next priority class
+    :param float timeout: how many seconds to wait for the database to be unlocked by other processes
+    :raises: :py:exc:`boardgamegeek.exceptions.BoardGameGeekError` in case of invalid parameters
+
+    Example usage::
+
+        >>> limiter = SqliteRateLimiter("/var/tmp/bgg-ratelimit.db", rpm=30)
+        >>> bgg = BoardGameGeek(rate_limiter=limiter)
+    """
+    blocking = True
+
+    def __init__(self, path, rpm=DEFAULT_REQUESTS_PER_MINUTE, burst=1, per_path=False, max_queue=None,
+                 aging=DEFAULT_PRIORITY_AGING, timeout=30):
+        super(SqliteRateLimiter, self).__init__(rpm=rpm, burst=burst, per_path=per_path, max_queue=max_queue,
+                                                aging=aging)
+
+        self._path = path
+        self._timeout = timeout
+        self._connection = None
+        self._pid = None
+
+    def _get_connection(self):
+        """
+        Returns the connection to the database, opening it if needed. Must be called with the lock held.
+        """
+        # connections can't be used after forking, open a new one in the child process
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self._path,
+                                               timeout=self._timeout,
+                                               isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            self._pid = os.getpid()
+
+        return self._connection
+
+    @contextlib.contextmanager
+    def _locked_bucket(self, path):
+        key = path if self._per_path else ""
+
+        with self._lock:
+            conn = self._get_connection()
+
+            # locks the database for writing until the end of the transaction, so the other processes wait
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key, )).fetchone()
+                if row is None:
+                    bucket = [float(self._burst), time.time()]
+                else:
+                    bucket = [row[0], row[1]]
+                    self._refill(bucket)
+
+                yield bucket
+
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                             (key, bucket[0], bucket[1]))
+                conn.execute("COMMIT")
+            except:
+                conn.execute("ROLLBACK")
+                raise
@@ -27,63 +27,69 @@ try:
 except:
     import urlparse
 
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
 from .exceptions import BoardGameGeekAPIError, BoardGameGeekAPIRetryError, BoardGameGeekError
-from .exceptions import BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError
+from .exceptions import BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError, BoardGameGeekRateLimitQueueFullError
+from .exceptions import BoardGameGeekCacheMissError
+from .ratelimit import AdaptiveRateLimiter, DEFAULT_REQUESTS_PER_MINUTE, PRIORITIES, request_priority
 
 log = logging.getLogger("boardgamegeek.utils")
 
-DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_CONCURRENT_PAGES = 4
+
+# how many bytes of a streamed response are read at once
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# the parsers which can be used for the API responses. lxml parses large documents faster, but ElementTree (with its
+# C accelerator) is faster at searching the parsed elements, which is where most of the time goes for typical responses:
+# building the games of a /thing response for 20 games takes 25-40% longer with lxml. So it's not the default, even
+# when it's installed
+XML_PARSERS = ["etree", "lxml"]
+DEFAULT_XML_PARSER = "etree"
+
+# the exceptions raised by the parsers for invalid documents
+XML_PARSE_ERRORS = (ETParseError, lxml_etree.ParseError) if lxml_etree is not None else (ETParseError,)
+
+# lxml's parsers and compiled XPath expressions can't be shared between threads
+_lxml_local = threading.local()
 
 
 class RateLimitingAdapter(HTTPAdapter):
     """
     Adapter for the Requests library which makes sure there's a delay between consecutive requests to the BGG site
     so that we don't get throttled
-    """
-
-    __last_request_timestamp = None     # time when the last request was made
-    __time_between_requests = 0         # interval to wait between requests in order to match the expected number of
-                                        # requests per second
 
-    __rate_limit_lock = threading.Lock()
+    The status codes of the responses are passed back to the limiter, so it can slow down when the site signals that
+    too many requests are being made.
 
-    def __init__(self, rpm=DEFAULT_REQUESTS_PER_MINUTE, **kw):
-        """
-
-        :param rpm: how many requests per minute to allow
-        :param kw:
-        :return:
-        """
-        if rpm <= 0:
-            log.warn("invalid requests per minute value ({}), falling back to default".format(rpm))
-            rpm = DEFAULT_REQUESTS_PER_MINUTE
+    :param rpm: how many requests per minute to allow (used when ``rate_limiter`` isn't specified)
+    :param rate_limiter: the :py:class:`boardgamegeek.ratelimit.TokenBucketRateLimiter` deciding when requests can be
+                         made. Adapters sharing a limiter share the request budget.
+    """
 
-        RateLimitingAdapter.__time_between_requests = 60.0 / float(rpm)
+    def __init__(self, rpm=DEFAULT_REQUESTS_PER_MINUTE, rate_limiter=None, **kw):
+        self._rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter(rpm=rpm)
 
         super(RateLimitingAdapter, self).__init__(**kw)
 
-    def send(self, request, **kw):
-        log.debug("acquiring rate limiting lock")
-        with RateLimitingAdapter.__rate_limit_lock:
-
-            log.debug("time between requests:{}, last request timestamp: {}".format(RateLimitingAdapter.__time_between_requests,
-                                                                                    RateLimitingAdapter.__last_request_timestamp))
+    @property
+    def rate_limiter(self):
+        return self._rate_limiter
 
-            # determine if we need to sleep in order to enforce the maximum requested amount of requests per minute
-            if RateLimitingAdapter.__last_request_timestamp is not None:
-                time_delta = time.time() - RateLimitingAdapter.__last_request_timestamp
-                need_to_wait = RateLimitingAdapter.__time_between_requests - time_delta
+    def send(self, request, **kw):
+        path = urlparse.urlparse(request.url).path
+        self._rate_limiter.acquire(path)
 
-                log.debug("time since last request: {}, need to wait: {}".format(time_delta, need_to_wait))
+        log.debug("sending request: {}".format(request))
+        response = super(RateLimitingAdapter, self).send(request, **kw)
 
-                if need_to_wait > 0:
-                    time.sleep(need_to_wait)
+        self._rate_limiter.response_received(path, response.status_code, response.headers.get("Retry-After"))
 
-            RateLimitingAdapter.__last_request_timestamp = time.time()
-            log.debug("releasing rate limiting lock")
-
-        log.debug("sending request: {}".format(request))
-        return super(RateLimitingAdapter, self).send(request, **kw)
+        return response
 
 
 class DictObject(object):
@@ -98,7 +104,7 @@ class DictObject(object):
         # allow accessing user's variables using .attribute
         try:
             return self._data[item]
-        except:
+        except Exception:
             raise AttributeError
 
     def data(self):
@@ -109,6 +115,119 @@ class DictObject(object):
         return self._data
 
 
+def check_xml_parser(xml_parser):
+    """
+    Validates the name of an XML parser
+
+    :param str xml_parser: one of :py:data:`XML_PARSERS`, ``None`` for the default one
+    :return: the name of the parser to use
+    :raises: :py:class:`BoardGameGeekError` if the parser is invalid or not installed
+    """
+    if xml_parser is None:
+        return DEFAULT_XML_PARSER
+
+    if xml_parser not in XML_PARSERS:
+        raise BoardGameGeekError("invalid XML parser: {}".format(xml_parser))
+
+    if xml_parser == "lxml" and lxml_etree is None:
+        raise BoardGameGeekError("the lxml package is required for using the lxml parser")
+
+    return xml_parser
+
+
+def _lxml_parser():
+    parser = getattr(_lxml_local, "parser", None)
+    if parser is None:
+        # like ElementTree, don't expand entities defined by the document and don't access the network
+        parser = lxml_etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+        _lxml_local.parser = parser
+    return parser
+
+
+def _lxml_xpath(path):
+    expressions = getattr(_lxml_local, "xpath", None)
+    if expressions is None:
+        expressions = _lxml_local.xpath = {}
+
+    expression = expressions.get(path)
+    if expression is None:
+        expression = expressions[path] = lxml_etree.XPath(path)
+    return expression
+
+
+def _is_lxml_element(xml_elem):
+    return lxml_etree is not None and isinstance(xml_elem, lxml_etree._Element)
+
+
+def xml_fromstring(xml, xml_parser=None):
+    """
+    Parses an XML document
+
+    :param xml: the document (bytes)
+    :param str xml_parser: the parser to use, one of :py:data:`XML_PARSERS`; ``None`` for the default one
+    :return: the root element of the document
+    :raises: one of :py:data:`XML_PARSE_ERRORS` if the document is invalid
+    """
+    if check_xml_parser(xml_parser) == "lxml":
+        return lxml_etree.fromstring(xml, parser=_lxml_parser())
+    return ET.fromstring(xml)
+
+
+def xml_iterparse(source, events, xml_parser=None):
+    """
+    Parses an XML document incrementally, see :py:func:`xml.etree.ElementTree.iterparse`
+
+    :param source: file-like object to read the document from
+    :param tuple events: the events to report
+    :param str xml_parser: the parser to use, one of :py:data:`XML_PARSERS`; ``None`` for the default one
+    :return: iterator over the (event, element) pairs
+    """
+    if check_xml_parser(xml_parser) == "lxml":
+        return lxml_etree.iterparse(source, events=events, resolve_entities=False, no_network=True, huge_tree=True)
+    return ET.iterparse(source, events=events)
+
+
+def xml_findall(xml_elem, path):
+    """
+    Returns the sub-elements matching a path, like ``xml_elem.findall(path)``. The elements parsed by lxml are searched
+    using compiled XPath expressions.
+
+    :param xml_elem: the element to search
+    :param str path: the path of the sub-elements (e.g. ``.//link[@type='boardgamemechanic']``). Only the syntax
+                     supported by both ElementTree and XPath can be used.
+    :return: list of elements
+    """
+    if _is_lxml_element(xml_elem):
+        return _lxml_xpath(path)(xml_elem)
+    return xml_elem.findall(path)
+
+
+def xml_find(xml_elem, path):
+    """
+    Returns the first sub-element matching a path, like ``xml_elem.find(path)``. See :py:func:`xml_findall`.
+
+    :param xml_elem: the element to search
+    :param str path: the path of the sub-element
+    :return: the element, ``None`` if not found
+    """
+    if _is_lxml_element(xml_elem):
+        found = _lxml_xpath(path)(xml_elem)
+        return found[0] if found else None
+    return xml_elem.find(path)
+
+
+def xml_tostring(xml_elem):
+    """
+    Serializes an element, regardless of the parser which created it
+
+    :param xml_elem: the element
+    :return: the UTF-8 encoded XML (bytes)
+    """
+    if _is_lxml_element(xml_elem):
+        return lxml_etree.tostring(xml_elem, encoding="utf-8")
+    return ET.tostring(xml_elem, encoding="utf-8")
+
+
 def xml_subelement_attr(xml_elem, subelement, convert=None, attribute="value", default=None, quiet=False):
     """
     Search for a sub-element and return the value of its attribute.
@@ -136,7 +255,7 @@ def xml_subelement_attr(xml_elem, subelement, convert=None, attribute="value", d
     if xml_elem is None or not subelement:
         return None
 
-    subel = xml_elem.find(subelement)
+    subel = xml_find(xml_elem, subelement)
     if subel is None:
         value = default
     else:
@@ -179,7 +298,7 @@ def xml_subelement_attr_list(xml_elem, subelement, convert=None, attribute="valu
     if xml_elem is None or not subelement:
         return None
 
-    subel = xml_elem.findall(subelement)
+    subel = xml_findall(xml_elem, subelement)
     res = []
     for e in subel:
         value = e.attrib.get(attribute)
@@ -222,7 +341,7 @@ def xml_subelement_text(xml_elem, subelement, convert=None, default=None, quiet=
     if xml_elem is None or not subelement:
         return None
 
-    subel = xml_elem.find(subelement)
+    subel = xml_find(xml_elem, subelement)
     if subel is None:
         text = default
     else:
@@ -240,30 +359,29 @@ def xml_subelement_text(xml_elem, subelement, convert=None, default=None, quiet=
     return text
 
 
-def get_parsed_xml_response(requests_session, url, params=None, timeout=15, retries=3, retry_delay=5):
+def _get_xml_response(requests_session, url, params, timeout, retries, retry_delay, priority, parse, stream=False):
     """
-    Downloads an XML from the specified url, parses it and returns the xml ElementTree.
+    Downloads an XML from the specified url, retrying if needed, and parses it using ``parse``
 
-    :param requests_session: A Session of the ``requests`` library, used to fetch the url
-    :param url: the address where to get the XML from
-    :param params: dictionary containing the parameters which should be sent with the request
-    :param timeout: number of seconds after which the request times out
-    :param retries: number of retries to perform in case of timeout
-    :param retry_delay: the amount of seconds to sleep when retrying an API call that returned 202
-    :return: :py:func:`xml.etree.ElementTree` corresponding to the XML
-    :raises: :py:class:`BoardGameGeekAPINonXMLError` if the API response wasn't XML
-    :raises: :py:class:`BoardGameGeekAPIRetryError` if this request should be retried after a short delay
-    :raises: :py:class:`BoardGameGeekAPIError` if the response couldn't be parsed
-    :raises: :py:class:`BoardGameGeekTimeoutError` if there was a timeout
+    See :py:func:`get_parsed_xml_response` for the parameters and the exceptions raised.
+
+    :param callable parse: callable taking the response and returning the result
+    :param bool stream: whether to defer downloading the response's content until ``parse`` reads it
+    :return: the result of ``parse``
     """
 
+    if priority is not None and priority not in PRIORITIES:
+        raise BoardGameGeekError("invalid priority: {}".format(priority))
+
     retr = retries
 
     # retry loop
     while retr >= 0:
         retr -= 1
         try:
-            r = requests_session.get(url, params=params, timeout=timeout)
+            # the priority is picked up by the rate limiter, when the request is made
+            with request_priority(priority):
+                r = requests_session.get(url, params=params, timeout=timeout, stream=stream)
 
             if r.status_code == 202:
                 if retries == 0:
@@ -277,31 +395,26 @@ def get_parsed_xml_response(requests_session, url, params=None, timeout=15, retr
                 else:
                     # sleep for the specified delay and retry
                     log.debug("API call will be retried in {} seconds ({} more retries)".format(retry_delay, retr))
+                    r.close()
                     if retr >= 0:
                         time.sleep(retry_delay)
                         retry_delay *= 1.5
                     continue
-            elif r.status_code == 503:
+            elif r.status_code in [429, 503]:
                 # it seems they added some sort of protection which triggers when too many requests are made, in which
-                # case we get back a 503. Try to delay and retry
-                log.warning("API returned 503, retrying")
+                # case we get back a 503 (or 429). Try to delay and retry
+                log.warning("API returned {}, retrying".format(r.status_code))
+                r.close()
                 if retr >= 0:
                     time.sleep(retry_delay)
                     retry_delay *= 3
                 continue
 
             if not r.headers.get("content-type").startswith("text/xml"):
+                r.close()
                 raise BoardGameGeekAPINonXMLError("non-XML reply")
 
-            xml = r.text
-
-            if sys.version_info >= (3,):
-                root_elem = ET.fromstring(xml)
-            else:
-                utf8_xml = xml.encode("utf-8")
-                root_elem = ET.fromstring(utf8_xml)
-
-            return root_elem
+            return parse(r)
 
         except requests.exceptions.Timeout:
             if retries == 0:
@@ -314,10 +427,11 @@ def get_parsed_xml_response(requests_session, url, params=None, timeout=15, retr
                 timeout *= 2.5
                 continue
 
-        except ETParseError as e:
+        except XML_PARSE_ERRORS as e:
             raise BoardGameGeekAPIError("error decoding BGG API response: {}".format(e))
 
-        except (BoardGameGeekAPIRetryError, BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError):
+        except (BoardGameGeekAPIRetryError, BoardGameGeekAPINonXMLError, BoardGameGeekTimeoutError,
+                BoardGameGeekRateLimitQueueFullError, BoardGameGeekCacheMissError):
             raise
 
         except Exception as e:
@@ -326,14 +440,367 @@ def get_parsed_xml_response(requests_session, url, params=None, timeout=15, retr
     raise BoardGameGeekAPIError("couldn't fetch data within the configured number of retries")
 
 
-def get_cache_session_from_uri(uri):
+def get_parsed_xml_response(requests_session, url, params=None, timeout=15, retries=3, retry_delay=5, priority=None,
+                            xml_parser=None):
+    """
+    Downloads an XML from the specified url, parses it and returns the xml ElementTree.
+
+    :param requests_session: A Session of the ``requests`` library, used to fetch the url
+    :param url: the address where to get the XML from
+    :param params: dictionary containing the parameters which should be sent with the request
+    :param timeout: number of seconds after which the request times out
+    :param retries: number of retries to perform in case of timeout
+    :param retry_delay: the amount of seconds to sleep when retrying an API call that returned 202
+    :param priority: priority of the request for the rate limiter, one of :py:data:`boardgamegeek.ratelimit.PRIORITIES`
+    :param xml_parser: the parser to use, one of :py:data:`XML_PARSERS`; ``None`` for the default one
+    :return: :py:func:`xml.etree.ElementTree` corresponding to the XML
+    :raises: :py:class:`BoardGameGeekAPINonXMLError` if the API response wasn't XML
+    :raises: :py:class:`BoardGameGeekAPIRetryError` if this request should be retried after a short delay
+    :raises: :py:class:`BoardGameGeekAPIError` if the response couldn't be parsed
+    :raises: :py:class:`BoardGameGeekTimeoutError` if there was a timeout
+    :raises: :py:class:`BoardGameGeekRateLimitQueueFullError` if there were too many requests waiting for the rate
+             limiter
+    :raises: :py:class:`BoardGameGeekCacheMissError` if the session is offline and the response isn't cached
+    """
+    xml_parser = check_xml_parser(xml_parser)
+
+    def _parse(r):
+        if xml_parser == "lxml":
+            # lxml decodes the document itself
+            return xml_fromstring(r.content, xml_parser)
+
+        xml = r.text
+
+        if sys.version_info >= (3,):
+            return ET.fromstring(xml)
+        else:
+            utf8_xml = xml.encode("utf-8")
+            return ET.fromstring(utf8_xml)
+
+    return _get_xml_response(requests_session, url, params, timeout, retries, retry_delay, priority, _parse)
+
+
+def get_streamed_xml_response(requests_session, url, params=None, timeout=15, retries=3, retry_delay=5, priority=None,
+                              tag=None, xml_parser=None):
+    """
+    Downloads an XML from the specified url, parsing it incrementally: the elements with the given tag directly under
+    the root are returned one at a time, as soon as they're parsed, and removed from the tree afterwards. The memory
+    used by the parsed elements doesn't grow with their number.
+
+    The response is read as it's downloaded only when ``requests_session`` doesn't cache it (e.g. when the client was
+    created with ``cache=None``): caching sessions read the whole response before returning it, in order to store it,
+    so only the parsing is incremental.
+
+    The other elements are kept in the tree, which is complete (besides the streamed elements) once all the elements
+    were retrieved. The response is closed when the generator is exhausted or closed (e.g. garbage collected).
+
+    See :py:func:`get_parsed_xml_response` for the parameters and the exceptions raised. The exceptions raised
+    while iterating over the elements are :py:class:`BoardGameGeekAPIError` (if the response couldn't be parsed) and
+    :py:class:`BoardGameGeekTimeoutError`.
+
+    :param str tag: the tag of the elements to return
+    :param xml_parser: the parser to use, one of :py:data:`XML_PARSERS`; ``None`` for the default one
+    :return: tuple (root element, generator of the elements). Only the attributes of the root element are reliable
+             before iterating over the generator, since the parser builds the tree ahead of the elements returned.
+    """
+    xml_parser = check_xml_parser(xml_parser)
+
+    def _parse(r):
+        try:
+            # iter_content() reads the content as it arrives, or returns the content read already (e.g. cached)
+            events = xml_iterparse(_ResponseReader(r.iter_content(STREAM_CHUNK_SIZE)), ("start", "end"), xml_parser)
+            _, root = next(events)
+
+            elements = _iterate_xml_elements(events, root, tag, r)
+            # start the generator, so that the response gets closed even if no element is ever requested
+            next(elements)
+        except Exception:
+            r.close()
+            raise
+
+        return root, elements
+
+    return _get_xml_response(requests_session, url, params, timeout, retries, retry_delay, priority, _parse,
+                             stream=True)
+
+
+class _ResponseReader(object):
+    """
+    File-like object reading the chunks of a response, for the parsers
+    """
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def read(self, size=-1):
+        # the parsers keep reading until they get b"", the chunks don't need to be of the requested size
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
+
+def _iterate_xml_elements(events, root, tag, response):
+    depth = 1
+    try:
+        yield None
+
+        for event, element in events:
+            if event == "start":
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1 and element.tag == tag:
+                yield element
+                root.remove(element)
+    except XML_PARSE_ERRORS as e:
+        raise BoardGameGeekAPIError("error decoding BGG API response: {}".format(e))
+    except requests.exceptions.Timeout:
+        raise BoardGameGeekTimeoutError("timeout while reading the response")
+    except requests.exceptions.RequestException as e:
+        raise BoardGameGeekAPIError("error reading BGG API response: {}".format(e))
+    finally:
+        response.close()
+
+
+def get_page_count(total, items_per_page):
+    """
+    Returns how many pages are needed for retrieving ``total`` items, when a page contains ``items_per_page`` items
+
+    :param integer total: total number of items
+    :param integer items_per_page: number of items on a page
+    :return: the number of pages
+    """
+    if total <= 0 or items_per_page <= 0:
+        return 1
+    return (total + items_per_page - 1) // items_per_page
+
+
+def fetch_pages(fetch_page, first_page, last_page, concurrency=DEFAULT_CONCURRENT_PAGES, is_empty=None):
+    """
+    Retrieves the pages ``first_page`` .. ``last_page`` of a paginated API response, keeping up to ``concurrency``
+    requests in flight, and yields them in page order. Requests still go through the session's rate limiting.
+
+    If ``is_empty`` is specified, no pages after the first empty one are requested, and iteration stops before it.
+
+    :param callable fetch_page: callable taking a page number as argument and returning that page
+    :param integer first_page: the first page to retrieve
+    :param integer last_page: the last page to retrieve
+    :param integer concurrency: maximum number of pages being retrieved at the same time
+    :param callable is_empty: an optional callable which receives a page and returns ``True`` if it's empty
+    :return: generator yielding the pages, in order
+    :raises: the exception raised by ``fetch_page``, when iteration reaches the page which failed
+    """
+    if concurrency <= 1:
+        for page in range(first_page, last_page + 1):
+            result = fetch_page(page)
+            if is_empty is not None and is_empty(result):
+                return
+            yield result
+        return
+
+    cond = threading.Condition()
+    state = {"next_page": first_page,   # next page to be requested
+             "last_page": last_page,    # last page to be requested, lowered when an empty page is found
+             "stop": False}             # set when the consumer doesn't need any more pages
+    results = {}                        # page number -> (page, exception)
+
+    def _worker():
+        while True:
+            with cond:
+                if state["stop"] or state["next_page"] > state["last_page"]:
+                    return
+                page = state["next_page"]
+                state["next_page"] += 1
+
+            log.debug("fetching page {}".format(page))
+            result, error = None, None
+            try:
+                result = fetch_page(page)
+            except Exception as e:
+                error = e
+
+            with cond:
+                if error is None and is_empty is not None and is_empty(result):
+                    # nothing after an empty page, don't request anything past it
+                    state["last_page"] = min(state["last_page"], page - 1)
+                results[page] = (result, error)
+                cond.notify_all()
+
+    workers = []
+    for _ in range(min(concurrency, last_page - first_page + 1)):
+        t = threading.Thread(target=_worker)
+        t.daemon = True
+        t.start()
+        workers.append(t)
+
+    try:
+        page = first_page
+        while True:
+            with cond:
+                while page not in results and page <= state["last_page"]:
+                    cond.wait()
+                if page not in results:
+                    # an empty page was found before this one
+                    return
+                result, error = results.pop(page)
+
+            if error is not None:
+                raise error
+
+            if is_empty is not None and is_empty(result):
+                return
+
+            yield result
+            page += 1
+    finally:
+        # let the workers know they should stop (e.g. if the consumer stopped iterating)
+        with cond:
+            state["stop"] = True
+
+
+def fetch_as_completed(fetch, items, concurrency=DEFAULT_CONCURRENT_PAGES):
+    """
+    Calls ``fetch`` for each of the items, keeping up to ``concurrency`` calls in progress, and yields the results as
+    soon as they're available, in the order in which the calls complete. Requests still go through the session's rate
+    limiting.
+
+    :param callable fetch: callable taking an item as argument and returning its result
+    :param list items: the items to fetch
+    :param integer concurrency: maximum number of items being fetched at the same time
+    :return: generator yielding (item, result) tuples, in the order in which they're retrieved
+    :raises: the exception raised by ``fetch``, when iteration reaches the item which failed
+    """
+    items = list(items)
+
+    if concurrency <= 1:
+        for item in items:
+            yield item, fetch(item)
+        return
+
+    cond = threading.Condition()
+    state = {"next": 0,         # index of the next item to fetch
+             "stop": False}     # set when the consumer doesn't need any more results
+    completed = []              # (item, result, exception), in the order in which the calls completed
+
+    def _worker():
+        while True:
+            with cond:
+                if state["stop"] or state["next"] >= len(items):
+                    return
+                item = items[state["next"]]
+                state["next"] += 1
+
+            result, error = None, None
+            try:
+                result = fetch(item)
+            except Exception as e:
+                error = e
+
+            with cond:
+                completed.append((item, result, error))
+                cond.notify_all()
+
+    for _ in range(min(concurrency, len(items))):
+        t = threading.Thread(target=_worker)
+        t.daemon = True
+        t.start()
+
+    try:
+        for _ in range(len(items)):
+            with cond:
+                while not completed:
+                    cond.wait()
+                item, result, error = completed.pop(0)
+
+            if error is not None:
+                raise error
+
+            yield item, result
+    finally:
+        # let the workers know they should stop (e.g. if the consumer stopped iterating)
+        with cond:
+            state["stop"] = True
+
+
+def _get_cache_codec(args):
+    """
+    Returns the codec compressing the cached responses, according to the parameters of a cache URI
+
+    :param dict args: the URI's parameters
+    :return: :py:class:`boardgamegeek.cache.ResponseCodec` instance, ``None`` if the responses aren't compressed
+    """
+    compression = args.get("compress", ["0"])[0]
+    if compression == "0":
+        return None
+
+    from .cache import ResponseCodec
+
+    dictionary = None
+    if "dictionary" in args:
+        with open(args["dictionary"][0], "rb") as f:
+            dictionary = f.read()
+
+    return ResponseCodec(compression="zlib" if compression == "1" else compression, dictionary=dictionary)
+
+
+def _create_cached_session(backend, ttl, ttl_policy, stale_while_revalidate, mode):
+    """
+    Returns a requests-cache session using the given backend
+
+    :param backend: name of a requests-cache backend, or an instance of one
+    :param integer ttl: how many seconds to cache the responses for
+    :param ttl_policy: :py:class:`boardgamegeek.cache.TTLPolicy` overriding ``ttl``, or ``None``
+    :param integer stale_while_revalidate: for how many seconds the expired responses can be returned while they're
+                                           refreshed in the background, or ``None``
+    :param str mode: one of :py:data:`boardgamegeek.cache.MODES`
+    :return: CachedSession instance
+    """
+    if ttl_policy is None and stale_while_revalidate is None and mode == "online":
+        return requests_cache.core.CachedSession(backend=backend,
+                                                 expire_after=ttl,
+                                                 allowable_codes=(200,))
+
+    from .cache import TTLCachedSession
+    return TTLCachedSession(ttl_policy,
+                            stale_while_revalidate=stale_while_revalidate,
+                            mode=mode,
+                            backend=backend,
+                            expire_after=ttl,
+                            allowable_codes=(200,))
+
+
+def get_cache_session_from_uri(uri, ttl_policy=None, mode="online"):
     """
     Returns a requests-cache session using caching specified in the URI. Valid uris are:
 
-    * memory:///?ttl=<seconds>
-    * sqlite:///path/to/sqlite.db?ttl=<seconds>&fast_save=<0|1>
+    * memory:///?ttl=<seconds>&max_size=<bytes>&eviction=<lru|lfu>
+    * sqlite:///path/to/sqlite.db?ttl=<seconds>&fast_save=<0|1>&compress=<0|1|zlib|zstd>&dictionary=<path>
+    * redis://[:password@]host:port/<db>?ttl=<seconds>&prefix=<key prefix>&compress=<0|1|zlib|zstd>&dictionary=<path>
+      (requires the ``redis`` package)
+
+    * tiered://?l2=<URI of a sqlite or redis cache>&l1_size=<bytes>&l1_eviction=<lru|lfu>&l1_ttl=<seconds>&ttl=<seconds>
+
+    The memory cache holds up to ``max_size`` bytes (128MB by default, ``0`` for no limit) of responses, evicting the least recently
+    (``lru``, default) or least frequently (``lfu``) used ones when full.
+
+    The tiered cache keeps the most used responses of the ``l2`` cache in memory as well (16MB of them by default).
+    The ``l2`` URI needs to be URL-encoded if it has parameters of its own; it inherits the ``ttl`` and
+    ``stale_while_revalidate`` of the tiered URI if it doesn't.
+
+    All of them accept ``stale_while_revalidate=<seconds>``: the responses expired for at most that long are still
+    returned, while being refreshed in the background.
+
+    ``compress`` stores the responses compressed (``1`` meaning ``zlib``; ``zstd`` requires the ``zstandard``
+    package), optionally using the compression dictionary from the ``dictionary`` file (see
+    :py:func:`boardgamegeek.cache.train_dictionary`).
 
     :param uri: URI specifying the type of cache to use and its parameters
+    :param ttl_policy: :py:class:`boardgamegeek.cache.TTLPolicy` setting the ttl of each endpoint's responses, the
+                       URI's ``ttl`` being used for the rest
+    :param str mode: ``"online"``, ``"offline"`` (using only the cached responses) or ``"prefer-cache"`` (using the
+                     expired responses when they can't be refreshed), see
+                     :py:class:`boardgamegeek.cache.TTLCachedSession`
     :return: CachedSession instance, which can be used as a regular ``requests`` session.
     :raises: :class:`BoardGameGeekError` in case of error
     """
@@ -346,26 +813,71 @@ def get_cache_session_from_uri(uri):
         # if not specified, default cache time is 3600 seconds
         ttl = int(args.get("ttl", ['3600'])[0])
 
+        stale_while_revalidate = args.get("stale_while_revalidate")
+        if stale_while_revalidate is not None:
+            stale_while_revalidate = int(stale_while_revalidate[0])
+
+        # how long the backends must keep the responses, the ones kept by the policy or stale ones included
+        max_ttl = ttl
+        if ttl_policy is not None:
+            max_ttl = max(max_ttl, ttl_policy.max_ttl() or 0)
+        max_ttl += stale_while_revalidate or 0
+
         if r.scheme == "memory":
-            return requests_cache.core.CachedSession(backend="memory",
-                                                     expire_after=ttl,
-                                                     allowable_codes=(200,))
+            from .cache import BoundedMemoryCache, DEFAULT_MEMORY_CACHE_SIZE
+
+            max_size = int(args.get("max_size", [DEFAULT_MEMORY_CACHE_SIZE])[0]) or None
+            backend = BoundedMemoryCache(max_size=max_size,
+                                         eviction=args.get("eviction", ["lru"])[0],
+                                         ttl=max_ttl)
+
+            return _create_cached_session(backend, ttl, ttl_policy, stale_while_revalidate, mode)
 
         elif r.scheme == "sqlite":
-            fast_save = args.get("fast_save", ["0"])[0] != "0"
-            return requests_cache.core.CachedSession(cache_name=r.path,
-                                                     backend="sqlite",
-                                                     expire_after=ttl,
-                                                     extension="",
-                                                     fast_save=fast_save,
-                                                     allowable_codes=(200,))
-
-        # TODO: add the redis backend
-        # elif r.scheme == "redis":
-        #     return requests_cache.core.CachedSession(cache_name=args.get("prefix", ["cache"])[0],
-        #                                              backend="redis",
-        #                                              expire_after=ttl,
-        #                                              allowable_codes=(200,))
+            from .cache import SqliteCache
+
+            backend = SqliteCache(r.path,
+                                  fast_save=args.get("fast_save", ["0"])[0] != "0",
+                                  codec=_get_cache_codec(args))
+
+            return _create_cached_session(backend, ttl, ttl_policy, stale_while_revalidate, mode)
+
+        elif r.scheme == "redis":
+            import redis
+            from .cache import RedisCache
+
+            # the connection only needs the server's address and database, the query string is for the cache
+            pool = redis.ConnectionPool.from_url(urlparse.urlunparse(r._replace(query="")))
+            backend = RedisCache(redis.StrictRedis(connection_pool=pool),
+                                 prefix=args.get("prefix", ["bgg"])[0],
+                                 ttl=max_ttl,
+                                 codec=_get_cache_codec(args))
+
+            return _create_cached_session(backend, ttl, ttl_policy, stale_while_revalidate, mode)
+
+        elif r.scheme == "tiered":
+            from .cache import TieredCache, DEFAULT_L1_CACHE_SIZE
+
+            if args.get("l1", ["memory"])[0] != "memory":
+                raise BoardGameGeekError("only memory is supported for the first tier")
+
+            l2 = urlparse.urlparse(args["l2"][0])
+            if l2.scheme in ["memory", "tiered"]:
+                raise BoardGameGeekError("the second tier must be a persistent cache")
+
+            l2_args = urlparse.parse_qs(l2.query)
+            for name in ["ttl", "stale_while_revalidate"]:
+                if name in args and name not in l2_args:
+                    l2_args[name] = args[name]
+            l2_uri = urlparse.urlunparse(l2._replace(query=requests.compat.urlencode(l2_args, doseq=True)))
+
+            l1_ttl = args.get("l1_ttl")
+            backend = TieredCache(get_cache_session_from_uri(l2_uri, ttl_policy=ttl_policy, mode=mode).cache,
+                                  l1_size=int(args.get("l1_size", [DEFAULT_L1_CACHE_SIZE])[0]) or None,
+                                  l1_eviction=args.get("l1_eviction", ["lru"])[0],
+                                  l1_ttl=min(int(l1_ttl[0]), max_ttl) if l1_ttl is not None else max_ttl)
+
+            return _create_cached_session(backend, ttl, ttl_policy, stale_while_revalidate, mode)
 
         # TODO: add the mongo backend
 
@@ -23,7 +23,7 @@ class PyTest(TestCommand):
         import pytest
         pytest.main(self.test_args)
 
-tests_require = ["pytest"]
+tests_require = ["pytest", "aioresponses; python_version >= '3.5'", "lxml"]
 
 setup(
     name="boardgamegeek",
@@ -36,7 +36,8 @@ setup(
     long_description=long_description,
     url="https://github.com/lcosmin/boardgamegeek",
     tests_require=tests_require,
-    extras_require={'test': tests_require},
+    extras_require={'test': tests_require, 'async': ['aiohttp>=3.0'], 'redis': ['redis'], 'zstd': ['zstandard'],
+                    'lxml': ['lxml']},
     cmdclass={'test': PyTest},
     classifiers=[
         "Programming Language :: Python",
@@ -53,7 +54,7 @@ setup(
         "Topic :: Internet :: WWW/HTTP :: Dynamic Content",
     ],
     install_requires=["requests>=2.3.0",
-                      "requests-cache>=0.4.4"],
+                      "requests-cache>=0.4.4,<1.0"],
     entry_points={
         "console_scripts": [
             "boardgamegeek = boardgamegeek.main:main"
@@ -0,0 +1,115 @@
+# coding: utf-8
+from __future__ import unicode_literals
+
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+import requests
+import urllib3
+
+try:
+    import urllib.parse as urlparse
+except ImportError:
+    import urlparse
+
+
+API_URL = "https://www.boardgamegeek.com/xmlapi2"
+
+
+class FakeAPI(object):
+    """
+    Answers the calls to the BGG API without going to the network.
+
+    ``responses`` maps the endpoints' names (``"thing"``, ``"user"``, ...) to the XML they return, or to callables
+    taking the call's parameters (a dictionary) and returning it. Setting ``status_code`` changes the status of the
+    responses, setting ``error`` makes the calls raise it instead.
+    """
+    def __init__(self):
+        self.responses = {}
+        self.requests = []          # (endpoint, parameters) of the calls made
+        self.bodies = []            # the bodies of the responses, to check how much of them was read
+        self.status_code = 200
+        self.error = None
+
+    def calls(self, endpoint=None):
+        """
+        :return: how many calls were made (to ``endpoint``, if given)
+        """
+        return len([r for r in self.requests if endpoint is None or r[0] == endpoint])
+
+    def respond_with_items(self, endpoint, xml_root):
+        """
+        Makes ``endpoint`` return the ``<item>`` elements of ``xml_root`` requested by the ``id`` parameter
+        """
+        def _items(params):
+            ids = params["id"].split(",")
+            items = [ET.tostring(item, encoding="utf-8") for item in xml_root.findall("item")
+                     if item.attrib["id"] in ids]
+            return b"<items>" + b"".join(items) + b"</items>"
+
+        self.responses[endpoint] = _items
+
+    def mount(self, target, rate_limited=False):
+        """
+        Makes a client (or a session) use the fake API
+
+        :param target: a :py:class:`boardgamegeek.api.BoardGameGeek` or a ``requests`` session
+        :param bool rate_limited: whether the calls go through the client's rate limiter
+        :return: ``target``
+        """
+        session = getattr(target, "requests_session", target)
+        rate_limiter = target.rate_limiter if rate_limited else None
+        session.mount(API_URL, _FakeAdapter(self, rate_limiter))
+        return target
+
+    def send(self, request):
+        url = urlparse.urlparse(request.url)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {k: v[0] for k, v in urlparse.parse_qs(url.query).items()}
+        self.requests.append((endpoint, params))
+
+        if self.error is not None:
+            raise self.error
+
+        body = self.responses[endpoint]
+        if callable(body):
+            body = body(params)
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+
+        raw = io.BytesIO(body)
+        self.bodies.append(raw)
+
+        # an unread response, as returned by requests when streaming
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers["Content-Type"] = "text/xml; charset=utf-8"
+        response.raw = urllib3.response.HTTPResponse(raw, preload_content=False)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class _FakeAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, api, rate_limiter=None):
+        super(_FakeAdapter, self).__init__()
+        self._api = api
+        self._rate_limiter = rate_limiter
+
+    def send(self, request, **kwargs):
+        path = urlparse.urlparse(request.url).path
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(path)
+
+        response = self._api.send(request)
+
+        if self._rate_limiter is not None:
+            self._rate_limiter.response_received(path, response.status_code)
+        return response
+
+
+@pytest.fixture
+def fake_api():
+    return FakeAPI()
@@ -8,20 +8,33 @@ import tempfile
 import pytest
 import xml.etree.ElementTree as ET
 import pickle
+import socket
+import sqlite3
+import subprocess
+import sys
 import time
 
 
 from boardgamegeek import BoardGameGeek, BoardGameGeekError
+from boardgamegeek.exceptions import BoardGameGeekRateLimitQueueFullError, BoardGameGeekCacheMissError
+from boardgamegeek.exceptions import BoardGameGeekAPIError, BoardGameGeekAPIRetryError, BoardGameGeekTimeoutError
 from boardgamegeek.api import BoardGameGeekNetworkAPI
+from boardgamegeek.cache import BoundedMemoryDict, ObjectCache, ResponseCodec, TTLCachedSession, TTLPolicy, object_cache_key
+from boardgamegeek.cache import train_dictionary
 from boardgamegeek.collection import Collection
-from boardgamegeek.games import CollectionBoardGame
+from boardgamegeek.games import BoardGame, CollectionBoardGame
 from boardgamegeek.hotitems import HotItems, HotItem
+from boardgamegeek.loaders import GAME_KEYS, LazyGameData, create_game_from_xml
 from boardgamegeek.plays import PlaySession, Plays
+from boardgamegeek.ratelimit import TokenBucketRateLimiter, AdaptiveRateLimiter, SqliteRateLimiter, parse_retry_after
+from boardgamegeek.ratelimit import request_priority, get_request_priority
 from boardgamegeek.things import Thing
 from boardgamegeek.utils import DictObject
 
 
 import boardgamegeek.utils as bggutil
+import requests
+import requests_cache
 import datetime
 
 progress_called = False
@@ -74,6 +87,53 @@ def xml():
 
 
 
+@pytest.fixture
+def thing_xml():
+    # trimmed down response of a /thing call for multiple ids
+    xml_code = """
+    <items termsofuse="http://boardgamegeek.com/xmlapi/termsofuse">
+        <item type="boardgame" id="31260">
+            <thumbnail>//cf.geekdo-images.com/images/pic259085_t.jpg</thumbnail>
+            <name type="primary" sortindex="1" value="Agricola" />
+            <name type="alternate" sortindex="1" value="Агрикола" />
+            <description>Agricola is a game about farming &amp;amp; such</description>
+            <yearpublished value="2007" />
+            <minplayers value="1" />
+            <maxplayers value="5" />
+            <link type="boardgamecategory" id="1021" value="Economic" />
+            <link type="boardgamemechanic" id="2041" value="Worker Placement" />
+            <link type="boardgamedesigner" id="10" value="Uwe Rosenberg" />
+            <link type="boardgameexpansion" id="38733" value="Agricola: Farmers of the Moor" />
+            <statistics page="1">
+                <ratings>
+                    <usersrated value="34000" />
+                    <average value="8.1" />
+                    <ranks>
+                        <rank type="subtype" id="1" name="boardgame" friendlyname="Board Game Rank" value="10" />
+                        <rank type="family" id="5497" name="strategygames" friendlyname="Strategy Game Rank" value="8" />
+                    </ranks>
+                </ratings>
+            </statistics>
+        </item>
+        <item type="boardgameexpansion" id="38733">
+            <name type="primary" sortindex="1" value="Agricola: Farmers of the Moor" />
+            <link type="boardgameexpansion" id="31260" value="Agricola" inbound="true" />
+            <statistics page="1">
+                <ratings>
+                    <ranks>
+                        <rank type="subtype" id="1" name="boardgame" friendlyname="Board Game Rank" value="Not Ranked" />
+                    </ranks>
+                </ratings>
+            </statistics>
+        </item>
+        <item type="videogame" id="69327">
+            <name type="primary" sortindex="1" value="Dune II" />
+        </item>
+    </items>
+    """
+    return ET.fromstring(xml_code)
+
+
 @pytest.fixture
 def bgg():
     return BoardGameGeek(cache=None, retries=0, retry_delay=0)  # disable retrying for testing
@@ -135,6 +195,548 @@ def test_sqlite_caching():
     os.unlink(name)
 
 
+@pytest.fixture
+def redis_server():
+    # start a throwaway redis server on a free port
+    pytest.importorskip("redis")
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    try:
+        server = subprocess.Popen(["redis-server", "--port", str(port), "--bind", "127.0.0.1",
+                                   "--save", "", "--appendonly", "no"],
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except OSError:
+        pytest.skip("redis-server not available")
+
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except socket.error:
+            time.sleep(0.1)
+
+    yield "redis://127.0.0.1:{}/0".format(port)
+
+    server.terminate()
+    server.wait()
+
+
+def cacheable_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = "https://boardgamegeek.com/xmlapi2/thing?id=1"
+    response.request = requests.Request("GET", response.url).prepare()
+    response._content = content
+    return response
+
+
+def test_compressed_sqlite_caching(tmpdir):
+    content = b"<items>" + b"<item type='boardgame'><name value='Agricola'/></item>" * 100 + b"</items>"
+    response = cacheable_response(content)
+    name = str(tmpdir.join("cache.db"))
+
+    # responses cached without compression can still be read
+    session = bggutil.get_cache_session_from_uri("sqlite://{}?ttl=100".format(name))
+    session.cache.save_response("plain", response)
+
+    dictionary = train_dictionary([content], compression="zlib")
+    dictionary_file = tmpdir.join("bgg.dict")
+    dictionary_file.write_binary(dictionary)
+
+    session = bggutil.get_cache_session_from_uri("sqlite://{}?ttl=100&compress=zlib&dictionary={}".format(name,
+                                                                                                  dictionary_file))
+    session.cache.save_response("key", response)
+    assert session.cache.compression_ratio > 5
+
+    assert session.cache.get_response_and_time("key")[0].content == content
+    assert session.cache.get_response_and_time("plain")[0].content == content
+
+    # without the dictionary, the responses compressed with it are cache misses
+    session = bggutil.get_cache_session_from_uri("sqlite://{}?ttl=100&compress=1".format(name))
+    assert session.cache.get_response_and_time("key") == (None, None)
+
+    with pytest.raises(BoardGameGeekError):
+        bggutil.get_cache_session_from_uri("sqlite://{}?compress=lzma".format(name))
+
+    codec = ResponseCodec(compression="zlib")
+    assert codec.compression_ratio is None
+    assert codec.loads(codec.dumps({"a": content})) == {"a": content}
+    assert codec.compression_ratio > 5
+
+    with pytest.raises(KeyError):
+        codec.loads(b"z" + b"garbage")
+
+
+def test_cache_ttl_policy(fake_api):
+    policy = TTLPolicy(default=60, ttls={"hot": 3600, "https://www.boardgamegeek.com/xmlapi2/thing": 86400})
+    policy.set("thing", 600, params={"stats": 1})
+    policy.set("plays", 120, params={"username": None})
+
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/hot?type=boardgame") == 3600
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/thing?id=1") == 86400
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/thing?id=1&stats=1") == 600
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/thing", {"id": 1, "stats": 1}) == 600
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/thing", {"id": 1, "stats": 0}) == 86400
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/plays", {"username": "x"}) == 120
+    assert policy.ttl("https://www.boardgamegeek.com/xmlapi2/plays", {"id": 1}) == 60
+    assert policy.max_ttl() == 86400
+
+    with pytest.raises(BoardGameGeekError):
+        policy.set("hot", -1)
+
+    # a session expiring the hot items right away, while keeping the games
+    fake_api.responses.update({"thing": "<items/>", "user": "<items/>", "hot": "<items/>"})
+    session = bggutil.get_cache_session_from_uri("memory:///?ttl=3600",
+                                                 ttl_policy=TTLPolicy(ttls={"hot": 0, "thing": 100}))
+    assert isinstance(session, TTLCachedSession)
+    assert isinstance(session, requests_cache.core.CachedSession)
+    fake_api.mount(session)
+
+    for _ in range(2):
+        session.get("https://www.boardgamegeek.com/xmlapi2/thing", params={"id": 1})
+        session.get("https://www.boardgamegeek.com/xmlapi2/user", params={"name": "x"})
+    assert fake_api.calls() == 2
+
+    for _ in range(2):
+        assert not session.get("https://www.boardgamegeek.com/xmlapi2/hot").from_cache
+    assert fake_api.calls() == 4
+
+
+def test_stale_while_revalidate(fake_api):
+    release = threading.Event()
+
+    def _thing(params):
+        if fake_api.calls() > 1:
+            # keep the refresh going until the test is done with the stale response
+            release.wait(5)
+        return "<items version='{}'/>".format(fake_api.calls())
+
+    fake_api.responses["thing"] = _thing
+    session = fake_api.mount(bggutil.get_cache_session_from_uri("memory:///?ttl=0&stale_while_revalidate=100"))
+    url = "https://www.boardgamegeek.com/xmlapi2/thing?id=1"
+
+    assert not session.get(url).from_cache
+
+    # the expired response is returned right away, and refreshed only once
+    start_time = time.time()
+    for _ in range(3):
+        response = session.get(url)
+        assert response.from_cache
+        assert response.content == b"<items version='1'/>"
+    assert time.time() - start_time < 1
+    time.sleep(0.2)
+    assert fake_api.calls() == 2
+
+    release.set()
+    for _ in range(50):
+        if session.cache.get_response_and_time(session.cache.create_key(response.request))[0].content != \
+                b"<items version='1'/>":
+            break
+        time.sleep(0.1)
+
+    assert session.get(url).content == b"<items version='2'/>"
+    assert fake_api.calls() >= 2
+
+
+def test_negative_caching(fake_api):
+    fake_api.responses["user"] = '<user id="" name="nobody"><firstname value=""/></user>'
+    # an unknown game id returns no <item>
+    fake_api.responses["thing"] = '<items termsofuse="https://boardgamegeek.com/xmlapi/termsofuse"></items>'
+
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=3600", retries=0, negative_cache_ttl=0.2))
+
+    assert bgg.user("nobody") is None
+    assert bgg.user("nobody") is None
+    assert fake_api.calls("user") == 1
+
+    # the not found result expires on its own, even if the HTTP cache would keep it longer...
+    time.sleep(0.3)
+    assert bgg.user("nobody") is None
+    assert fake_api.calls("user") == 2
+
+    # ... or can be forgotten explicitly
+    bgg.invalidate(user="nobody")
+    assert bgg.user("nobody") is None
+    assert fake_api.calls("user") == 3
+
+    # without negative caching, the HTTP cache still has the response
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=3600", retries=0, negative_cache_ttl=None))
+    assert bgg.user("nobody") is None
+    assert bgg.user("nobody") is None
+    assert fake_api.calls("user") == 4
+
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=3600", retries=0))
+    assert bgg.game(game_id=999999999) is None
+    assert bgg.game(game_id=999999999) is None
+    assert fake_api.calls("thing") == 1
+
+
+def test_bounded_memory_cache():
+    for eviction in ["lru", "lfu"]:
+        cache = BoundedMemoryDict(max_size=30, eviction=eviction, size_of=len)
+        cache["a"] = "a" * 10
+        cache["b"] = "b" * 10
+        cache["c"] = "c" * 10
+
+        # "a" is used the most, but less recently than "b"
+        for _ in range(3):
+            assert cache["a"] == "a" * 10
+        assert cache["b"] == "b" * 10
+
+        cache["d"] = "d" * 10
+        assert "c" not in cache
+
+        cache["e"] = "e" * 10
+        assert "b" in cache
+        assert ("a" in cache) == (eviction == "lfu")
+        assert ("d" in cache) == (eviction == "lru")
+
+        # too large to be cached at all
+        cache["f"] = "f" * 31
+        assert "f" not in cache
+
+        metrics = cache.metrics()
+        assert metrics["entries"] == len(cache) == 3
+        assert metrics["size"] == 30
+        assert metrics["hits"] == 4
+        assert metrics["evictions"] == 2
+
+    # the expired items are swept even if they're never read again
+    cache = BoundedMemoryDict(max_size=None, ttl=0.1, sweep_interval=0, size_of=len)
+    cache["a"] = "a"
+    time.sleep(0.2)
+    cache["b"] = "b"
+    assert list(cache) == ["b"]
+    assert cache.metrics()["expirations"] == 1
+
+    with pytest.raises(BoardGameGeekError):
+        BoundedMemoryDict(eviction="fifo")
+
+    session = bggutil.get_cache_session_from_uri("memory:///?ttl=100&max_size=10000&eviction=lfu")
+    response = cacheable_response(b"<items/>")
+    session.cache.save_response("key", response)
+    assert session.cache.get_response_and_time("key")[0].content == b"<items/>"
+    assert session.cache.metrics()["entries"] == 1
+    assert session.cache.metrics()["max_size"] == 10000
+
+
+def test_tiered_caching(tmpdir):
+    name = str(tmpdir.join("cache.db"))
+    response = cacheable_response(b"<items/>")
+
+    session = bggutil.get_cache_session_from_uri("tiered://?l1_size=100000&l2=sqlite://{}&ttl=100".format(name))
+    session.cache.save_response("key", response)
+
+    # written through to both tiers
+    assert session.cache.l1.responses.metrics()["entries"] == 1
+    assert session.cache.l2.get_response_and_time("key")[0].content == b"<items/>"
+
+    # responses found only in the persistent tier are copied to memory
+    session.cache.l1.clear()
+    assert session.cache.get_response_and_time("key")[0].content == b"<items/>"
+    assert "key" in session.cache.l1.responses
+    assert session.cache.get_response_and_time("key")[0].content == b"<items/>"
+    assert session.cache.metrics()["hits"] == 1
+
+    # ... and stay there across sessions
+    session = bggutil.get_cache_session_from_uri("tiered://?l2=sqlite://{}".format(name))
+    assert session.cache.get_response_and_time("key")[0].content == b"<items/>"
+
+    session.cache.delete("key")
+    assert session.cache.get_response_and_time("key") == (None, None)
+    assert session.cache.l2.get_response_and_time("key") == (None, None)
+
+    for invalid in ["tiered://?l2=memory:///", "tiered://?l1=redis&l2=sqlite://{}".format(name), "tiered://"]:
+        with pytest.raises(BoardGameGeekError):
+            bggutil.get_cache_session_from_uri(invalid)
+
+
+def test_batch_responses_cached_per_game(fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=3600", retries=0))
+
+    games = bgg.games_by_id([31260, 38733])
+    assert [game.id for game in games] == [31260, 38733]
+
+    # a single game of the batch...
+    assert bgg.game(game_id=38733).name == "Agricola: Farmers of the Moor"
+
+    # ... or a batch with a different grouping don't request again the games already retrieved
+    bgg.games_by_id([69327, 31260], on_error=lambda game_id, error: None)
+    assert [params["id"] for _, params in fake_api.requests] == ["31260,38733", "69327"]
+
+
+def test_rank_table_filled_when_given(fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+
+    # the client doesn't keep the ranks on its own...
+    bgg = fake_api.mount(BoardGameGeek(cache=None, retries=0))
+    bgg.games_by_id([31260, 38733])
+    assert bgg._rank_table is None
+
+    # ... only in the table it was given
+    rank_table = {}
+    bgg = fake_api.mount(BoardGameGeek(cache=None, retries=0, rank_table=rank_table))
+    games = bgg.games_by_id([31260, 38733])
+    assert rank_table == {game.id: game.boardgame_rank for game in games}
+
+
+def test_games_by_id_with_full_rate_limiter_queue(fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+    fake_api.responses["search"] = '<items><item type="boardgame" id="31260"><name value="Agricola"/></item></items>'
+
+    class RateLimiter(AdaptiveRateLimiter):
+        full = [0]          # how many of the next requests find the queue full
+
+        def acquire(self, path=None, priority=None):
+            if path.endswith("/thing") and RateLimiter.full[0]:
+                RateLimiter.full[0] -= 1
+                raise BoardGameGeekRateLimitQueueFullError("too many requests waiting")
+            return super(RateLimiter, self).acquire(path, priority=priority)
+
+    bgg = fake_api.mount(BoardGameGeek(cache=None, retries=0, rate_limiter=RateLimiter(rpm=6000)),
+                         rate_limited=True)
+
+    # the batch which couldn't be queued is reported, the games already retrieved are still returned
+    errors = {}
+    RateLimiter.full[0] = 1
+    games = bgg.games_by_id([31260, 38733], batch_size=1, on_error=errors.__setitem__)
+    assert [game.id for game in games] == [38733]
+    assert list(errors) == [31260]
+    assert isinstance(errors[31260], BoardGameGeekRateLimitQueueFullError)
+
+    # games() fails when the games can't be retrieved, as game() does
+    RateLimiter.full[0] = 1
+    with pytest.raises(BoardGameGeekRateLimitQueueFullError):
+        bgg.games("Agricola")
+    assert [game.id for game in bgg.games("Agricola")] == [31260]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="the asyncio client requires Python 3.5+")
+def test_async_games_by_id_with_full_rate_limiter_queue(thing_xml):
+    import asyncio
+    import re
+    aioresponses = pytest.importorskip("aioresponses")
+    from boardgamegeek.asyncapi import AsyncBoardGameGeek
+
+    class RateLimiter(AdaptiveRateLimiter):
+        full = [1]
+
+        def enqueue(self, path=None, priority=None):
+            if RateLimiter.full[0]:
+                RateLimiter.full[0] -= 1
+                raise BoardGameGeekRateLimitQueueFullError("too many requests waiting")
+            return super(RateLimiter, self).enqueue(path, priority=priority)
+
+    content = ET.tostring(thing_xml, encoding="utf-8")
+    errors = {}
+
+    async def _main():
+        with aioresponses.aioresponses() as mocked:
+            mocked.get(re.compile(r"^https://www\.boardgamegeek\.com/xmlapi2/thing"), body=content,
+                       content_type="text/xml", repeat=True)
+            async with AsyncBoardGameGeek(retries=0, rate_limiter=RateLimiter(rpm=6000), concurrent_pages=1) as bgg:
+                return await bgg.games_by_id([31260, 38733], batch_size=1, on_error=errors.__setitem__)
+
+    loop = asyncio.new_event_loop()
+    try:
+        games = loop.run_until_complete(_main())
+    finally:
+        loop.close()
+
+    assert [game.id for game in games] == [38733]
+    assert list(errors) == [31260]
+    assert isinstance(errors[31260], BoardGameGeekRateLimitQueueFullError)
+
+
+def test_canonical_params(fake_api):
+    from boardgamegeek.api import _canonical_params
+
+    assert _canonical_params({"username": " Alice", "stats": 1}) == {"username": "alice", "stats": 1}
+    assert _canonical_params({"query": "  Agricola   Farmers ", "exact": 0}) == {"query": "Agricola Farmers"}
+    assert _canonical_params({"id": "38733,31260,38733", "page": 1, "mindate": None}) == {"id": "31260,38733"}
+    assert _canonical_params({"type": "boardgameexpansion,boardgame"}) == {"type": "boardgame,boardgameexpansion"}
+    assert _canonical_params({"id": 5, "page": 2}) == {"id": 5, "page": 2}
+
+    fake_api.responses["user"] = '<user id="1" name="Alice"><firstname value="Alice"/></user>'
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=3600", retries=0))
+
+    for name in ["Alice", "alice", " ALICE "]:
+        assert bgg.user(name).name == "Alice"
+    assert fake_api.calls() == 1
+
+
+def test_cache_modes(fake_api, tmpdir):
+    fake_api.responses["user"] = '<user id="1" name="alice"><firstname value="Alice"/></user>'
+    cache = "sqlite://{}?ttl=0".format(tmpdir.join("cache.db"))
+
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0))
+    assert bgg.user("alice").firstname == "Alice"
+    assert fake_api.calls() == 1
+
+    # offline, the cached responses are used even if expired, and nothing is requested
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0, mode="offline"))
+    assert bgg.user("alice").firstname == "Alice"
+    with pytest.raises(BoardGameGeekCacheMissError):
+        bgg.user("bob")
+    assert fake_api.calls() == 1
+
+    # preferring the cache, the expired responses are used when they can't be refreshed
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0, mode="prefer-cache"))
+    fake_api.status_code = 503
+    assert bgg.user("alice").firstname == "Alice"
+    fake_api.error = requests.exceptions.ConnectionError("network unreachable")
+    assert bgg.user("alice").firstname == "Alice"
+    assert fake_api.calls() == 3
+
+    with pytest.raises(BoardGameGeekError):
+        BoardGameGeek(cache=None, mode="offline")
+
+    with pytest.raises(BoardGameGeekError):
+        BoardGameGeek(mode="airplane")
+
+
+def test_games_by_id_cache_modes(fake_api, thing_xml, tmpdir):
+    fake_api.respond_with_items("thing", thing_xml)
+    cache = "sqlite://{}?ttl=0".format(tmpdir.join("cache.db"))
+    errors = {}
+
+    def _on_error(game_id, error):
+        errors[game_id] = error
+
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0))
+    bgg.games_by_id([31260, 38733])
+    assert fake_api.calls() == 1
+
+    # offline, the games of the batch are read from their expired responses, like single games
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0, mode="offline"))
+    games = bgg.games_by_id([31260, 38733, 69327], on_error=_on_error)
+    assert [game.id for game in games] == [31260, 38733]
+    assert list(errors.keys()) == [69327]
+    assert isinstance(errors[69327], BoardGameGeekCacheMissError)
+    assert bgg.game(game_id=38733).name == "Agricola: Farmers of the Moor"
+    assert fake_api.calls() == 1
+
+    # preferring the cache, the expired games are requested again, but used if that fails
+    bgg = fake_api.mount(BoardGameGeek(cache=cache, retries=0, mode="prefer-cache"))
+    fake_api.status_code = 503
+    errors.clear()
+    games = bgg.games_by_id([31260, 38733, 69327], on_error=_on_error)
+    assert [game.id for game in games] == [31260, 38733]
+    assert list(errors.keys()) == [69327]
+    assert fake_api.requests[-1][1]["id"] == "31260,38733,69327"
+    assert bgg.game(game_id=38733).name == "Agricola: Farmers of the Moor"
+    assert fake_api.calls() == 3
+
+
+def test_games_by_id_stale_while_revalidate(fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+    bgg = fake_api.mount(BoardGameGeek(cache="memory:///?ttl=0&stale_while_revalidate=100", retries=0))
+
+    bgg.games_by_id([31260, 38733])
+    assert fake_api.calls() == 1
+
+    # the stale games are returned right away, while each one is refreshed in the background
+    games = bgg.games_by_id([31260, 38733])
+    assert [game.id for game in games] == [31260, 38733]
+    for _ in range(50):
+        if fake_api.calls() == 3:
+            break
+        time.sleep(0.1)
+    assert sorted(params["id"] for _, params in fake_api.requests[1:]) == ["31260", "38733"]
+
+
+def test_streamed_parsing(fake_api, tmpdir):
+    def plays_xml(page, count):
+        plays = "".join('<play id="{0}" date="2015-01-01" quantity="1" length="0" incomplete="0" nowinstats="0">'
+                        '<item name="Agricola" objectid="31260"/><players><player name="p{0}"/></players>'
+                        '<comments>{1}</comments></play>'.format(page * 1000 + i, "-" * 1000) for i in range(count))
+        return '<plays username="alice" userid="1" total="150" page="{}">{}</plays>'.format(page, plays)
+
+    def _plays(params):
+        page = int(params.get("page", 1))
+        body = plays_xml(page, 100 if page == 1 else 50)
+        if params["username"] == "nobody":
+            # no total when the user doesn't exist
+            body = body.replace(' total="150"', "")
+        return body
+
+    fake_api.responses["plays"] = _plays
+
+    # the elements are returned before the whole response is read, and aren't kept in the tree
+    bgg = fake_api.mount(BoardGameGeek(cache=None))
+    root, elements = bggutil.get_streamed_xml_response(bgg.requests_session, bgg._plays_api_url,
+                                                       params={"username": "alice"}, tag="play")
+    assert root.attrib["total"] == "150"
+    first = next(elements)
+    assert first.attrib["id"] == "1000"
+    assert fake_api.bodies[-1].tell() < len(fake_api.bodies[-1].getvalue())
+    assert len(list(elements)) == 99
+    assert len(root) == 0
+
+    # the response is closed when the elements are abandoned part-way
+    root, elements = bggutil.get_streamed_xml_response(bgg.requests_session, bgg._plays_api_url,
+                                                       params={"username": "alice"}, tag="play")
+    next(elements)
+    assert not fake_api.bodies[-1].closed
+    elements.close()
+    assert fake_api.bodies[-1].closed
+
+    # also when the plays aren't parsed at all
+    played = bgg.plays("nobody")
+    assert played is None
+    assert fake_api.bodies[-1].closed
+
+    # caching sessions read the whole response, which is still parsed incrementally, also when read from the cache
+    bgg = fake_api.mount(BoardGameGeek(cache="sqlite://{}?ttl=100".format(tmpdir.join("streamed.db"))))
+    for _ in range(2):
+        root, elements = bggutil.get_streamed_xml_response(bgg.requests_session, bgg._plays_api_url,
+                                                           params={"username": "alice"}, tag="play")
+        assert [e.attrib["id"] for e in elements] == [str(1000 + i) for i in range(100)]
+        assert len(root) == 0
+    assert len(fake_api.bodies) == 4
+
+    xml_parsers = [p for p in bggutil.XML_PARSERS if p != "lxml" or bggutil.lxml_etree is not None]
+    for cache in [None, "sqlite://{}?ttl=100".format(tmpdir.join("cache.db"))]:
+        for xml_parser in xml_parsers:
+            bgg = fake_api.mount(BoardGameGeek(cache=cache, xml_parser=xml_parser))
+            plays = bgg.plays("alice")
+            assert len(plays) == 150
+            assert plays.plays[0].players[0].name == "p1000"
+            assert plays.plays[-1].id == 2049
+
+
+def test_redis_caching(redis_server):
+    response = cacheable_response(b"<items>" + b"<item/>" * 100 + b"</items>")
+
+    for compress in ["0", "1"]:
+        session = bggutil.get_cache_session_from_uri("{}?ttl=100&prefix=test{}&compress={}".format(redis_server,
+                                                                                              compress,
+                                                                                              compress))
+        session.cache.save_response("key", response)
+        cached, _ = session.cache.get_response_and_time("key")
+        assert cached.content == response.content
+        assert session.cache.has_key("key")
+
+        # the responses expire on the server
+        assert 0 < session.cache.responses.connection.ttl("test{}:responses:key".format(compress)) <= 100
+
+        # each cache sees only its own keys
+        assert list(session.cache.responses) == ["key"]
+
+        session.cache.clear()
+        assert not session.cache.has_key("key")
+        assert len(session.cache.responses) == 0
+
+    with pytest.raises(BoardGameGeekError):
+        # invalid value for the ttl parameter
+        BoardGameGeek(cache="{}?ttl=blabla".format(redis_server))
+
+
 
 #region user() testing
 def test_get_user_with_invalid_parameters(bgg):
@@ -228,6 +830,19 @@ def test_get_valid_users_collection(bgg, null_logger):
     assert type(collection.data()) == dict
 
 
+def test_get_collections(bgg):
+    errors = []
+    collections = dict(bgg.collections([TEST_VALID_USER, TEST_INVALID_USER],
+                                       on_error=lambda user_name, e: errors.append(user_name)))
+
+    assert not errors
+    assert collections[TEST_VALID_USER].owner == TEST_VALID_USER
+    assert collections[TEST_INVALID_USER] is None
+
+    with pytest.raises(BoardGameGeekError):
+        list(bgg.collections([TEST_VALID_USER, None]))
+
+
 def test_creating_collection_out_of_raw_data():
     # test raise exception if invalid items given
     with pytest.raises(BoardGameGeekError):
@@ -409,6 +1024,231 @@ def test_get_game_id_by_name(bgg):
             best_rank = g.boardgame_rank
     assert game_id == best_id
 
+def test_get_game_id_by_best_rank_using_rank_table(fake_api, thing_xml):
+    fake_api.responses["search"] = """
+        <items total="2">
+            <item type="boardgame" id="38733"><name type="primary" value="Agricola"/></item>
+            <item type="boardgame" id="31260"><name type="primary" value="Agricola"/></item>
+        </items>"""
+    fake_api.respond_with_items("thing", thing_xml)
+
+    # when all ranks are known, they're used without retrieving the games
+    rank_table = {31260: None, 38733: 1}
+
+    bgg = fake_api.mount(BoardGameGeek(cache=None, rank_table=rank_table))
+    assert bgg.get_game_id("agricola", choose="best-rank") == 38733
+    assert fake_api.calls("thing") == 0
+
+    # otherwise, the missing ones are fetched with a single call and added to the table
+    rank_table.clear()
+    assert bgg.get_game_id("agricola", choose="best-rank") == 31260
+    assert fake_api.calls("thing") == 1
+    assert fake_api.requests[-1][1]["id"] == "31260,38733"
+    assert rank_table == {31260: 10, 38733: None}
+
+    # and aren't fetched again
+    assert bgg.get_game_id("agricola", choose="best-rank") == 31260
+    assert fake_api.calls("thing") == 1
+
+    # a batch which fails fails the call, instead of choosing among the ranks which are known
+    def _timeout(params):
+        raise requests.exceptions.Timeout()
+
+    fake_api.responses["thing"] = _timeout
+    rank_table.clear()
+    rank_table[38733] = 1
+    bgg = fake_api.mount(BoardGameGeek(cache=None, rank_table=rank_table, retries=0, retry_delay=0))
+    with pytest.raises(BoardGameGeekTimeoutError):
+        bgg.get_game_id("agricola", choose="best-rank")
+    assert fake_api.calls("thing") == 2
+    assert rank_table == {38733: 1}
+
+
+def test_get_games_by_id(bgg, fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+    fake_api.mount(bgg)
+    errors = {}
+
+    def _on_error(game_id, error):
+        errors[game_id] = error
+
+    games = bgg.games_by_id([TEST_GAME_ID, 38733, 1928391829, TEST_GAME_ID],
+                            batch_size=2,
+                            on_error=_on_error)
+
+    assert [g.id for g in games] == [TEST_GAME_ID, 38733, TEST_GAME_ID]
+    assert games[0].name == TEST_GAME_NAME
+    assert games[0].boardgame_rank == 10
+    assert games[1].expands[0].id == TEST_GAME_ID
+
+    # the repeated id isn't requested again
+    assert [params["id"] for _, params in fake_api.requests] == ["31260,38733", "1928391829"]
+
+    # the invalid id is reported, without affecting the other games
+    assert list(errors.keys()) == [1928391829]
+    assert isinstance(errors[1928391829], BoardGameGeekError)
+
+    for invalid in [[None], ["asd"]]:
+        with pytest.raises(BoardGameGeekError):
+            bgg.games_by_id(invalid)
+
+    for invalid in [0, -1, "asd"]:
+        with pytest.raises(BoardGameGeekError):
+            bgg.games_by_id([TEST_GAME_ID], batch_size=invalid)
+
+    assert fake_api.calls("thing") == 2
+
+
+def test_create_game_from_xml(thing_xml):
+    items = thing_xml.findall("item")
+
+    game = create_game_from_xml(items[0])
+    assert game.id == 31260
+    assert game.name == "Agricola"
+    assert game.year == 2007
+    assert game.thumbnail == "http://cf.geekdo-images.com/images/pic259085_t.jpg"
+    assert game.description == "Agricola is a game about farming & such"
+    assert game.alternative_names == ["Агрикола"]
+    assert game.mechanics == ["Worker Placement"]
+    assert game.users_rated == 34000
+    assert game.boardgame_rank == 10
+    assert [e.id for e in game.expansions] == [38733]
+    assert not game.expansion
+
+    expansion = create_game_from_xml(items[1])
+    assert expansion.expansion
+    assert expansion.boardgame_rank is None
+    assert [e.id for e in expansion.expands] == [31260]
+
+    with pytest.raises(BoardGameGeekError):
+        create_game_from_xml(items[2])
+
+
+def test_create_game_from_xml_links():
+    links = "".join('<link type="{}" id="{}" value="{}" />'.format(link_type, i, "{} {}".format(link_type, i))
+                    for i in range(200) for link_type in ["boardgamemechanic", "boardgamedesigner"])
+    item = ET.fromstring('<item type="boardgame" id="1">'
+                         '<name type="alternate" value="Alt" /><name type="primary" value="Game" />{}'
+                         '<link type="boardgameexpansion" id="2" value="Base" inbound="true" />'
+                         '<yearpublished value="not a year" /></item>'.format(links))
+
+    game = create_game_from_xml(item)
+    assert game.name == "Game"
+    assert game.alternative_names == ["Alt"]
+    assert game.mechanics == ["boardgamemechanic {}".format(i) for i in range(200)]
+    assert game.designers == ["boardgamedesigner {}".format(i) for i in range(200)]
+    assert [e.id for e in game.expands] == [2]
+    assert game.year is None
+    assert game.users_rated is None
+    assert game.ranks == []
+
+
+def test_lazy_games(thing_xml):
+    properties = [name for name in dir(BoardGame) if isinstance(getattr(BoardGame, name), property)]
+
+    for item in thing_xml.findall("item")[:2]:
+        game = create_game_from_xml(item)
+
+        lazy_game = create_game_from_xml(item, lazy=True)
+        assert isinstance(lazy_game._data, LazyGameData)
+        assert lazy_game.name == game.name
+        assert lazy_game.year == game.year
+        # nothing else was decoded
+        assert set(lazy_game._data._data) == {"id", "expansion", "name", "yearpublished"}
+
+        for name in properties:
+            if name in ["expansions", "expands"]:
+                assert [e.id for e in getattr(lazy_game, name)] == [e.id for e in getattr(game, name)]
+            else:
+                assert getattr(lazy_game, name) == getattr(game, name)
+
+        # the element is released once everything was decoded
+        assert lazy_game._data._xml is None
+        assert lazy_game.data() == game.data()
+
+        # pickled with plain data
+        lazy_game = pickle.loads(pickle.dumps(create_game_from_xml(item, lazy=True)))
+        assert lazy_game.data() == game.data()
+        assert lazy_game.boardgame_rank == game.boardgame_rank
+
+        # the data can be decoded by several threads at once
+        def _read(data, keys, errors):
+            try:
+                for key in keys:
+                    data[key]
+            except Exception as e:
+                errors.append(e)
+
+        # and so can the games sharing it
+        def _read_game(game, results, errors):
+            try:
+                results.append((game.boardgame_rank,
+                                [e.id for e in game.expansions],
+                                [e.id for e in game.expands],
+                                game.data()["name"]))
+            except Exception as e:
+                errors.append(e)
+
+        expected = (game.boardgame_rank, [e.id for e in game.expansions], [e.id for e in game.expands], game.name)
+
+        switch_interval = sys.getswitchinterval() if hasattr(sys, "getswitchinterval") else None
+        try:
+            if switch_interval is not None:
+                # switch threads as often as possible
+                sys.setswitchinterval(1e-6)
+
+            for _ in range(20):
+                data = create_game_from_xml(item, lazy=True)._data
+                errors = []
+                threads = [threading.Thread(target=_read, args=(data, keys, errors))
+                           for keys in [GAME_KEYS, list(reversed(GAME_KEYS))] * 2]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+
+                assert not errors
+                assert data._xml is None
+                assert dict(data) == create_game_from_xml(item, lazy=True)._data.decode_all()
+
+                shared_game = create_game_from_xml(item, lazy=True)
+                results = []
+                threads = [threading.Thread(target=_read_game, args=(shared_game, results, errors)) for _ in range(4)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+
+                assert not errors
+                assert results == [expected] * 4
+        finally:
+            if switch_interval is not None:
+                sys.setswitchinterval(switch_interval)
+
+
+def test_xml_parsers(thing_xml):
+    pytest.importorskip("lxml")
+
+    xml = ET.tostring(thing_xml, encoding="utf-8")
+    games = {}
+    for xml_parser in bggutil.XML_PARSERS:
+        root = bggutil.xml_fromstring(xml, xml_parser)
+        items = bggutil.xml_findall(root, "item")
+        assert len(items) == 3
+        assert bggutil.xml_find(root, ".//link[@type='boardgamemechanic']").attrib["value"] == "Worker Placement"
+        assert bggutil.xml_find(root, ".//link[@type='boardgamepublisher']") is None
+        games[xml_parser] = create_game_from_xml(items[0]).data()
+
+    # both parsers produce the same games
+    assert games["lxml"] == games["etree"]
+
+    with pytest.raises(bggutil.XML_PARSE_ERRORS):
+        bggutil.xml_fromstring(b"<items><item>", "lxml")
+
+    with pytest.raises(BoardGameGeekError):
+        BoardGameGeek(xml_parser="sax")
+
+
 def test_get_games_by_name(bgg, null_logger):
     games = bgg.games("coup")
 
@@ -722,6 +1562,368 @@ def test_get_xml_subelement_text(xml):
     assert node == "asd"
 
 
+def test_get_page_count():
+    assert bggutil.get_page_count(0, 100) == 1
+    assert bggutil.get_page_count(1, 100) == 1
+    assert bggutil.get_page_count(100, 100) == 1
+    assert bggutil.get_page_count(101, 100) == 2
+    assert bggutil.get_page_count(250, 25) == 10
+
+
+def test_fetch_pages():
+    in_flight = [0]
+    max_in_flight = [0]
+    lock = threading.Lock()
+    fetched = []
+
+    def _fetch_page(page):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            fetched.append(page)
+        # make later pages complete first
+        time.sleep(0.01 * (20 - page))
+        with lock:
+            in_flight[0] -= 1
+        return [page] if page <= 12 else []
+
+    # pages are returned in order, with the requested number of them retrieved at the same time
+    pages = list(bggutil.fetch_pages(_fetch_page, 2, 10, concurrency=3))
+    assert pages == [[p] for p in range(2, 11)]
+    assert max_in_flight[0] == 3
+
+    # serial retrieval
+    max_in_flight[0] = 0
+    pages = list(bggutil.fetch_pages(_fetch_page, 2, 10, concurrency=1))
+    assert pages == [[p] for p in range(2, 11)]
+    assert max_in_flight[0] == 1
+
+    # iteration stops at the first empty page, and pages past it aren't requested anymore
+    for concurrency in [1, 2]:
+        del fetched[:]
+        pages = list(bggutil.fetch_pages(_fetch_page, 10, 20, concurrency=concurrency, is_empty=lambda p: not p))
+        assert pages == [[10], [11], [12]]
+        assert max(fetched) <= 13 + concurrency
+
+    # nothing to fetch
+    assert list(bggutil.fetch_pages(_fetch_page, 2, 1, concurrency=2)) == []
+
+
+def test_fetch_pages_errors():
+    def _fetch_page(page):
+        if page == 3:
+            raise BoardGameGeekError("page {} failed".format(page))
+        return page
+
+    for concurrency in [1, 4]:
+        pages = []
+        with pytest.raises(BoardGameGeekError):
+            for p in bggutil.fetch_pages(_fetch_page, 1, 5, concurrency=concurrency):
+                pages.append(p)
+
+        # the pages before the failed one are still returned
+        assert pages == [1, 2]
+
+
+def test_fetch_as_completed():
+    def _fetch(item):
+        if item == "fail":
+            raise BoardGameGeekError("{} failed".format(item))
+        time.sleep(item)
+        return item * 2
+
+    # the results are returned as soon as they're available
+    assert list(bggutil.fetch_as_completed(_fetch, [0.2, 0.1, 0], concurrency=3)) == [(0, 0), (0.1, 0.2), (0.2, 0.4)]
+    assert list(bggutil.fetch_as_completed(_fetch, [0.02, 0], concurrency=1)) == [(0.02, 0.04), (0, 0)]
+    assert list(bggutil.fetch_as_completed(_fetch, [], concurrency=2)) == []
+
+    for concurrency in [1, 2]:
+        with pytest.raises(BoardGameGeekError):
+            list(bggutil.fetch_as_completed(_fetch, [0, "fail"], concurrency=concurrency))
+
+
+def test_collections_polling(fake_api):
+    def _collection(params):
+        if params["username"] == "slow":
+            time.sleep(0.3)
+        return '<items totalitems="0"></items>'
+
+    fake_api.responses["collection"] = _collection
+
+    class RateLimiter(AdaptiveRateLimiter):
+        full = [True]
+
+        def acquire(self, path=None, priority=None):
+            # the first request finds the queue full
+            if RateLimiter.full[0]:
+                RateLimiter.full[0] = False
+                raise BoardGameGeekRateLimitQueueFullError("too many requests waiting")
+            return super(RateLimiter, self).acquire(path, priority=priority)
+
+    bgg = fake_api.mount(BoardGameGeek(cache=None, rate_limiter=RateLimiter(rpm=6000), concurrent_pages=2),
+                         rate_limited=True)
+
+    # the collections are returned as soon as they're retrieved, the ones which couldn't be queued are requested again
+    errors = []
+    collections = list(bgg.collections(["slow", "fast"], poll_delay=0, on_error=lambda *args: errors.append(args)))
+    assert not errors
+    assert [user_name for user_name, _ in collections] in (["fast", "slow"], ["slow", "fast"])
+    assert all(collection is not None for _, collection in collections)
+
+    RateLimiter.full[0] = False
+    collections = list(bgg.collections(["slow", "fast"], poll_delay=0))
+    assert [user_name for user_name, _ in collections] == ["fast", "slow"]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="the asyncio client requires Python 3.5+")
+def test_fetch_pages_async():
+    import asyncio
+    from boardgamegeek.asyncapi import fetch_pages
+
+    fetched = []
+
+    def _fetch_page(page):
+        fetched.append(page)
+        # make later pages complete first
+        return asyncio.sleep(0.01 * (20 - page), result=[page] if page <= 5 else [])
+
+    loop = asyncio.new_event_loop()
+    try:
+        pages = loop.run_until_complete(fetch_pages(_fetch_page, 2, 5, concurrency=3))
+        assert pages == [[p] for p in range(2, 6)]
+
+        # stops at the first empty page, without requesting pages past it
+        del fetched[:]
+        pages = loop.run_until_complete(fetch_pages(_fetch_page, 2, 10, concurrency=1, is_empty=lambda p: not p))
+        assert pages == [[p] for p in range(2, 6)]
+        assert sorted(fetched) == [2, 3, 4, 5, 6]
+
+        # when a page fails, the requests for the others are cancelled and done with before the error is raised
+        finished = []
+
+        async def _failing_page(page):
+            try:
+                if page == 2:
+                    raise BoardGameGeekAPIError("failed")
+                await asyncio.sleep(1)
+            finally:
+                finished.append(page)
+
+        async def _fetch_failing_pages():
+            with pytest.raises(BoardGameGeekAPIError):
+                await fetch_pages(_failing_page, 2, 5, concurrency=4)
+            return sorted(finished)
+
+        assert loop.run_until_complete(_fetch_failing_pages()) == [2, 3, 4, 5]
+    finally:
+        loop.close()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="the asyncio client requires Python 3.5+")
+def test_async_rate_limiting_doesnt_block(tmpdir):
+    import asyncio
+    import sqlite3
+    from boardgamegeek.asyncapi import _acquire
+
+    path = str(tmpdir.join("ratelimit.db"))
+    limiter = SqliteRateLimiter(path, rpm=600)
+    limiter.tokens()
+
+    # another process holds the database locked for a while
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute("BEGIN IMMEDIATE")
+    unlock = threading.Timer(0.3, lambda: conn.execute("ROLLBACK"))
+    unlock.start()
+
+    ticks = [0]
+    ticks_when_acquired = []
+
+    async def _tick():
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            ticks[0] += 1
+
+    async def _acquire_and_count():
+        await _acquire(limiter, "https://www.boardgamegeek.com/xmlapi2/thing")
+        ticks_when_acquired.append(ticks[0])
+
+    async def _main():
+        await asyncio.gather(_acquire_and_count(), _tick())
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_main())
+    finally:
+        loop.close()
+        unlock.join()
+
+    # the other coroutines kept running while the limiter waited for the database
+    assert ticks_when_acquired[0] >= 10
+    assert limiter.tokens() < 1
+
+
+@pytest.fixture
+def api_responses(thing_xml):
+    # trimmed down responses of the API endpoints, keyed by their names
+    return {
+        "thing": ET.tostring(thing_xml, encoding="utf-8"),
+        "search": b"""<items total="1">
+                        <item type="boardgame" id="31260">
+                            <name type="primary" value="Agricola"/>
+                            <yearpublished value="2007"/>
+                        </item>
+                      </items>""",
+        "user": b"""<user id="818216" name="fagentu007">
+                        <firstname value="Cosmin"/>
+                        <lastname value="L"/>
+                        <yearregistered value="2013"/>
+                        <lastlogin value="2016-01-02"/>
+                        <country value="Romania"/>
+                        <traderating value="0"/>
+                        <buddies total="2" page="1">
+                            <buddy id="1" name="alice"/>
+                            <buddy id="2" name="bob"/>
+                        </buddies>
+                        <guilds total="1" page="1">
+                            <guild id="1229" name="Geekdo"/>
+                        </guilds>
+                        <top domain="boardgame">
+                            <item rank="1" type="thing" id="31260" name="Agricola"/>
+                        </top>
+                        <hot domain="boardgame">
+                            <item rank="1" type="thing" id="283" name="Advanced Third Reich"/>
+                        </hot>
+                    </user>""",
+        "guild": b"""<guild id="1229" name="Geekdo" created="Sat, 01 Jan 2011 00:00:00 +0000">
+                        <category>group</category>
+                        <website>https://boardgamegeek.com</website>
+                        <manager>admin</manager>
+                        <description>Guild &amp;amp; friends</description>
+                        <location>
+                            <city>Bucharest</city>
+                            <country>Romania</country>
+                        </location>
+                        <members count="2" page="1">
+                            <member name="alice" date="Sat, 01 Jan 2011 00:00:00 +0000"/>
+                            <member name="bob" date="Sat, 01 Jan 2011 00:00:00 +0000"/>
+                        </members>
+                     </guild>""",
+        "plays": b"""<plays username="fagentu007" userid="818216" total="2" page="1">
+                        <play id="1" date="2014-01-01" quantity="1" length="60" incomplete="0" nowinstats="0">
+                            <item name="Agricola" objecttype="thing" objectid="31260"/>
+                            <comments>fun</comments>
+                            <players>
+                                <player username="alice" userid="1" name="Alice" startposition="1" score="10" new="0"
+                                        rating="0" win="1"/>
+                            </players>
+                        </play>
+                        <play id="2" date="2014-01-02" quantity="2" length="0" incomplete="1" nowinstats="1">
+                            <item name="Advanced Third Reich" objecttype="thing" objectid="283"/>
+                        </play>
+                     </plays>""",
+        "collection": b"""<items totalitems="1">
+                            <item objecttype="thing" objectid="31260" subtype="boardgame" collid="1">
+                                <name sortindex="1">Agricola</name>
+                                <stats><rating value="8"/></stats>
+                                <status own="1" prevowned="0" fortrade="0" want="0" wanttoplay="0" wanttobuy="0"
+                                        wishlist="0" preordered="0" lastmodified="2014-01-01 00:00:00"/>
+                            </item>
+                          </items>""",
+        "hot": b"""<items>
+                    <item id="31260" rank="1">
+                        <thumbnail value="//cf.geekdo-images.com/images/pic259085_t.jpg"/>
+                        <name value="Agricola"/>
+                        <yearpublished value="2007"/>
+                    </item>
+                   </items>""",
+    }
+
+
+def _xml_data(obj):
+    # the data of what the clients returned (including the objects it contains), for comparing it
+    if hasattr(obj, "data"):
+        return _xml_data(obj.data())
+    if isinstance(obj, list):
+        return [_xml_data(o) for o in obj]
+    if isinstance(obj, dict):
+        return {k: _xml_data(v) for k, v in obj.items()}
+    return obj
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="the asyncio client requires Python 3.5+")
+def test_async_client_matches_sync_client(fake_api, api_responses):
+    import asyncio
+    import re
+    aioresponses = pytest.importorskip("aioresponses")
+    from boardgamegeek.asyncapi import AsyncBoardGameGeek
+
+    fake_api.responses.update(api_responses)
+    bgg = fake_api.mount(BoardGameGeek(cache=None, retries=0))
+
+    calls = [("game", (), {"game_id": 31260}),
+             ("games", ("Agricola",), {}),
+             ("games_by_id", ([31260, 38733],), {}),
+             ("search", ("Agricola",), {}),
+             ("user", ("fagentu007",), {}),
+             ("guild", (1229,), {}),
+             ("plays", ("fagentu007",), {}),
+             ("collection", ("fagentu007",), {}),
+             ("hot_items", ("boardgame",), {})]
+
+    async def _main():
+        with aioresponses.aioresponses() as mocked:
+            for name, content in api_responses.items():
+                mocked.get(re.compile(r"^https://www\.boardgamegeek\.com/xmlapi2/{}\b".format(name)), body=content,
+                           content_type="text/xml", repeat=True)
+
+            async with AsyncBoardGameGeek(retries=0, requests_per_minute=6000) as async_bgg:
+                return [await getattr(async_bgg, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(_main())
+    finally:
+        loop.close()
+
+    for (name, args, kwargs), result in zip(calls, results):
+        expected = getattr(bgg, name)(*args, **kwargs)
+        assert type(result) == type(expected), name
+        assert _xml_data(result) == _xml_data(expected), name
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="the asyncio client requires Python 3.5+")
+def test_async_client_retries(api_responses):
+    import asyncio
+    aioresponses = pytest.importorskip("aioresponses")
+    from boardgamegeek.asyncapi import AsyncBoardGameGeek
+
+    url = "https://www.boardgamegeek.com/xmlapi2/hot?type=boardgame"
+
+    async def _hot_items(statuses, retries):
+        with aioresponses.aioresponses() as mocked:
+            for status in statuses:
+                mocked.get(url, status=status, body=api_responses["hot"] if status == 200 else b"",
+                           content_type="text/xml")
+            async with AsyncBoardGameGeek(retries=retries, retry_delay=0, requests_per_minute=6000) as bgg:
+                return await bgg.hot_items("boardgame")
+
+    loop = asyncio.new_event_loop()
+    try:
+        # the request is retried when the response isn't ready yet or BGG is throttling the requests
+        hot_items = loop.run_until_complete(_hot_items([202, 429, 503, 200], retries=3))
+        assert [item.id for item in hot_items] == [31260]
+
+        # until running out of retries
+        with pytest.raises(BoardGameGeekAPIRetryError):
+            loop.run_until_complete(_hot_items([202, 202], retries=1))
+        with pytest.raises(BoardGameGeekAPIRetryError):
+            loop.run_until_complete(_hot_items([202], retries=0))
+        with pytest.raises(BoardGameGeekAPIError):
+            loop.run_until_complete(_hot_items([503, 429], retries=1))
+    finally:
+        loop.close()
+
+
 @pytest.mark.serialize
 def test_serialization():
     dummy_plays = Thing({"id": "10", "name": "fubar"})
@@ -733,6 +1935,259 @@ def test_serialization():
     assert type(dummy_unserialized) == Thing
 
 
+def test_object_cache():
+    cache = ObjectCache(max_items=2, ttl=0.1)
+
+    key1 = object_cache_key("thing", {"id": 1, "stats": 1})
+    assert key1 == object_cache_key("thing", {"stats": "1", "id": "1"})
+
+    cache.put(key1, "game 1")
+    cache.put("key 2", "game 2")
+    assert cache.get(key1) == "game 1"
+
+    # the least recently used object is evicted
+    cache.put("key 3", "game 3")
+    assert len(cache) == 2
+    assert cache.get("key 2") is None
+    assert cache.get(key1) == "game 1"
+
+    cache.invalidate(key1)
+    assert cache.get(key1) is None
+    assert cache.hits == 2
+    assert cache.misses == 2
+
+    # objects expire
+    time.sleep(0.15)
+    assert cache.get("key 3") is None
+
+    with pytest.raises(BoardGameGeekError):
+        ObjectCache(max_items=0)
+
+
+def test_get_game_from_object_cache(fake_api, thing_xml):
+    fake_api.respond_with_items("thing", thing_xml)
+    bgg = fake_api.mount(BoardGameGeek(cache=None, object_cache=ObjectCache()))
+
+    game = bgg.game(game_id=TEST_GAME_ID)
+    assert fake_api.calls("thing") == 1
+
+    # both are served from the object cache, without calling the API
+    assert bgg.game(game_id=TEST_GAME_ID) is game
+    assert bgg.games_by_id([TEST_GAME_ID])[0] is game
+    assert fake_api.calls("thing") == 1
+
+
+def test_token_bucket_rate_limiter():
+    # 600 requests per minute => a token every 0.1 seconds
+    limiter = TokenBucketRateLimiter(rpm=600, burst=3)
+    assert limiter.tokens() == 3
+
+    # a burst of requests goes out right away...
+    start_time = time.time()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.time() - start_time < 0.05
+    assert limiter.tokens() < 1
+    assert 0 < limiter.wait_time() <= 0.1
+    request = limiter.enqueue()
+    assert limiter.poll(None, request) > 0
+    limiter.cancel(None, request)
+
+    # ... then the requests are spaced out
+    limiter.acquire()
+    limiter.acquire()
+    assert 0.15 < time.time() - start_time < 0.4
+
+    # each path gets its own bucket
+    limiter = TokenBucketRateLimiter(rpm=600, per_path=True)
+    limiter.acquire("/xmlapi2/thing")
+    assert limiter.wait_time("/xmlapi2/thing") > 0
+    assert limiter.wait_time("/xmlapi2/plays") == 0
+
+    # clients don't share limiters unless told to
+    assert BoardGameGeek(cache=None).rate_limiter is not BoardGameGeek(cache=None).rate_limiter
+    assert BoardGameGeek(cache=None, rate_limiter=limiter).rate_limiter is limiter
+
+    with pytest.raises(BoardGameGeekError):
+        TokenBucketRateLimiter(burst=0)
+
+
+def test_rate_limiter_reservations():
+    limiter = TokenBucketRateLimiter(rpm=600, max_queue=2)
+    limiter.acquire()
+
+    # the queued requests are made in turn, once a token is available
+    first, second = limiter.enqueue(), limiter.enqueue()
+    assert limiter.queue_depth() == 2
+    assert 0.05 < limiter.poll(None, first) <= 0.1
+    assert 0.15 < limiter.poll(None, second) <= 0.2
+
+    # the queue is full
+    with pytest.raises(BoardGameGeekRateLimitQueueFullError):
+        limiter.enqueue()
+
+    time.sleep(0.1)
+    assert limiter.poll(None, second) > 0
+    assert limiter.poll(None, first) == 0
+    assert limiter.queue_depth() == 1
+    limiter.cancel(None, second)
+    assert limiter.queue_depth() == 0
+
+    # the requests are queued even when they don't have to wait, so the queue must hold at least one
+    for invalid in [0, -1]:
+        with pytest.raises(BoardGameGeekError):
+            TokenBucketRateLimiter(max_queue=invalid)
+
+    limiter = TokenBucketRateLimiter(rpm=600, max_queue=1)
+    limiter.acquire()
+    request = limiter.enqueue()
+    with pytest.raises(BoardGameGeekRateLimitQueueFullError):
+        limiter.acquire()
+    limiter.cancel(None, request)
+    limiter.acquire()
+
+    # waiting threads are served in the order they arrived, without blocking each other
+    limiter = TokenBucketRateLimiter(rpm=600)
+    served = []
+
+    def _worker(i):
+        limiter.acquire()
+        served.append(i)
+
+    threads = []
+    for i in range(4):
+        t = threading.Thread(target=_worker, args=(i, ))
+        t.start()
+        threads.append(t)
+        time.sleep(0.01)
+
+    for t in threads:
+        t.join()
+
+    assert served == [0, 1, 2, 3]
+
+
+def test_adaptive_rate_limiter():
+    limiter = AdaptiveRateLimiter(rpm=60, max_rpm=120, min_rpm=10, decrease_interval=0)
+
+    # throttling responses decrease the rate multiplicatively...
+    limiter.response_received("/xmlapi2/thing", 503)
+    assert limiter.requests_per_minute == 30
+    limiter.response_received("/xmlapi2/thing", 429)
+    assert limiter.requests_per_minute == 15
+    limiter.response_received("/xmlapi2/thing", 429)
+    assert limiter.requests_per_minute == 10
+
+    # ... but not for "try again later" responses
+    limiter.response_received("/xmlapi2/collection", 202)
+    assert limiter.requests_per_minute == 10
+
+    # successes increase it additively, up to the maximum
+    limiter.response_received("/xmlapi2/thing", 200)
+    assert 10 < limiter.requests_per_minute < 11
+    for _ in range(10000):
+        limiter.succeeded()
+    assert limiter.requests_per_minute == 120
+
+    # Retry-After is honored
+    limiter = TokenBucketRateLimiter(rpm=600)
+    limiter.response_received("/xmlapi2/thing", 429, retry_after="2")
+    assert 1.9 < limiter.wait_time() <= 2.1
+
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_rate_limiter_priorities():
+    def _run(limiter, requests):
+        served = []
+
+        def _worker(name, priority):
+            limiter.acquire(priority=priority)
+            served.append(name)
+
+        # use up the token, so all the requests have to wait
+        limiter.acquire()
+
+        threads = []
+        for name, priority in requests:
+            t = threading.Thread(target=_worker, args=(name, priority))
+            t.start()
+            threads.append(t)
+            time.sleep(0.01)
+
+        for t in threads:
+            t.join()
+
+        return served
+
+    requests = [("bulk1", "bulk"), ("bulk2", "bulk"), ("normal", None), ("interactive", "interactive")]
+
+    # higher priorities go first
+    limiter = TokenBucketRateLimiter(rpm=600)
+    assert _run(limiter, requests) == ["interactive", "normal", "bulk1", "bulk2"]
+
+    # requests waiting long enough are promoted
+    limiter = TokenBucketRateLimiter(rpm=600, aging=0.005)
+    assert _run(limiter, requests) == ["bulk1", "bulk2", "normal", "interactive"]
+
+    # the priority can be set for all the requests of a thread
+    with request_priority("interactive"):
+        assert get_request_priority() == "interactive"
+        with request_priority(None):
+            assert get_request_priority() == "interactive"
+    assert get_request_priority() == "normal"
+
+    with pytest.raises(BoardGameGeekError):
+        limiter.acquire(priority="urgent")
+
+    with pytest.raises(BoardGameGeekError):
+        BoardGameGeek(cache=None, priority="urgent")
+
+
+def test_sqlite_rate_limiter():
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+
+    try:
+        # limiters using the same database (e.g. in different processes) share the budget
+        limiter1 = SqliteRateLimiter(path, rpm=600, burst=2)
+        limiter2 = SqliteRateLimiter(path, rpm=600, burst=2)
+
+        limiter1.acquire()
+        limiter2.acquire()
+        assert limiter1.tokens() < 1
+        assert 0.05 < limiter2.wait_time() <= 0.1
+
+        request = limiter2.enqueue()
+        assert limiter2.poll(None, request) > 0
+        time.sleep(0.1)
+        assert limiter2.poll(None, request) == 0
+        assert limiter1.tokens() < 1
+
+        # while a request waits for another process to unlock the database, the queue can still be used
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        conn.execute("BEGIN IMMEDIATE")
+        unlock = threading.Timer(0.5, lambda: conn.execute("ROLLBACK"))
+        unlock.start()
+        try:
+            waiting = threading.Thread(target=limiter1.acquire)
+            waiting.start()
+            time.sleep(0.1)
+
+            start = time.time()
+            assert limiter1.queue_depth() == 1
+            limiter1.cancel(None, limiter1.enqueue())
+            assert time.time() - start < 0.2
+        finally:
+            unlock.join()
+            waiting.join()
+            conn.close()
+    finally:
+        os.unlink(path)
+
+
 def test_rate_limiting_for_requests():
     # create two threads, give each a list of games to fetch, disable cache and time the amount needed to
     # fetch the data. requests should be serialized, even if made from two different threads
@@ -745,8 +2200,11 @@ def test_rate_limiting_for_requests():
                 28720, #  brass
                 53953] # thunderstone]
 
+    # the clients share the limiter, otherwise each one would get its own budget
+    rate_limiter = TokenBucketRateLimiter(rpm=20)
+
     def _worker_thread(games):
-        bgg = BoardGameGeek(cache=None, requests_per_minute=20)
+        bgg = BoardGameGeek(cache=None, rate_limiter=rate_limiter)
         for g in games:
             bgg.game(game_id=g)
 